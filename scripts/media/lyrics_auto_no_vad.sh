@@ -13,9 +13,16 @@
 #
 # Output:
 #   ./lyrics_<songname>.ja.srt.txt
+#   ./lyrics_<songname>.ja.srt.txt.cleaned.txt   (lyrics_cleanup filters; LYRICS_CLEANUP=0 to skip)
 #   Workdir: ~/toolbox/Lyrics/work_lyrics_<songname>/
 # Requirements:
-#   ffmpeg, ffprobe, python3, whisper-cli (whisper-cpp)
+#   ffmpeg, python3, whisper-cli (whisper-cpp)
+# Segmentation, transcription and SRT assembly run in lyrics_pipeline.py (same dir).
+# Env: MODEL, SILENCE_THRESHOLD, SILENCE_DURATION, MIN_SEGMENT_DUR, MAX_SEGMENT_GAP, MIN_SEGMENTS,
+#      WHISPER_JOBS (parallel whisper-cli processes), WHISPER_THREADS (-t per process),
+#      LYRICS_SLICE (auto|offset|mmap|ffmpeg: how segment audio is cut),
+#      LYRICS_SILENCE (auto|numpy|ffmpeg: silence detection engine),
+#      LYRICS_CACHE=0 (no transcript cache), LYRICS_CACHE_DB, LYRICS_CACHE_MB (LRU size bound)
 #!/usr/bin/env bash
 set -Eeuo pipefail
 
@@ -131,17 +138,22 @@ case "$LANG_OUT" in
   *) die "Unsupported LANG_OUT: $LANG_OUT (use en/ja/zh)" ;;
 esac
 
-# Silence detection parameters (for auto/hybrid modes)
-SILENCE_THRESHOLD="-35dB"  # more sensitive for music with continuous background
-SILENCE_DURATION="0.8"     # longer silence required
-MIN_SEGMENT_DUR="2.0"      # minimum speech segment (ignore very short)
-MAX_SEGMENT_GAP="1.5"      # merge segments closer than this
-MIN_SEGMENTS=3             # if fewer, switch to fixed (hybrid mode)
+# Silence detection parameters (for auto/hybrid modes; env overrides)
+SILENCE_THRESHOLD="${SILENCE_THRESHOLD:--35dB}"  # more sensitive for music with continuous background
+SILENCE_DURATION="${SILENCE_DURATION:-0.8}"      # longer silence required
+MIN_SEGMENT_DUR="${MIN_SEGMENT_DUR:-2.0}"        # minimum speech segment (ignore very short)
+MAX_SEGMENT_GAP="${MAX_SEGMENT_GAP:-1.5}"        # merge segments closer than this
+MIN_SEGMENTS="${MIN_SEGMENTS:-3}"                # if fewer, switch to fixed (hybrid mode)
+LYRICS_CLEANUP="${LYRICS_CLEANUP:-1}"            # also write <out>.cleaned.txt (lyrics_cleanup filters)
+LYRICS_CACHE="${LYRICS_CACHE:-1}"                # reuse cached segment transcripts (0 = always transcribe)
+LYRICS_CACHE_DB="${LYRICS_CACHE_DB:-$LYRICS_DIR/.cache/transcripts.sqlite}"
 
 command -v ffmpeg  >/dev/null 2>&1 || die "ffmpeg not found"
-command -v ffprobe >/dev/null 2>&1 || die "ffprobe not found"
 command -v python3 >/dev/null 2>&1 || die "python3 not found"
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+[[ -f "$SCRIPT_DIR/lyrics_pipeline.py" ]] || die "lyrics_pipeline.py not found next to $0"
+
 
 # Save meta info
 cat > "$WORK_DIR/meta.txt" <<EOF
@@ -157,114 +169,13 @@ EOF
 
 # --- Preprocess: convert to mono 16kHz WAV ---
 FULL_WAV="${WORK_DIR}/${NAME}.full.wav"
-ffmpeg -y -hide_banner -loglevel error \
-  -i "$IN" -ar 16000 -ac 1 "$FULL_WAV"
-
-# Get total duration
-TOTAL_DUR=$(ffprobe -v error -show_entries format=duration \
-  -of default=noprint_wrappers=1:nokey=1 "$FULL_WAV")
-
-SEG="${WORK_DIR}/segments.tsv"
-
-# ---- Segmentation Strategy ----
-segment_by_silence() {
-  echo "🔍 Mode: Silence detection (threshold: ${SILENCE_THRESHOLD})"
-  SILENCE_LOG="${WORK_DIR}/silence.txt"
-  
-  ffmpeg -i "$FULL_WAV" -af "silencedetect=noise=${SILENCE_THRESHOLD}:d=${SILENCE_DURATION}" \
-    -f null - 2>&1 | grep -E "silence_(start|end)" > "$SILENCE_LOG" || true
-
-  if [[ ! -s "$SILENCE_LOG" ]]; then
-    echo "⚠️  No silence detected"
-    return 1
-  fi
-
-  python3 - <<'PY' "$SILENCE_LOG" "$SEG" "$TOTAL_DUR" "$MIN_SEGMENT_DUR" "$MAX_SEGMENT_GAP"
-import re, sys
-
-silence_log = open(sys.argv[1]).read()
-out_file = sys.argv[2]
-total_dur = float(sys.argv[3])
-min_dur = float(sys.argv[4])
-max_gap = float(sys.argv[5])
-
-silence_starts = []
-silence_ends = []
-
-for line in silence_log.splitlines():
-    if "silence_start:" in line:
-        match = re.search(r"silence_start:\s*([\d.]+)", line)
-        if match:
-            silence_starts.append(float(match.group(1)))
-    elif "silence_end:" in line:
-        match = re.search(r"silence_end:\s*([\d.]+)", line)
-        if match:
-            silence_ends.append(float(match.group(1)))
-
-segments = []
-last_end = 0.0
-
-for i in range(len(silence_starts)):
-    speech_start = last_end
-    speech_end = silence_starts[i]
-    
-    if speech_end > speech_start and (speech_end - speech_start) >= min_dur:
-        segments.append((speech_start, speech_end))
-    
-    if i < len(silence_ends):
-        last_end = silence_ends[i]
-
-if last_end < total_dur and (total_dur - last_end) >= min_dur:
-    segments.append((last_end, total_dur))
-
-# Merge close segments
-merged = []
-for s, e in segments:
-    if not merged:
-        merged.append([s, e])
-        continue
-    ps, pe = merged[-1]
-    if s - pe < max_gap:
-        merged[-1][1] = max(pe, e)
-    else:
-        merged.append([s, e])
-
-with open(out_file, 'w') as f:
-    for s, e in merged:
-        f.write(f"{s:.3f}\t{e:.3f}\n")
-
-print(f"Found {len(merged)} segments via silence detection")
-sys.exit(0 if len(merged) > 0 else 1)
-PY
-  return $?
-}
-
-segment_by_fixed_interval() {
-  local interval=$1
-  echo "📏 Mode: Fixed interval (every ${interval}s)"
-  
-  python3 - <<PY "$SEG" "$TOTAL_DUR" "$interval"
-import sys
-out_file = sys.argv[1]
-total = float(sys.argv[2])
-interval = float(sys.argv[3])
-
-segments = []
-start = 0.0
-while start < total:
-    end = min(start + interval, total)
-    if end - start >= 1.0:  # skip segments shorter than 1s
-        segments.append((start, end))
-    start = end
-
-with open(out_file, 'w') as f:
-    for s, e in segments:
-        f.write(f"{s:.3f}\t{e:.3f}\n")
-
-print(f"Created {len(segments)} segments of ~{interval}s each")
-
-PY
-}
+if [[ -s "$FULL_WAV" && "$FULL_WAV" -nt "$IN" ]]; then
+  echo "♻️  Reusing decoded WAV: $FULL_WAV"
+else
+  ffmpeg -y -hide_banner -loglevel error \
+    -i "$IN" -ar 16000 -ac 1 "$FULL_WAV.part.wav"
+  mv -f "$FULL_WAV.part.wav" "$FULL_WAV"
+fi
 
 read_tty() {
   local prompt="${1-}"
@@ -293,149 +204,27 @@ normalize_interval() {
 MODE="$(normalize_mode "${MODE:-hybrid}")"
 INTERVAL="$(normalize_interval "${INTERVAL:-12}")" || die "Invalid INTERVAL: ${INTERVAL-}"
 
-# Execute segmentation based on mode
-case "$MODE" in
-  auto)
-    if ! segment_by_silence; then
-      echo "❌ Silence detection failed. Try 'fixed' or 'hybrid' mode."
-      exit 3
-    fi
-    ;;
-  fixed)
-    segment_by_fixed_interval "$INTERVAL"
-    ;;
-  hybrid)
-    if segment_by_silence; then
-      NUM_SEGS=$(wc -l < "$SEG")
-      if [[ $NUM_SEGS -lt $MIN_SEGMENTS ]]; then
-        echo "⚠️  Only $NUM_SEGS segments found, switching to fixed interval"
-        segment_by_fixed_interval "$INTERVAL"
-      fi
-    else
-      echo "⚠️  Silence detection failed, using fixed interval"
-      segment_by_fixed_interval "$INTERVAL"
-    fi
-    ;;
-  *)
-    echo "Unknown mode: $MODE (use auto|fixed|hybrid)"
-    exit 1
-    ;;
+# ---- Segment + transcribe + assemble (one python3 process) ----
+OUT="$LYRICS_DIR/lyrics_${NAME}.${LANG_OUT}.srt.txt"
+CLEANED=""
+[[ "$LYRICS_CLEANUP" == "1" ]] && CLEANED="$OUT.cleaned.txt"
+CACHE_ARGS=(--cache "$LYRICS_CACHE_DB")
+[[ "$LYRICS_CACHE" == "1" ]] || CACHE_ARGS=(--no-cache)
+
+rc=0
+python3 "$SCRIPT_DIR/lyrics_pipeline.py" "$FULL_WAV" \
+  --work-dir "$WORK_DIR" --lang "$LANG_OUT" --mode "$MODE" --interval "$INTERVAL" \
+  --model "$MODEL" --whisper-cli "$WHISPER_CLI" \
+  --silence-threshold "$SILENCE_THRESHOLD" --silence-duration "$SILENCE_DURATION" \
+  --min-segment-dur "$MIN_SEGMENT_DUR" --max-segment-gap "$MAX_SEGMENT_GAP" \
+  --min-segments "$MIN_SEGMENTS" "${CACHE_ARGS[@]}" --out "$OUT" --cleaned "$CLEANED" || rc=$?
+case "$rc" in
+  0) ;;
+  3) exit 3 ;;
+  *) die "lyrics_pipeline.py failed (exit $rc)" ;;
 esac
 
-if [[ ! -s "$SEG" ]]; then
-  echo "❌ No segments created"
-  exit 3
-fi
-
-# Helper: sec -> SRT timestamp
-sec_to_srt() {
-  python3 - "$1" <<'PY'
-import sys, math
-t=float(sys.argv[1])
-if t < 0: t = 0.0
-
-hh = int(t // 3600); t -= hh*3600
-mm = int(t // 60);   t -= mm*60
-ss = int(t);         t -= ss
-ms = int(round(t*1000))
-
-# handle rounding overflow
-if ms >= 1000:
-    ss += 1
-    ms -= 1000
-if ss >= 60:
-    mm += 1
-    ss -= 60
-if mm >= 60:
-    hh += 1
-    mm -= 60
-
-print(f"{hh:02d}:{mm:02d}:{ss:02d},{ms:03d}")
-PY
-}
-
-
-# ---- Slice + transcribe ----
-echo "🎵 Transcribing segments..."
-MERGED="${WORK_DIR}/lyrics.${LANG_OUT}.srt.txt"
-: > "$MERGED"
-
-i=0
-total_segs=$(wc -l < "$SEG")
-
-while IFS=$'\t' read -r S E; do
-  i=$((i+1))
-  echo -ne "  [$i/$total_segs] "
-  
-DUR="$(python3 - <<'PY' "$S" "$E"
-import sys
-s=float(sys.argv[1]); e=float(sys.argv[2])
-print(f"{e-s:.3f}")
-PY
-)"
-
-  SEG_WAV="${WORK_DIR}/wav/seg_${i}.wav"
-  SEG_TXT="${WORK_DIR}/txt/seg_${i}.txt"
-
-  ffmpeg -y -hide_banner -loglevel error \
-    -i "$FULL_WAV" -ss "$S" -t "$DUR" -ar 16000 -ac 1 "$SEG_WAV"
-
-  "$WHISPER_CLI" -m "$MODEL" -l "$LANG_OUT" -f "$SEG_WAV" -nt > "$SEG_TXT" 2>&1 || true
-
-  # Extract clean text (remove timestamps, keep only lyrics)
-  CLEAN="$(python3 - <<'PY' "$SEG_TXT"
-import sys, re
-txt=open(sys.argv[1],encoding="utf-8",errors="ignore").read().splitlines()
-out=[]
-for line in txt:
-    l=line.strip()
-    if not l: 
-        continue
-    # Drop logs (be more specific to avoid filtering lyrics)
-    if any(l.lower().startswith(k) for k in ["whisper_", "ggml_", "main:", "system_info:"]):
-        continue
-    if any(k in l.lower() for k in ["loading model", "gpu device", "metal total size", "model size", "processing", "print_timings", "fallbacks", "deallocating"]):
-        continue
-    
-    # Remove timestamps from line: [00:00:00.000 --> 00:00:05.000]
-    l_no_ts = re.sub(r'\[\d\d:\d\d:\d\d\.\d+ --> \d\d:\d\d:\d\d\.\d+\]\s*', '', l)
-    l_no_ts = l_no_ts.strip()
-    
-    if not l_no_ts:
-        continue
-    
-    # Keep lines with letters (for English) or CJK (for Asian languages) or music symbols
-    if re.search(r'[a-zA-Z\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af♪~]', l_no_ts):
-        out.append(l_no_ts)
-
-if not out:
-    # Fallback: take last non-empty, non-log lines
-    for line in txt[-15:]:
-        l=line.strip()
-        if l and not any(k in l.lower() for k in ["whisper_", "load", "model", "error:", "init", "ggml", "metal", "timings"]):
-            l_clean = re.sub(r'\[.*?\]', '', l).strip()
-            if l_clean and len(l_clean) > 3:
-                out.append(l_clean)
-                
-print(" ".join(out))
-PY
-)"
-
-  START_SRT="$(sec_to_srt "$S")"
-  END_SRT="$(sec_to_srt "$E")"
-
-  {
-    echo "$i"
-    echo "${START_SRT} --> ${END_SRT}"
-    echo "${CLEAN:-[音楽] }"
-    echo
-  } >> "$MERGED"
-  
-  echo "✓"
-done < "$SEG"
-
-OUT="$LYRICS_DIR/lyrics_${NAME}.${LANG_OUT}.srt.txt"
-cp "$MERGED" "$OUT"
+i=$(wc -l < "$WORK_DIR/segments.tsv")
 
 ux_tip "Tips" \
   "hybrid mode with different interval: $0 \"$IN\" $LANG_OUT hybrid 8" \
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+lyrics_bench.py
+Micro-benchmark for lyrics_cleanup.should_drop_block.
+
+Compares the single-pass feature extractor against the previous rule code
+(kept below verbatim as the reference) on synthetic Whisper-style blocks,
+and checks that both make the same drop decisions (the opt-in phrase-loop
+rule is off, as by default).
+
+--worst-case times the old regex repetition path against analyze_repetition
+on adversarial long lines (long separator runs, near-miss wa chains, phrase
+loops), plus the cost of the opt-in phrase-loop scan on its own.
+
+--suite times the cleaning phases separately (parse / classify / format /
+whole-file clean) on a synthetic SRT corpus: blocks/s, best of --repeat, and
+peak traced memory per phase. Results are compared with the stored baseline
+($TOOLBOX_DIR/_out/lyrics_bench/baseline.json) and appended to history.jsonl
+there; --save-baseline makes this run the new baseline.
+
+--generate DIR writes the same kind of corpus as files, e.g. for lyrics_cleanup
+batch runs or lyrics_corpus.py.
+
+Usage:
+  python3 lyrics_bench.py
+  python3 lyrics_bench.py --blocks 500000 --repeat 5
+  python3 lyrics_bench.py --worst-case
+  python3 lyrics_bench.py --suite --save-baseline
+  python3 lyrics_bench.py --suite --fail-over 15
+  python3 lyrics_bench.py --generate /tmp/lyrics_corpus --files 200 --blocks 400
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lyrics_cleanup as lc  # noqa: E402
+
+
+# ---------------- Reference: rules before the feature extractor ----------------
+def legacy_normalize_line(s: str) -> str:
+    return re.sub(r"[ \t]+", " ", s.strip())
+
+def legacy_is_music_marker(line: str) -> bool:
+    t = legacy_normalize_line(line)
+    if not t:
+        return True
+    for m in lc.MUSIC_MARKERS:
+        if t == m:
+            return True
+    return False
+
+def legacy_is_noise_only(line: str) -> bool:
+    t = legacy_normalize_line(line)
+    if not t:
+        return True
+    if lc.NOISE_ONLY_RE.match(t):
+        return True
+    return False
+
+def legacy_kana_ratio(s: str) -> float:
+    if not s:
+        return 0.0
+    total = len(s)
+    kana = len(lc.KANA_RE.findall(s))
+    return kana / max(total, 1)
+
+def legacy_looks_like_vocalize_gibberish(text: str, *, wa_threshold: int = 12) -> bool:
+    t = legacy_normalize_line(text)
+    if not t:
+        return True
+    if lc.REPEAT_CHAR_RE.search(t):
+        return True
+    if lc.REPEAT_WAWA_RE.search(t):
+        return True
+    if lc.ALL_WA_RE.match(t):
+        wa_count = sum(1 for ch in t if ch in ("わ", "ワ", "ﾜ"))
+        if wa_count >= wa_threshold:
+            return True
+    return False
+
+def legacy_should_drop_block(block: lc.Block, *, min_text_len: int = 2,
+                             min_kana_ratio: float = 0.10,
+                             drop_music_markers: bool = True,
+                             drop_vocalize: bool = True) -> Tuple[bool, str]:
+    joined = " ".join(legacy_normalize_line(x) for x in block.lines if legacy_normalize_line(x))
+    joined = legacy_normalize_line(joined)
+
+    if not joined or len(joined) < min_text_len:
+        return True, "empty_or_too_short"
+
+    if drop_music_markers:
+        if all(legacy_is_music_marker(x) or legacy_is_noise_only(x) for x in block.lines):
+            return True, "music_marker_only"
+        if any(legacy_is_music_marker(x) for x in block.lines) and len(joined) <= 6:
+            return True, "music_marker_short"
+
+    if all(legacy_is_noise_only(x) for x in block.lines):
+        return True, "noise_only"
+
+    if drop_vocalize and legacy_looks_like_vocalize_gibberish(joined):
+        return True, "vocalize_gibberish"
+
+    has_ascii_letters = bool(re.search(r"[A-Za-z]", joined))
+    if not has_ascii_letters:
+        kr = legacy_kana_ratio(joined)
+        has_cjk = bool(re.search(r"[\u4E00-\u9FFF]", joined))
+        if not has_cjk and kr < min_kana_ratio:
+            return True, f"low_kana_ratio({kr:.2f})"
+
+    return False, "keep"
+
+
+# ---------------- Synthetic blocks ----------------
+LYRIC_LINES = [
+    "君の名前を呼んだ", "夜空に光る星", "ありがとう 世界", "もう一度だけ  会いたい",
+    "Hello my friend", "Thank you", "いつか\tきっと", "僕らは走り続ける",
+    "사랑해요", "강남 스타일", "ラララ ラララ", "Oh oh oh", "涙の跡",
+]
+NOISE_LINES = [
+    "♪", "♪~", "[音楽]", "（音楽）", "(music)", "---", "。。", "...", "【】", "!?", "  ", "",
+    "わーわーわーわーわーわーわーわー", "ﾜﾜﾜﾜﾜﾜﾜﾜﾜﾜﾜﾜ", "あああああああああああ", "ーーー", "123", "、、、",
+]
+
+def make_blocks(n: int, seed: int = 0, noise_share: float = 0.35) -> List[lc.Block]:
+    """
+    Deterministic Whisper-like mix: mostly lyrics, some markers / vocalize / noise,
+    occasional multi-line blocks.
+    """
+    rnd = random.Random(seed)
+    blocks: List[lc.Block] = []
+    for i in range(1, n + 1):
+        k = 1 if rnd.random() < 0.8 else rnd.randint(2, 3)
+        lines = [rnd.choice(NOISE_LINES if rnd.random() < noise_share else LYRIC_LINES) for _ in range(k)]
+        s = i * 3
+        ts = f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d},000 --> {s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d},900"
+        blocks.append(lc.Block(str(i), ts, lines))
+    return blocks
+
+
+# ---------------- Worst-case repetition inputs ----------------
+def worst_case_lines(scale: int = 1) -> List[Tuple[str, str]]:
+    """
+    (name, line) pairs that make the regex path rescan: every start position
+    re-walks a long separator run, and each chain stops one short of a match.
+    """
+    return [
+        ("near-miss wa chains", (("わ" + "ー-~ " * 40) * 6 + "x") * 100 * scale),
+        ("near-miss Wa/wa chains", (("Wa" + "ー -~" * 40 + "wA" + " ~" * 60) * 3 + "!") * 50 * scale),
+        ("wa + long separator tail", "わ" + "ー-" * 10000 * scale),
+        ("long char run", "ー" * 20000 * scale),
+        ("phrase loop 5 words x30", "i will always love you " * 30 * scale),
+        ("jp phrase loop", "ありがとうございます" * 200 * scale),
+    ]
+
+def legacy_repetition(t: str) -> bool:
+    return bool(lc.REPEAT_CHAR_RE.search(t) or lc.REPEAT_WAWA_RE.search(t))
+
+def run_worst_case(repeat: int) -> None:
+    print(f"{'input':<26} {'chars':>7} {'regex ms':>9} {'linear ms':>10} {'+loops ms':>10}  "
+          f"detected (regex / linear)")
+    for name, line in worst_case_lines():
+        t_old = bench(lambda: legacy_repetition(line), repeat)
+        t_new = bench(lambda: lc.analyze_repetition(line), repeat)
+        t_loop = bench(lambda: lc.analyze_repetition(line, loops=True), repeat)
+        st = lc.analyze_repetition(line, loops=True)
+        new = st.char_run >= lc.REPEAT_CHAR_MIN or st.wa_repeats >= lc.WA_REPEAT_MIN
+        loop = f" + loop {st.loop_repeats}x{st.loop_period}" if lc.is_phrase_loop(st) else ""
+        print(f"{name:<26} {len(line):>7} {t_old * 1000:>9.2f} {t_new * 1000:>10.2f} {t_loop * 1000:>10.2f}  "
+              f"{legacy_repetition(line)} / {new}{loop}")
+
+def bench(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# ---------------- Synthetic SRT corpus ----------------
+TOOLBOX_DIR = os.environ.get("TOOLBOX_DIR", os.path.expanduser("~/toolbox"))
+BENCH_DIR = os.path.join(TOOLBOX_DIR, "_out", "lyrics_bench")
+
+JA_LINES = ["君の名前を呼んだ", "夜空に光る星", "もう一度だけ  会いたい", "いつか\tきっと", "僕らは走り続ける", "涙の跡"]
+EN_LINES = ["Hello my friend", "Thank you", "Oh oh oh", "I will always love you", "Under the neon lights"]
+ZH_LINES = ["月亮代表我的心", "我们一起走过", "你的眼睛", "风吹过的地方"]
+MARKER_LINES = ["♪", "♪~", "♪～", "[音楽]", "（音楽）", "(music)", "♫ ♫"]
+GIBBERISH_LINES = ["わーわーわーわーわーわーわーわー", "ﾜﾜﾜﾜﾜﾜﾜﾜﾜﾜﾜﾜ", "あああああああああああ", "wa-wa-wa-wa-wa-wa-wa-wa", "ーーー"]
+
+# share of blocks per kind (normalized)
+DEFAULT_MIX = {"ja": 30, "en": 15, "zh": 10, "marker": 15, "gibberish": 12, "long": 3, "malformed": 5, "multi": 10}
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    "ja=30,en=15,..." -> weights; unknown kinds are an error, missing kinds keep their default.
+    """
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        kind, _, w = part.partition("=")
+        if kind not in mix:
+            raise ValueError(f"unknown kind '{kind}' (use {', '.join(mix)})")
+        mix[kind] = float(w)
+    return mix
+
+def _long_line(rnd: random.Random) -> str:
+    # pathological repetition: phrase loops, long runs, near-miss wa chains
+    choice = rnd.randrange(3)
+    if choice == 0:
+        return rnd.choice(JA_LINES + EN_LINES) * rnd.randint(20, 60)
+    if choice == 1:
+        return rnd.choice("ーあ♪~") * rnd.randint(200, 2000)
+    return ("わ" + "ー-~ " * 30) * 6 + "x"
+
+def _ts(ms: int) -> str:
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+def generate_srt(n: int, seed: int = 0, mix: Optional[Dict[str, float]] = None) -> str:
+    """
+    Deterministic Whisper-like transcript of n blocks (malformed ones included).
+    """
+    rnd = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    pools = {"ja": JA_LINES, "en": EN_LINES, "zh": ZH_LINES, "marker": MARKER_LINES, "gibberish": GIBBERISH_LINES}
+    out: List[str] = []
+    t = 0
+    for i in range(1, n + 1):
+        kind = rnd.choices(kinds, weights)[0]
+        dur = rnd.randint(800, 6000)
+        ts = f"{_ts(t)} --> {_ts(t + dur)}"
+        t += dur + rnd.randint(0, 1500)
+        if kind == "malformed":
+            bad = rnd.randrange(4)
+            if bad == 0:    # garbage line where the timestamp should be
+                out.append(f"{i}\n00:00:xx,000 -> broken\n{rnd.choice(JA_LINES)}\n")
+            elif bad == 1:  # index missing
+                out.append(f"{ts}\n{rnd.choice(EN_LINES)}\n")
+            elif bad == 2:  # no blank line before the next block
+                out.append(f"{i}\n{ts}\n{rnd.choice(ZH_LINES)}")
+            else:           # stray text between blocks
+                out.append(f"-- stray line {i} --\n\n{i}\n{ts}\n{rnd.choice(JA_LINES)}\n")
+            continue
+        if kind == "long":
+            lines = [_long_line(rnd)]
+        elif kind == "multi":
+            lines = [rnd.choice(JA_LINES + EN_LINES + ZH_LINES) for _ in range(rnd.randint(2, 4))]
+        else:
+            lines = [rnd.choice(pools[kind])]
+        out.append(f"{i}\n{ts}\n" + "\n".join(lines) + "\n")
+    return "\n".join(out)
+
+def write_corpus(out_dir: str, files: int, blocks: int, seed: int, mix: Dict[str, float]) -> int:
+    os.makedirs(out_dir, exist_ok=True)
+    for k in range(files):
+        with open(os.path.join(out_dir, f"synthetic{k:04d}.ja.srt.txt"), "w", encoding="utf-8") as f:
+            f.write(generate_srt(blocks, seed + k, mix))
+    return files * blocks
+
+
+# ---------------- Phase suite ----------------
+DEFAULT_OPTS: Dict[str, object] = {
+    "min_text_len": 2, "min_kana_ratio": 0.10, "drop_music": True, "drop_vocalize": True, "drop_loops": False,
+    "plain": False, "renumber": True, "inplace": False, "write_dropped": False,
+}
+
+def measure(fn: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """
+    (best wall time, peak traced bytes). Memory is taken on a separate run so
+    tracemalloc does not slow the timed ones.
+    """
+    best = bench(fn, repeat)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def run_suite(n_blocks: int, repeat: int, seed: int, mix: Dict[str, float]) -> Dict[str, object]:
+    text = generate_srt(n_blocks, seed, mix)
+    lines = text.splitlines()
+    blocks = list(lc.iter_blocks(lines))
+    verdicts = [lc.should_drop_block(b) for b in blocks]
+    kept = [b for b, (drop, _) in zip(blocks, verdicts) if not drop]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "bench.srt.txt")
+        with open(src, "w", encoding="utf-8") as f:
+            f.write(text)
+        out = os.path.join(tmp, "bench.cleaned.txt")
+        phases = {
+            "parse": (lambda: list(lc.iter_blocks(lines)), len(blocks)),
+            "classify": (lambda: [lc.should_drop_block(b) for b in blocks], len(blocks)),
+            "format": (lambda: lc.format_blocks(kept), len(kept)),
+            "format_plain": (lambda: lc.format_plain(kept), len(kept)),
+            "clean_file": (lambda: lc.clean_file(src, out, DEFAULT_OPTS), len(blocks)),
+        }
+        results: Dict[str, Dict[str, float]] = {}
+        for name, (fn, n) in phases.items():
+            sec, peak = measure(fn, repeat)
+            results[name] = {"seconds": sec, "blocks_per_s": n / sec if sec else 0.0, "peak_bytes": peak, "blocks": n}
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "blocks": len(blocks),
+        "kept": len(kept),
+        "seed": seed,
+        "mix": mix,
+        "phases": results,
+    }
+
+def load_baseline(path: str) -> Optional[Dict[str, object]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def report_suite(res: Dict[str, object], base: Optional[Dict[str, object]], fail_over: float) -> int:
+    """
+    Print the phase table (with % change vs baseline); 1 if a phase got slower than fail_over %.
+    """
+    comparable = base is not None and base.get("blocks") == res["blocks"] and base.get("mix") == res["mix"]
+    if base is not None and not comparable:
+        print("[WARN] baseline was taken with a different corpus (blocks/mix); not comparing")
+    print(f"corpus: {res['blocks']} blocks parsed, {res['kept']} kept")
+    print(f"{'phase':<13} {'seconds':>9} {'blocks/s':>12} {'peak MiB':>9}  vs baseline")
+    slower = []
+    for name, r in res["phases"].items():
+        delta = ""
+        if comparable and name in base["phases"]:
+            old = base["phases"][name]["seconds"]
+            pct = (r["seconds"] - old) / old * 100 if old else 0.0
+            delta = f"{pct:+6.1f}%"
+            if fail_over and pct > fail_over:
+                slower.append(f"{name} {pct:+.1f}%")
+        print(f"{name:<13} {r['seconds']:>9.4f} {r['blocks_per_s']:>12,.0f} {r['peak_bytes'] / 2**20:>9.2f}  {delta}")
+    if slower:
+        print(f"[ERROR] slower than baseline by more than {fail_over:g}%: {', '.join(slower)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmark should_drop_block (feature extractor vs legacy rules).")
+    ap.add_argument("--blocks", type=int, default=None,
+                    help="Synthetic blocks (default: 200000; 50000 with --suite; 400 per file with --generate)")
+    ap.add_argument("--repeat", type=int, default=3, help="Timing runs, best is reported (default: 3)")
+    ap.add_argument("--seed", type=int, default=0, help="Corpus seed (default: 0)")
+    ap.add_argument("--worst-case", action="store_true", help="Only run the adversarial repetition inputs")
+    ap.add_argument("--suite", action="store_true",
+                    help="Time parse/classify/format/clean_file on a synthetic SRT corpus")
+    ap.add_argument("--mix", default="", help=f"Corpus mix, e.g. 'ja=50,long=0' (kinds: {', '.join(DEFAULT_MIX)})")
+    ap.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"),
+                    help="Baseline file (default: $TOOLBOX_DIR/_out/lyrics_bench/baseline.json)")
+    ap.add_argument("--save-baseline", action="store_true", help="--suite: store this run as the baseline")
+    ap.add_argument("--fail-over", type=float, default=0.0,
+                    help="--suite: exit 1 if a phase is slower than the baseline by more than this %%")
+    ap.add_argument("--generate", metavar="DIR", help="Write a synthetic corpus to DIR (--files x --blocks) and exit")
+    ap.add_argument("--files", type=int, default=100, help="--generate: number of files (default: 100)")
+    args = ap.parse_args()
+
+    if args.worst_case:
+        run_worst_case(args.repeat)
+        return 0
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"[ERROR] --mix: {e}", file=sys.stderr)
+        return 2
+
+    if args.blocks is None:
+        args.blocks = 400 if args.generate else 50_000 if args.suite else 200_000
+    if args.generate:
+        n = write_corpus(args.generate, args.files, args.blocks, args.seed, mix)
+        print(f"[OK] {args.files} files, {n} blocks -> {args.generate}")
+        return 0
+
+    if args.suite:
+        res = run_suite(args.blocks, args.repeat, args.seed, mix)
+        rc = report_suite(res, load_baseline(args.baseline), args.fail_over)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(os.path.join(os.path.dirname(os.path.abspath(args.baseline)), "history.jsonl"), "a",
+                  encoding="utf-8") as f:
+            f.write(json.dumps(res, ensure_ascii=False) + "\n")
+        if args.save_baseline:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(res, f, ensure_ascii=False, indent=2)
+            print(f"[OK] baseline saved: {args.baseline}")
+        return rc
+
+    blocks = make_blocks(args.blocks, args.seed)
+
+    mismatches = 0
+    for b in blocks:
+        new, old = lc.should_drop_block(b), legacy_should_drop_block(b)
+        if new == old:
+            continue
+        mismatches += 1
+        if mismatches <= 5:
+            print(f"[ERROR] mismatch: {b.lines!r} new={new} old={old}", file=sys.stderr)
+    if mismatches:
+        print(f"[ERROR] {mismatches} decision(s) differ from the legacy rules", file=sys.stderr)
+        return 1
+    print(f"[OK] decisions identical on {len(blocks)} blocks")
+
+    t_old = bench(lambda: [legacy_should_drop_block(b) for b in blocks], args.repeat)
+    t_new = bench(lambda: [lc.should_drop_block(b) for b in blocks], args.repeat)
+    print(f"legacy   {t_old:7.3f} s  {len(blocks) / t_old:>10,.0f} blocks/s")
+    print(f"features {t_new:7.3f} s  {len(blocks) / t_new:>10,.0f} blocks/s")
+    print(f"speedup  {t_old / t_new:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -10,15 +10,24 @@ Usage:
   python3 lyrics_cleanup.py input.srt.txt -o cleaned.srt.txt
   python3 lyrics_cleanup.py input.srt.txt --inplace
   python3 lyrics_cleanup.py input.srt.txt -o cleaned.srt.txt --keep-index
+
+Batch mode (several inputs, a directory or a glob; files run in a process pool):
+  python3 lyrics_cleanup.py ~/toolbox/_out/Lyrics
+  python3 lyrics_cleanup.py "~/toolbox/_out/Lyrics/*.ja.srt.txt" --inplace -j 8
+  python3 lyrics_cleanup.py lyrics_dir/ -r -o cleaned_dir/
+  Files whose cleaned output is already newer than the input are skipped (--force to redo).
 """
 
 from __future__ import annotations
 import argparse
+import fnmatch
+import glob
 import os
 import re
 import sys
-from dataclasses import dataclass
-from typing import List, Tuple
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
 
 
 TIME_RE = re.compile(r"^\s*\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3}\s*$")
@@ -29,6 +38,7 @@ MUSIC_MARKERS = [
     "[音楽]", "（音楽）", "(music)", "[music]",
     "【音楽】", "【music】",
 ]
+MUSIC_MARKER_SET = frozenset(MUSIC_MARKERS)
 
 # Lines that are basically separators/noise
 NOISE_ONLY_RE = re.compile(r"^[\s\-\_\=\~\.\,\!\?\[\]\(\)【】「」『』（）]+$")
@@ -37,279 +47,713 @@ NOISE_ONLY_RE = re.compile(r"^[\s\-\_\=\~\.\,\!\?\[\]\(\)【】「」『』（
 KANA_RE = re.compile(r"[\u3040-\u309F\u30A0-\u30FF]")  # hiragana+katakana
 
 # Long vowel mark "ー" and small tsu etc are included in kana block checks via explicit patterns
+# REPEAT_WAWA_RE documents the rule; analyze_repetition() implements it without the
+# nested quantifier (which rescans separator runs from every start position).
 REPEAT_CHAR_RE = re.compile(r"(.)\1{9,}")  # any same char repeated 10+ times
 REPEAT_WAWA_RE = re.compile(r"(わ|ワ|ﾜ|Wa|wa)([ー\-~ ]*\1){6,}", re.IGNORECASE)  # "わーわー..." many times
 ALL_WA_RE = re.compile(r"^[\sわワﾜー\-~]+$")  # only wa and elongations
 
-@dataclass
-class Block:
+REPEAT_CHAR_MIN = 10        # same char 10+ times in a row
+WA_REPEAT_MIN = 7           # same wa unit 7+ times, only "ー - ~ " between
+WA_CHARS = frozenset("わワﾜ")
+# wa chains: fold "wa" (any case) into one private-use char, delete the separators,
+# then a chain is a plain run of one unit char (single-char backreference: linear)
+WA_LATIN_UNIT = "\ue000"
+WA_SEPARATORS = "ー-~ "
+WA_RUN_RE = re.compile("([わワﾜ\ue000])\\1{%d,}" % (WA_REPEAT_MIN - 1))
+
+# Whisper phrase loops ("i will always love you i will always love you ..."):
+# a unit of LOOP_MIN_PERIOD..LOOP_MAX_PERIOD chars (whitespace ignored, case-folded,
+# at least one letter) repeated LOOP_MIN_REPEATS+ times back to back, covering at
+# least LOOP_MIN_CHARS chars. Opt-in (--drop-phrase-loops): sung refrains repeat
+# too ("na na na", "ありがとう" x8), so only far longer loops than those qualify.
+LOOP_MIN_PERIOD = 8
+LOOP_MIN_REPEATS = 10
+LOOP_MIN_CHARS = 120
+LOOP_MAX_PERIOD = 64
+LOOP_ANCHOR = 8             # anchor k-gram length and stride (< LOOP_MIN_CHARS / 2)
+
+WS_RUN_RE = re.compile(r"[ \t]+")
+
+# Script classes for the one-pass str.translate count. Each class maps to a
+# control char that cannot survive normalize (\x01..\x04 in the input are deleted).
+_KANA, _CJK, _ASCII, _HANGUL = "\x01", "\x02", "\x03", "\x04"
+CLASS_TABLE: Dict[int, Optional[str]] = {
+    **dict.fromkeys(range(0x01, 0x05)),
+    **dict.fromkeys(range(0x3040, 0x3100), _KANA),     # hiragana + katakana (= KANA_RE)
+    **dict.fromkeys(range(0x4E00, 0xA000), _CJK),      # CJK Unified Ideographs
+    **dict.fromkeys(range(0xAC00, 0xD7B0), _HANGUL),   # Hangul syllables
+    **dict.fromkeys(map(ord, "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"), _ASCII),
+}
+
+class Block(NamedTuple):
     raw_index: str
     timestamp: str
     lines: List[str]  # text lines (1+)
 
+class Skipped(NamedTuple):
+    """Lines the parser could not read as a block (1-based, inclusive)."""
+    start: int
+    end: int
+    first: str  # first skipped line, for the dropped log
+
 def normalize_line(s: str) -> str:
     # Normalize some common whitespace
-    return re.sub(r"[ \t]+", " ", s.strip())
+    t = s.strip()
+    if "  " not in t and "\t" not in t:
+        return t  # nothing to collapse (the common case): skip the regex
+    return WS_RUN_RE.sub(" ", t)
 
 def is_music_marker(line: str) -> bool:
     t = normalize_line(line)
-    if not t:
-        return True
-    for m in MUSIC_MARKERS:
-        if t == m:
-            return True
-    return False
+    return not t or t in MUSIC_MARKER_SET
 
 def is_noise_only(line: str) -> bool:
     t = normalize_line(line)
-    if not t:
-        return True
-    if NOISE_ONLY_RE.match(t):
-        return True
-    return False
+    return not t or NOISE_ONLY_RE.match(t) is not None
 
 def kana_ratio(s: str) -> float:
     if not s:
         return 0.0
-    total = len(s)
-    kana = len(KANA_RE.findall(s))
-    return kana / max(total, 1)
+    return s.translate(CLASS_TABLE).count(_KANA) / len(s)
+
+class RepetitionStats(NamedTuple):
+    char_run: int       # longest run of one char if >= REPEAT_CHAR_MIN, else 0 (spaces count)
+    wa_repeats: int     # longest chain of the same わ/ワ/ﾜ/wa unit joined only by "ー - ~ " if >= WA_REPEAT_MIN, else 0
+    loop_period: int    # period (chars) of the longest phrase loop, 0 if none
+    loop_repeats: int
+    loop_chars: int     # chars covered by whole repetitions of that loop
+
+def _wa_chain(t: str) -> int:
+    low = t.lower()
+    latin = "wa" in low
+    if not latin and not any(c in t for c in WA_CHARS):  # substring tests: C speed on long lines
+        return 0
+    c = low.replace("wa", WA_LATIN_UNIT) if latin else t
+    for sep in WA_SEPARATORS:  # str.replace stays fast on non-ASCII text (translate does not)
+        c = c.replace(sep, "")
+    return max((len(m.group(0)) for m in WA_RUN_RE.finditer(c)), default=0)
+
+def _phrase_loop(s: str) -> Tuple[int, int]:
+    """
+    Longest back-to-back repetition of a LOOP_MIN_PERIOD..LOOP_MAX_PERIOD char unit
+    containing a letter, as (period, repeats).
+    Anchors every LOOP_ANCHOR chars: find the anchor k-gram's next occurrence within
+    one period (str.find on a bounded window) and verify whole units with startswith.
+    Every loop covering >= LOOP_MIN_CHARS contains an anchor, and each anchor costs
+    O(LOOP_MAX_PERIOD) C-level work, so the scan is linear.
+    """
+    n = len(s)
+    best_p = best_k = 0
+    i = lo = 0  # lo: backward extension stops here (end of the last short-period run)
+    while i + LOOP_ANCHOR <= n:
+        gram = s[i:i + LOOP_ANCHOR]
+        j = s.find(gram, i + LOOP_MIN_PERIOD, i + LOOP_MAX_PERIOD + LOOP_ANCHOR)
+        jumped = False
+        while j >= 0:
+            p = j - i
+            unit = s[i:j]
+            # maximal region with period p: whole units (startswith), then the
+            # partial unit at each end, since the anchor may sit mid-unit
+            end = j
+            while s.startswith(unit, end):
+                end += p
+            while end < n and s[end] == s[end - p]:
+                end += 1
+            start = i
+            while start - p >= lo and s.startswith(unit, start - p):
+                start -= p
+            while start > lo and s[start - 1] == s[start - 1 + p]:
+                start -= 1
+            k = (end - start) // p
+            q = (unit + unit).find(unit, 1)  # smallest period of the unit (divides p)
+            # a phrase: the unit is not itself a shorter loop ("hahahaha", "ーーーー")
+            # and is not just separators / punctuation ("-~-~")
+            if q == p and k >= 2 and k * p > best_k * best_p and any(c.isalpha() for c in unit):
+                best_p, best_k = p, k
+            if q < p:
+                # short-period run (separators, "hahaha"): no phrase inside it. A phrase
+                # loop can only overlap it by less than p + q chars, so resume at its end
+                i = lo = end
+                jumped = True
+                break
+            if k >= LOOP_MIN_REPEATS:
+                i = end  # the rest of this loop cannot give a longer one
+                jumped = True
+                break
+            j = s.find(gram, j + 1, i + LOOP_MAX_PERIOD + LOOP_ANCHOR)
+        if not jumped:
+            i += LOOP_ANCHOR
+    return best_p, best_k
 
-def looks_like_vocalize_gibberish(text: str, *, wa_threshold: int = 12) -> bool:
+def analyze_repetition(t: str, *, loops: bool = False) -> RepetitionStats:
+    """
+    Linear-time repetition analysis of one normalized line: character runs,
+    wa-syllable chains and (loops=True) phrase loops.
+    """
+    char_run = 0
+    m = REPEAT_CHAR_RE.search(t)  # no run (the common case): one scan, like the old regex
+    if m:
+        char_run = max((len(x.group(0)) for x in REPEAT_CHAR_RE.finditer(t, m.end())), default=len(m.group(0)))
+    wa = _wa_chain(t)
+
+    period = repeats = 0
+    if loops and len(t) >= LOOP_MIN_CHARS:
+        s = "".join(t.lower().split())
+        if len(s) >= LOOP_MIN_CHARS:
+            period, repeats = _phrase_loop(s)
+    return RepetitionStats(char_run, wa, period, repeats, period * repeats)
+
+def is_phrase_loop(stats: RepetitionStats) -> bool:
+    return stats.loop_repeats >= LOOP_MIN_REPEATS and stats.loop_chars >= LOOP_MIN_CHARS
+
+def looks_like_vocalize_gibberish(text: str, *, wa_threshold: int = 12,
+                                  stats: Optional[RepetitionStats] = None) -> bool:
     """
     Detect "わわわ..." or "わーわー..." or extreme repetition.
     """
     t = normalize_line(text)
     if not t:
         return True
+    st = stats or analyze_repetition(t)
 
     # Many repeated same character
-    if REPEAT_CHAR_RE.search(t):
+    if st.char_run >= REPEAT_CHAR_MIN:
         return True
 
     # Common vocalize patterns
-    if REPEAT_WAWA_RE.search(t):
+    if st.wa_repeats >= WA_REPEAT_MIN:
         return True
 
     if ALL_WA_RE.match(t):
         # Count wa-like characters; if too many, drop
-        wa_count = sum(1 for ch in t if ch in ("わ", "ワ", "ﾜ"))
+        wa_count = t.count("わ") + t.count("ワ") + t.count("ﾜ")
         if wa_count >= wa_threshold:
             return True
 
     return False
 
+class BlockFeatures(NamedTuple):
+    """Everything the drop rules look at, computed once per block."""
+    joined: str          # normalized lines joined with " "
+    n_lines: int
+    marker_lines: int    # empty or exact music marker
+    noise_lines: int     # empty or separators/brackets only
+    marker_or_noise: int
+    kana: int            # script class counts over `joined`
+    cjk: int
+    ascii_letters: int
+    hangul: int
+    other: int           # digits, spaces, punctuation, symbols, other scripts
+
+def extract_features(block: Block) -> BlockFeatures:
+    """
+    Normalize each line once; marker membership via a set; one translate pass
+    over the joined text for the script class counts.
+    """
+    marker = noise = either = 0
+    parts: List[str] = []
+    for line in block.lines:
+        t = normalize_line(line)
+        if not t:
+            marker += 1
+            noise += 1
+            either += 1
+            continue
+        parts.append(t)
+        is_marker = t in MUSIC_MARKER_SET
+        is_noise = NOISE_ONLY_RE.match(t) is not None
+        marker += is_marker
+        noise += is_noise
+        either += is_marker or is_noise
+
+    joined = " ".join(parts)  # already normalized: parts have no edge/double whitespace
+    classes = joined.translate(CLASS_TABLE)
+    kana = classes.count(_KANA)
+    cjk = classes.count(_CJK)
+    ascii_letters = classes.count(_ASCII)
+    hangul = classes.count(_HANGUL)
+    return BlockFeatures(
+        joined=joined,
+        n_lines=len(block.lines),
+        marker_lines=marker,
+        noise_lines=noise,
+        marker_or_noise=either,
+        kana=kana,
+        cjk=cjk,
+        ascii_letters=ascii_letters,
+        hangul=hangul,
+        other=len(joined) - kana - cjk - ascii_letters - hangul,
+    )
+
 def should_drop_block(block: Block, *, min_text_len: int = 2,
                       min_kana_ratio: float = 0.10,
                       drop_music_markers: bool = True,
-                      drop_vocalize: bool = True) -> Tuple[bool, str]:
+                      drop_vocalize: bool = True,
+                      drop_phrase_loops: bool = False,
+                      features: Optional[BlockFeatures] = None) -> Tuple[bool, str]:
     """
     Decide to drop a block or keep it.
     Returns (drop?, reason).
+    The rules only read `features` (computed here unless passed in).
     """
-    # Join all lines for holistic checks
-    joined = " ".join(normalize_line(x) for x in block.lines if normalize_line(x))
-    joined = normalize_line(joined)
+    f = features or extract_features(block)
+    joined = f.joined
 
     if not joined or len(joined) < min_text_len:
         return True, "empty_or_too_short"
 
     # Drop explicit music markers and bracketed music notes
     if drop_music_markers:
-        if all(is_music_marker(x) or is_noise_only(x) for x in block.lines):
+        if f.marker_or_noise == f.n_lines:
             return True, "music_marker_only"
-        if any(is_music_marker(x) for x in block.lines) and len(joined) <= 6:
+        if f.marker_lines and len(joined) <= 6:
             return True, "music_marker_short"
 
     # Drop pure noise lines (symbols only)
-    if all(is_noise_only(x) for x in block.lines):
+    if f.noise_lines == f.n_lines:
         return True, "noise_only"
 
-    # Drop vocalize gibberish
-    if drop_vocalize and looks_like_vocalize_gibberish(joined):
-        return True, "vocalize_gibberish"
+    # Drop vocalize gibberish and Whisper phrase loops
+    if drop_vocalize:
+        rep = analyze_repetition(joined, loops=drop_phrase_loops)
+        if looks_like_vocalize_gibberish(joined, stats=rep):
+            return True, "vocalize_gibberish"
+        if drop_phrase_loops and is_phrase_loop(rep):
+            return True, f"phrase_loop({rep.loop_repeats}x{rep.loop_period})"
 
     # Optional: if it's almost no kana and has no letters, it might be garbage.
     # But keep English/romaji lines by allowing ASCII letters/digits
-    has_ascii_letters = bool(re.search(r"[A-Za-z]", joined))
-    if not has_ascii_letters:
-        kr = kana_ratio(joined)
+    if not f.ascii_letters:
+        kr = f.kana / len(joined)
         # If kana ratio is extremely low, likely misfire (but keep kanji-only lines by checking CJK)
-        has_cjk = bool(re.search(r"[\u4E00-\u9FFF]", joined))  # CJK Unified Ideographs (kanji)
-        if not has_cjk and kr < min_kana_ratio:
+        if not f.cjk and kr < min_kana_ratio:
             return True, f"low_kana_ratio({kr:.2f})"
 
     return False, "keep"
 
-def parse_blocks(content: str) -> List[Block]:
+class _LineReader:
     """
-    Parse SRT-like blocks: index line, timestamp line, text lines, blank line.
-    Works even if blank lines are inconsistent.
+    Line iterator with pushback and 1-based line numbers (lookahead needs 2 lines).
     """
-    lines = content.splitlines()
-    blocks: List[Block] = []
-    i = 0
-    n = len(lines)
-
-    def skip_empty(k: int) -> int:
-        while k < n and not lines[k].strip():
-            k += 1
-        return k
-
-    i = skip_empty(i)
-    while i < n:
-        idx_line = lines[i].strip()
-        # Index line may be missing; handle gracefully
-        if idx_line.isdigit():
-            raw_index = idx_line
-            i += 1
-        else:
-            raw_index = ""  # no index
-        i = skip_empty(i)
-        if i >= n:
-            break
-
-        ts_line = lines[i].strip()
-        if not TIME_RE.match(ts_line):
-            # Not a valid timestamp; attempt to resync by searching forward
-            # Treat current line as text and try to find next timestamp
-            # This is defensive; your outputs are usually well-formed.
-            # We'll bail out by stopping parse.
-            break
-
-        timestamp = ts_line
-        i += 1
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self._it = iter(lines)
+        self._buf: Deque[Tuple[int, str]] = deque()
+        self.lineno = 0
+
+    def next(self) -> Optional[Tuple[int, str]]:
+        if self._buf:
+            return self._buf.popleft()
+        for line in self._it:
+            self.lineno += 1
+            return self.lineno, line.rstrip("\r\n")
+        return None
+
+    def peek(self, k: int = 0) -> Optional[Tuple[int, str]]:
+        while len(self._buf) <= k:
+            for line in self._it:
+                self.lineno += 1
+                self._buf.append((self.lineno, line.rstrip("\r\n")))
+                break
+            else:
+                return None
+        return self._buf[k]
+
+    def push(self, item: Tuple[int, str]) -> None:
+        self._buf.appendleft(item)
+
+    def skip_empty(self) -> None:
+        while True:
+            item = self.peek()
+            if item is None or item[1].strip():
+                return
+            self.next()
+
+def iter_blocks(lines: Iterable[str], skipped: Optional[List[Skipped]] = None) -> Iterator[Block]:
+    """
+    Stream SRT-like blocks (index line, timestamp line, text lines, blank line)
+    from any line iterable, e.g. an open file. Memory stays at one block.
+    Blank lines may be inconsistent and the index line may be missing.
+    On a malformed block the parser resyncs to the next timestamp line (taking
+    a digit line right before it as its index); the lines in between are
+    appended to `skipped` instead of ending the parse.
+    """
+    r = _LineReader(lines)
+    r.skip_empty()
+    while True:
+        first = r.next()
+        if first is None:
+            return
+        ts = first
+        raw_index = ""
+        if first[1].strip().isdigit():
+            raw_index = first[1].strip()
+            r.skip_empty()
+            ts = r.next()
+
+        if ts is None or not TIME_RE.match(ts[1].strip()):
+            # Resync: scan forward for the next timestamp line
+            bad = [first] if ts is None or ts is first else [first, ts]
+            span_start, span_end = bad[0][0], bad[-1][0]
+            last_digit: Optional[Tuple[int, str]] = bad[-1] if bad[-1][1].strip().isdigit() else None
+            before_digit = bad[0][0] if len(bad) == 2 else span_start - 1  # span end if last_digit is an index
+            raw_index = ""
+            ts = None
+            while True:
+                item = r.next()
+                if item is None:
+                    break
+                if TIME_RE.match(item[1].strip()):
+                    ts = item
+                    break
+                if item[1].strip():
+                    if item[1].strip().isdigit():
+                        before_digit = span_end
+                        last_digit = item
+                    else:
+                        last_digit = None
+                    span_end = item[0]
+            if last_digit is not None and ts is not None:
+                raw_index = last_digit[1].strip()  # its index, not garbage
+                span_end = before_digit
+            if skipped is not None and span_end >= span_start:
+                skipped.append(Skipped(span_start, span_end, bad[0][1]))
+            if ts is None:
+                return
 
         # Collect text lines until blank line or next index+timestamp
         text_lines: List[str] = []
-        while i < n:
-            if not lines[i].strip():
-                break
-            # Stop if next looks like an index and following line is a timestamp
-            if lines[i].strip().isdigit() and (i + 1) < n and TIME_RE.match(lines[i + 1].strip()):
+        while True:
+            item = r.peek()
+            if item is None or not item[1].strip():
                 break
-            text_lines.append(lines[i].rstrip("\n"))
-            i += 1
+            if item[1].strip().isdigit():
+                nxt = r.peek(1)
+                if nxt is not None and TIME_RE.match(nxt[1].strip()):
+                    break
+            text_lines.append(r.next()[1])
 
         if not text_lines:
             text_lines = [""]  # keep structure; will be dropped by cleaner
 
-        blocks.append(Block(raw_index=raw_index, timestamp=timestamp, lines=text_lines))
-        i = skip_empty(i + 1)
+        yield Block(raw_index=raw_index, timestamp=ts[1].strip(), lines=text_lines)
+        r.skip_empty()
 
-    return blocks
+def parse_blocks(content: str) -> List[Block]:
+    """
+    Parse a whole string (see iter_blocks). Kept for callers that have the text in memory.
+    """
+    return list(iter_blocks(content.splitlines()))
 
-def format_blocks(blocks: List[Block], *, renumber: bool = True) -> str:
-    out_lines: List[str] = []
-    idx = 1
-    for b in blocks:
-        if renumber:
-            out_lines.append(str(idx))
-            idx += 1
-        else:
-            out_lines.append(b.raw_index if b.raw_index else str(idx))
-            idx += 1
-        out_lines.append(b.timestamp)
-        for ln in b.lines:
-            out_lines.append(normalize_line(ln))
-        out_lines.append("")  # blank line between blocks
-    return "\n".join(out_lines).rstrip() + "\n"
+def format_block(b: Block, idx: int, *, renumber: bool = True) -> str:
+    head = str(idx) if renumber or not b.raw_index else b.raw_index
+    return "\n".join([head, b.timestamp] + [normalize_line(ln) for ln in b.lines])
+
+def plain_text(b: Block) -> str:
+    # 把该块所有行合并成一句，再做 normalize
+    joined = " ".join(normalize_line(x) for x in b.lines if normalize_line(x))
+    return normalize_line(joined)
+
+def format_blocks(blocks: Iterable[Block], *, renumber: bool = True) -> str:
+    # blank line between blocks
+    out = "\n\n".join(format_block(b, i, renumber=renumber) for i, b in enumerate(blocks, start=1))
+    return out.rstrip() + "\n"
 
 # Optional: output plain lyrics text without indices/timestamps
-def format_plain(blocks: List[Block]) -> str:
-    out_lines: List[str] = []
-    for b in blocks:
-        # 把该块所有行合并成一句，再做 normalize
-        joined = " ".join(normalize_line(x) for x in b.lines if normalize_line(x))
-        joined = normalize_line(joined)
-        if not joined:
+def format_plain(blocks: Iterable[Block]) -> str:
+    # 段落分隔
+    out = "\n\n".join(t for t in (plain_text(b) for b in blocks) if t)
+    return out.rstrip() + "\n"
+
+class BlockSink:
+    """
+    Streaming counterpart of format_blocks/format_plain: writes kept blocks as
+    they arrive, producing byte-identical output.
+    """
+
+    def __init__(self, f: TextIO, *, plain: bool, renumber: bool) -> None:
+        self.f = f
+        self.plain = plain
+        self.renumber = renumber
+        self.count = 0
+
+    def write(self, b: Block) -> None:
+        text = plain_text(b) if self.plain else format_block(b, self.count + 1, renumber=self.renumber)
+        if self.plain and not text:
+            return
+        self.f.write(("\n\n" if self.count else "") + text)
+        self.count += 1
+
+    def close(self) -> None:
+        self.f.write("\n")
+
+def backup_path(in_path: str) -> str:
+    """
+    Next free backup name: <input>.bak, then <input>.bak.1, .bak.2 ...
+    """
+    bak = in_path + ".bak"
+    if not os.path.exists(bak):
+        return bak
+    k = 1
+    while os.path.exists(f"{bak}.{k}"):
+        k += 1
+    return f"{bak}.{k}"
+
+def latest_backup(in_path: str) -> Optional[str]:
+    bak = in_path + ".bak"
+    if not os.path.exists(bak):
+        return None
+    k = 1
+    while os.path.exists(f"{bak}.{k}"):
+        bak = f"{in_path}.bak.{k}"
+        k += 1
+    return bak
+
+def is_up_to_date(in_path: str, out_path: str, *, inplace: bool) -> bool:
+    """
+    Batch skip rule.
+    Normal: output exists and is newer than the input.
+    --inplace: the cleaned file carries its latest backup's mtime, so an equal mtime
+    means "already cleaned"; a re-exported transcript gets a new mtime and is redone.
+    """
+    try:
+        if inplace:
+            bak = latest_backup(in_path)
+            return bak is not None and os.stat(in_path).st_mtime_ns == os.stat(bak).st_mtime_ns
+        return os.stat(out_path).st_mtime_ns >= os.stat(in_path).st_mtime_ns
+    except OSError:
+        return False
+
+def clean_file(in_path: str, out_path: str, opts: Dict[str, object]) -> Dict[str, object]:
+    """
+    Clean one file, streaming: blocks are parsed, classified and written one at
+    a time, so memory does not grow with the transcript length.
+    Returns {"path", "status", "kept", "total", "reasons", "skipped", "out", "dropped_out", "error"}.
+    Runs inside pool workers in batch mode, so it never prints.
+    """
+    res: Dict[str, object] = {"path": in_path, "status": "ok", "kept": 0, "total": 0, "reasons": {},
+                              "skipped": 0, "out": out_path, "dropped_out": "", "error": ""}
+    if opts["inplace"]:
+        out_path = in_path
+    drop_path = out_path + ".dropped.txt" if opts["write_dropped"] else ""
+    tmp = out_path + ".tmp"
+
+    total = 0
+    skipped_lines = 0
+    reasons: Counter = Counter()
+    skipped: List[Skipped] = []
+
+    with open(in_path, "r", encoding="utf-8", errors="replace") as fin, \
+            open(tmp, "w", encoding="utf-8") as fout, \
+            (open(drop_path, "w", encoding="utf-8") if drop_path else open(os.devnull, "w")) as fdrop:
+        sink = BlockSink(fout, plain=opts["plain"], renumber=opts["renumber"])
+        for b in iter_blocks(fin, skipped):
+            total += 1
+            for sp in skipped:
+                skipped_lines += sp.end - sp.start + 1
+                fdrop.write(f"# unparsed lines {sp.start}-{sp.end}\n{sp.first}\n\n")
+            skipped.clear()
+
+            drop, reason = should_drop_block(
+                b,
+                min_text_len=opts["min_text_len"],
+                min_kana_ratio=opts["min_kana_ratio"],
+                drop_music_markers=opts["drop_music"],
+                drop_vocalize=opts["drop_vocalize"],
+                drop_phrase_loops=opts["drop_loops"],
+            )
+            if not drop:
+                sink.write(b)
+                continue
+            reasons[reason.split("(", 1)[0]] += 1  # low_kana_ratio(0.05) -> low_kana_ratio
+            fdrop.write(f"# reason={reason}\n")
+            if b.raw_index:
+                fdrop.write(b.raw_index + "\n")
+            fdrop.write(b.timestamp + "\n")
+            for ln in b.lines:
+                fdrop.write(ln + "\n")
+            fdrop.write("\n")
+        for sp in skipped:  # trailing garbage after the last block
+            skipped_lines += sp.end - sp.start + 1
+            fdrop.write(f"# unparsed lines {sp.start}-{sp.end}\n{sp.first}\n\n")
+        sink.close()
+
+    if total == 0:
+        os.remove(tmp)
+        if drop_path:
+            os.remove(drop_path)
+        res["status"] = "error"
+        res["error"] = "no blocks parsed (unexpected format)"
+        return res
+
+    if opts["inplace"]:
+        bak = backup_path(in_path)  # never clobber an existing backup
+        os.rename(in_path, bak)
+        os.replace(tmp, out_path)
+        st = os.stat(bak)
+        os.utime(out_path, ns=(st.st_atime_ns, st.st_mtime_ns))  # marks "cleaned from this backup"
+    else:
+        os.replace(tmp, out_path)
+
+    res.update(kept=sink.count, total=total, reasons=dict(reasons), skipped=skipped_lines,
+               out=out_path, dropped_out=drop_path)
+    return res
+
+def _clean_task(task: Tuple[str, str, Dict[str, object]]) -> Dict[str, object]:
+    in_path, out_path, opts = task
+    try:
+        return clean_file(in_path, out_path, opts)
+    except Exception as e:  # one bad file must not kill the batch
+        return {"path": in_path, "status": "error", "kept": 0, "total": 0, "reasons": {}, "skipped": 0,
+                "out": out_path, "dropped_out": "", "error": f"{type(e).__name__}: {e}"}
+
+def is_derived_file(name: str) -> bool:
+    # Our own outputs / backups are never inputs
+    return (name.endswith(".cleaned.txt") or name.endswith(".dropped.txt")
+            or re.search(r"\.bak(\.\d+)?$", name) is not None)
+
+def collect_inputs(inputs: List[str], *, pattern: str, recursive: bool) -> List[Tuple[str, str]]:
+    """
+    Expand files / directories / globs into [(file, root)], root being the
+    directory argument the file was found under ("" for plain files and globs).
+    """
+    found: List[Tuple[str, str]] = []
+    seen = set()
+
+    def add(path: str, root: str) -> None:
+        key = os.path.abspath(path)
+        if key not in seen and not is_derived_file(os.path.basename(path)):
+            seen.add(key)
+            found.append((path, root))
+
+    for item in inputs:
+        item = os.path.expanduser(item)
+        if os.path.isdir(item):
+            if recursive:
+                for dirpath, dirnames, filenames in os.walk(item):
+                    dirnames.sort()
+                    for fn in sorted(fnmatch.filter(filenames, pattern)):
+                        add(os.path.join(dirpath, fn), item)
+            else:
+                for p in sorted(glob.glob(os.path.join(glob.escape(item), pattern))):
+                    if os.path.isfile(p):
+                        add(p, item)
+        elif os.path.isfile(item):
+            add(item, "")
+        else:
+            for p in sorted(glob.glob(item, recursive=True)):
+                if os.path.isfile(p):
+                    add(p, "")
+    return found
+
+def output_path_for(in_path: str, root: str, out_dir: str) -> str:
+    if not out_dir:
+        return in_path + ".cleaned.txt"
+    rel = os.path.relpath(in_path, root) if root else os.path.basename(in_path)
+    return os.path.join(out_dir, rel + ".cleaned.txt")
+
+def run_batch(files: List[Tuple[str, str]], args: argparse.Namespace, opts: Dict[str, object]) -> int:
+    tasks: List[Tuple[str, str, Dict[str, object]]] = []
+    skipped = 0
+    for in_path, root in files:
+        out_path = in_path if args.inplace else output_path_for(in_path, root, args.output or "")
+        if not args.force and is_up_to_date(in_path, out_path, inplace=args.inplace):
+            skipped += 1
             continue
-        out_lines.append(joined)
-        out_lines.append("")  # 段落分隔
-    return "\n".join(out_lines).rstrip() + "\n"
+        if not args.inplace:
+            os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        tasks.append((in_path, out_path, opts))
+
+    jobs = max(1, min(args.jobs or os.cpu_count() or 1, len(tasks) or 1))
+    print(f"[INFO] files: {len(files)}, to clean: {len(tasks)}, skipped (up to date): {skipped}, jobs: {jobs}")
+
+    if jobs == 1:
+        results = [_clean_task(t) for t in tasks]
+    else:
+        # Many small files: hand them out in chunks so IPC does not dominate
+        chunksize = max(1, len(tasks) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_clean_task, tasks, chunksize=chunksize))
+
+    kept = total = skipped_lines = 0
+    reasons: Counter = Counter()
+    errors = 0
+    for r in results:
+        if r["status"] != "ok":
+            errors += 1
+            print(f"[WARN] {r['path']}: {r['error']}", file=sys.stderr)
+            continue
+        kept += r["kept"]
+        total += r["total"]
+        skipped_lines += r["skipped"]
+        reasons.update(r["reasons"])
+
+    print(f"[OK] files cleaned: {len(results) - errors}, skipped: {skipped}, errors: {errors}")
+    print(f"[OK] blocks kept: {kept} / {total}, dropped: {total - kept}")
+    for reason, n in reasons.most_common():
+        print(f"  {reason:<24} {n}")
+    if skipped_lines:
+        print(f"[WARN] unparsed lines skipped (resynced): {skipped_lines}")
+    return 1 if errors else 0
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="Clean SRT-like lyrics transcripts (remove music markers / vocalize gibberish).")
-    ap.add_argument("input", help="Input SRT-like text file")
-    ap.add_argument("-o", "--output", help="Output file path (default: <input>.cleaned.txt)")
+    ap.add_argument("inputs", nargs="+", metavar="input",
+                    help="Input SRT-like text file(s); directories or globs switch to batch mode")
+    ap.add_argument("-o", "--output", help="Output file path (default: <input>.cleaned.txt); an output directory in batch mode")
     ap.add_argument("--inplace", action="store_true", help="Overwrite input file in place (writes a .bak backup)")
     ap.add_argument("--keep-index", action="store_true", help="Keep original indices (no renumber)")
     ap.add_argument("--min-text-len", type=int, default=2, help="Drop blocks shorter than this (default: 2)")
     ap.add_argument("--min-kana-ratio", type=float, default=0.10, help="Drop blocks with very low kana ratio (default: 0.10)")
     ap.add_argument("--no-drop-vocalize", action="store_true", help="Do not drop 'わわわ/わーわー' style vocalize blocks")
+    ap.add_argument("--drop-phrase-loops", action="store_true",
+                    help="Also drop Whisper phrase loops (an 8+ char phrase repeated 10+ times in one block)")
     ap.add_argument("--no-drop-music", action="store_true", help="Do not drop music marker blocks like ♪~, [音楽]")
     ap.add_argument("--write-dropped", action="store_true", help="Write dropped blocks to <output>.dropped.txt for review")
     ap.add_argument("--plain", action="store_true",
                 help="Output plain lyrics text (no index/timestamps)")
+    ap.add_argument("-j", "--jobs", type=int, default=0, help="Batch mode: worker processes (default: CPU count)")
+    ap.add_argument("-r", "--recursive", action="store_true", help="Batch mode: descend into subdirectories")
+    ap.add_argument("--pattern", default="*.srt.txt", help="Batch mode: file pattern inside directories (default: *.srt.txt)")
+    ap.add_argument("--force", action="store_true", help="Batch mode: clean even if the output is up to date")
     args = ap.parse_args()
 
-    in_path = args.input
-    if not os.path.isfile(in_path):
-        print(f"[ERROR] input not found: {in_path}", file=sys.stderr)
-        return 2
-
-    with open(in_path, "r", encoding="utf-8", errors="replace") as f:
-        content = f.read()
-
-    blocks = parse_blocks(content)
-    if not blocks:
-        print("[ERROR] no blocks parsed (unexpected format)", file=sys.stderr)
+    opts: Dict[str, object] = {
+        "min_text_len": args.min_text_len,
+        "min_kana_ratio": args.min_kana_ratio,
+        "drop_music": not args.no_drop_music,
+        "drop_vocalize": not args.no_drop_vocalize,
+        "drop_loops": args.drop_phrase_loops and not args.no_drop_vocalize,
+        "plain": args.plain,
+        "renumber": not args.keep_index,
+        "inplace": args.inplace,
+        "write_dropped": args.write_dropped,
+    }
+
+    batch = len(args.inputs) > 1 or not os.path.isfile(args.inputs[0])
+    if batch:
+        if args.inplace and args.output:
+            print("[ERROR] --inplace and -o cannot be combined", file=sys.stderr)
+            return 2
+        files = collect_inputs(args.inputs, pattern=args.pattern, recursive=args.recursive)
+        if not files:
+            print(f"[ERROR] input not found: {' '.join(args.inputs)}", file=sys.stderr)
+            return 2
+        return run_batch(files, args, opts)
+
+    in_path = args.inputs[0]
+    res = clean_file(in_path, args.output or (in_path + ".cleaned.txt"), opts)
+    if res["status"] != "ok":
+        print(f"[ERROR] {res['error']}", file=sys.stderr)
         return 2
 
-    kept: List[Block] = []
-    dropped: List[Tuple[Block, str]] = []
-
-    for b in blocks:
-        drop, reason = should_drop_block(
-            b,
-            min_text_len=args.min_text_len,
-            min_kana_ratio=args.min_kana_ratio,
-            drop_music_markers=not args.no_drop_music,
-            drop_vocalize=not args.no_drop_vocalize,
-        )
-        if drop:
-            dropped.append((b, reason))
-        else:
-            kept.append(b)
-
-    renumber = not args.keep_index
-    cleaned_text = format_plain(kept) if args.plain else format_blocks(kept, renumber=renumber)
-
-    if args.inplace:
-        bak = in_path + ".bak"
-        if not os.path.exists(bak):
-            os.rename(in_path, bak)
-        else:
-            # If bak exists, don't clobber it; make a numbered backup
-            k = 1
-            while True:
-                bak2 = f"{bak}.{k}"
-                if not os.path.exists(bak2):
-                    os.rename(in_path, bak2)
-                    break
-                k += 1
-        out_path = in_path
-    else:
-        out_path = args.output or (in_path + ".cleaned.txt")
-
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(cleaned_text)
-
-    print(f"[OK] cleaned blocks: {len(kept)} / {len(blocks)}")
-    print(f"[OK] output: {out_path}")
-
-    if args.write_dropped:
-        drop_path = out_path + ".dropped.txt"
-        with open(drop_path, "w", encoding="utf-8") as f:
-            for (b, reason) in dropped:
-                f.write(f"# reason={reason}\n")
-                if b.raw_index:
-                    f.write(b.raw_index + "\n")
-                f.write(b.timestamp + "\n")
-                for ln in b.lines:
-                    f.write(ln + "\n")
-                f.write("\n")
-        print(f"[OK] dropped log: {drop_path}")
+    print(f"[OK] cleaned blocks: {res['kept']} / {res['total']}")
+    if res["skipped"]:
+        print(f"[WARN] unparsed lines skipped (resynced): {res['skipped']}")
+    print(f"[OK] output: {res['out']}")
+    if res["dropped_out"]:
+        print(f"[OK] dropped log: {res['dropped_out']}")
 
     return 0
 
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+lyrics_corpus.py
+Columnar view of many SRT-like lyrics transcripts (requires numpy).
+
+Blocks of a whole library live in flat arrays instead of per-block objects:
+  song_offsets  int64[n_songs + 1]  blocks of song k: [song_offsets[k], song_offsets[k + 1])
+  index         int64[n]            original block index (-1 = none)
+  start_ms      int64[n]
+  end_ms        int64[n]
+  text          str                 all block texts concatenated (lines joined by "\n")
+  text_offsets  int64[n + 1]        block i's text: text[text_offsets[i]:text_offsets[i + 1]]
+  raw_ts        int64[n]            -1, or index into raw_stamps: the timestamp line as read,
+                                    when formatting start/end would not reproduce it
+
+SRT files load into it and write back out in lyrics_cleanup's format (blocks
+parsed by lyrics_cleanup.iter_blocks, written by lyrics_cleanup.BlockSink).
+Durations, gaps, density, re-timing, merging of short blocks and mask
+filtering are NumPy operations over the whole library. The text rules
+(should_drop_block) run per block only where a NumPy pass over the whole text
+cannot settle them (empty blocks and plain lyric lines no rule can drop are
+decided there); the result is kept as a reason-code column and filtering with it
+is a mask. Timestamp lines that do not format back as read (spacing, fields
+out of range) are written verbatim until re-timing or merging changes them.
+pack stores each file's path relative to its input directory; unpack
+recreates those subdirectories under -o.
+
+Usage:
+  python3 lyrics_corpus.py stats ~/toolbox/_out/Lyrics
+  python3 lyrics_corpus.py clean ~/toolbox/_out/Lyrics -o cleaned/ --merge-short-ms 1200
+  python3 lyrics_corpus.py pack ~/toolbox/_out/Lyrics -o lyrics.npz
+  python3 lyrics_corpus.py unpack lyrics.npz -o restored/
+"""
+
+from __future__ import annotations
+import argparse
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lyrics_cleanup as lc  # noqa: E402
+
+
+TS_WIDTH = len("00:00:00,000 --> 00:00:00,000")
+TS_RE = re.compile(r"(\d{2}):(\d{2}):(\d{2}),(\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}),(\d{3})")
+
+# reason codes for the drop column (0 = keep)
+REASONS = ["keep", "empty_or_too_short", "music_marker_only", "music_marker_short", "noise_only",
+           "vocalize_gibberish", "phrase_loop", "low_kana_ratio"]
+REASON_CODE = {r: i for i, r in enumerate(REASONS)}
+
+# digit columns of a canonical "HH:MM:SS,mmm --> HH:MM:SS,mmm"
+_TS_DIGITS = [0, 1, 3, 4, 6, 7, 9, 10, 11, 17, 18, 20, 21, 23, 24, 26, 27, 28]
+_TS_SEPS = {2: ":", 5: ":", 8: ",", 12: " ", 13: "-", 14: "-", 15: ">", 16: " ", 19: ":", 22: ":", 25: ","}
+
+# Code point lookups for the whole-text pre-pass of classify(): lyrics_cleanup's
+# script classes, str.isspace (all such chars are <= U+3000), marker first chars
+_CLASS_LUT = np.zeros(max(lc.CLASS_TABLE) + 1, dtype=np.uint8)
+for _cp, _cls in lc.CLASS_TABLE.items():
+    if _cls:
+        _CLASS_LUT[_cp] = ord(_cls)
+_SPACE_LUT = np.array([chr(c).isspace() for c in range(0x3001)])
+_MARKER_LEAD = np.array(sorted({ord(m[0]) for m in lc.MUSIC_MARKERS}), dtype=np.uint32)
+_WA_CODES = np.array(sorted(map(ord, lc.WA_CHARS)), dtype=np.uint32)
+
+
+# ---------------- Timestamps ----------------
+def parse_timestamps(stamps: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    SRT timestamp lines -> (start_ms, end_ms, exact). Canonical lines are decoded
+    as a (n, 29) digit matrix in one go; anything else falls back to a regex
+    (0 / 0 if that fails too). exact: format_ms gives the line back unchanged
+    (canonical, minutes and seconds below 60).
+    """
+    n = len(stamps)
+    start = np.zeros(n, dtype=np.int64)
+    end = np.zeros(n, dtype=np.int64)
+    exact = np.zeros(n, dtype=bool)
+    if n == 0:
+        return start, end, exact
+
+    canon = np.fromiter((len(s) == TS_WIDTH and s.isascii() for s in stamps), dtype=bool, count=n)
+    rows = np.flatnonzero(canon)
+    if rows.size:
+        buf = "".join(stamps[i] for i in rows).encode("ascii")
+        m = np.frombuffer(buf, dtype=np.uint8).reshape(rows.size, TS_WIDTH)
+        ok = np.ones(rows.size, dtype=bool)
+        for col, ch in _TS_SEPS.items():
+            ok &= m[:, col] == ord(ch)
+        d = m[:, _TS_DIGITS].astype(np.int64) - ord("0")
+        ok &= ((d >= 0) & (d <= 9)).all(axis=1)
+
+        def ms(c: int) -> np.ndarray:
+            h = d[:, c] * 10 + d[:, c + 1]
+            mi = d[:, c + 2] * 10 + d[:, c + 3]
+            s = d[:, c + 4] * 10 + d[:, c + 5]
+            return ((h * 60 + mi) * 60 + s) * 1000 + d[:, c + 6] * 100 + d[:, c + 7] * 10 + d[:, c + 8]
+
+        start[rows[ok]] = ms(0)[ok]
+        end[rows[ok]] = ms(9)[ok]
+        canon[rows[~ok]] = False
+        exact[rows[ok]] = (d[ok][:, [2, 4, 11, 13]] < 6).all(axis=1)  # tens of mm / ss
+
+    for i in np.flatnonzero(~canon):
+        m2 = TS_RE.search(stamps[i])
+        if m2:
+            h1, m1, s1, f1, h2, mi2, s2, f2 = map(int, m2.groups())
+            start[i] = ((h1 * 60 + m1) * 60 + s1) * 1000 + f1
+            end[i] = ((h2 * 60 + mi2) * 60 + s2) * 1000 + f2
+    return start, end, exact
+
+def format_ms(ms: int) -> str:
+    ms = max(0, int(ms))
+    s, f = divmod(ms, 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d},{f:03d}"
+
+
+# ---------------- Corpus ----------------
+class LyricsCorpus:
+    def __init__(self, paths: List[str], song_offsets: np.ndarray, index: np.ndarray,
+                 start_ms: np.ndarray, end_ms: np.ndarray, text: str, text_offsets: np.ndarray,
+                 reason: Optional[np.ndarray] = None, names: Optional[List[str]] = None,
+                 raw_ts: Optional[np.ndarray] = None, raw_stamps: Optional[List[str]] = None) -> None:
+        self.paths = paths
+        # Relative output name of each song (subdirectories under the input root are kept)
+        self.names = names or [os.path.basename(p) for p in paths]
+        self.song_offsets = song_offsets
+        self.index = index
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.text = text
+        self.text_offsets = text_offsets
+        self.reason = reason  # uint8 REASONS codes, filled by classify()
+        # Timestamp lines kept as read (raw_ts: -1 or index into raw_stamps)
+        self.raw_ts = np.full(len(start_ms), -1, dtype=np.int64) if raw_ts is None else raw_ts
+        self.raw_stamps = raw_stamps or []
+
+    def __len__(self) -> int:
+        return len(self.start_ms)
+
+    @property
+    def n_songs(self) -> int:
+        return len(self.paths)
+
+    @property
+    def song(self) -> np.ndarray:
+        """Song id of every block."""
+        return np.repeat(np.arange(self.n_songs), np.diff(self.song_offsets))
+
+    @property
+    def duration_ms(self) -> np.ndarray:
+        return self.end_ms - self.start_ms
+
+    def block_text(self, i: int) -> str:
+        return self.text[self.text_offsets[i]:self.text_offsets[i + 1]]
+
+    # ---- loading ----
+    @classmethod
+    def from_files(cls, paths: Sequence[str], names: Optional[Sequence[str]] = None) -> "LyricsCorpus":
+        counts: List[int] = []
+        index: List[int] = []
+        stamps: List[str] = []
+        texts: List[str] = []
+        for path in paths:
+            n = 0
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for b in lc.iter_blocks(f):
+                    index.append(int(b.raw_index) if b.raw_index.isdecimal() else -1)
+                    stamps.append(b.timestamp)
+                    texts.append("\n".join(b.lines))
+                    n += 1
+            counts.append(n)
+        start, end, exact = parse_timestamps(stamps)
+        bad = np.flatnonzero(~exact)
+        raw_ts = np.full(len(stamps), -1, dtype=np.int64)
+        raw_ts[bad] = np.arange(bad.size)
+        return cls(list(paths), _offsets(counts), np.array(index, dtype=np.int64), start, end,
+                   "".join(texts), _offsets([len(t) for t in texts]), names=list(names) if names else None,
+                   raw_ts=raw_ts, raw_stamps=[stamps[i] for i in bad.tolist()])
+
+    # ---- writing ----
+    def blocks(self, song: int) -> List[lc.Block]:
+        out = []
+        for i in range(self.song_offsets[song], self.song_offsets[song + 1]):
+            raw = str(self.index[i]) if self.index[i] >= 0 else ""
+            if self.raw_ts[i] >= 0:
+                ts = self.raw_stamps[self.raw_ts[i]]
+            else:
+                ts = f"{format_ms(self.start_ms[i])} --> {format_ms(self.end_ms[i])}"
+            out.append(lc.Block(raw, ts, self.block_text(i).split("\n")))
+        return out
+
+    def write_srt(self, song: int, path: str, *, renumber: bool = True, plain: bool = False) -> int:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            sink = lc.BlockSink(f, plain=plain, renumber=renumber)
+            for b in self.blocks(song):
+                sink.write(b)
+            sink.close()
+        os.replace(tmp, path)
+        return sink.count
+
+    # ---- columnar ops ----
+    def select(self, mask: np.ndarray) -> "LyricsCorpus":
+        """
+        Blocks where mask is True; songs are kept (possibly empty).
+        """
+        keep = np.flatnonzero(mask)
+        song = self.song[keep]
+        counts = np.bincount(song, minlength=self.n_songs)
+        lo, hi = self.text_offsets[keep], self.text_offsets[keep + 1]
+        text = "".join(self.text[a:b] for a, b in zip(lo.tolist(), hi.tolist()))
+        return LyricsCorpus(self.paths, _offsets(counts), self.index[keep], self.start_ms[keep],
+                            self.end_ms[keep], text, _offsets(hi - lo),
+                            None if self.reason is None else self.reason[keep], names=self.names,
+                            raw_ts=self.raw_ts[keep], raw_stamps=self.raw_stamps)
+
+    def retime(self, *, shift_ms: int = 0, scale: float = 1.0, songs: Optional[np.ndarray] = None) -> None:
+        """
+        t -> t * scale + shift_ms (clamped at 0), for all blocks or the given song ids.
+        """
+        sel = slice(None) if songs is None else np.isin(self.song, songs)
+        self.raw_ts[sel] = -1  # new times: written formatted
+        for col in (self.start_ms, self.end_ms):
+            col[sel] = np.maximum(0, np.rint(col[sel] * scale) + shift_ms).astype(np.int64)
+
+    @property
+    def song_first(self) -> np.ndarray:
+        """True for the first block of each song."""
+        first = np.zeros(len(self), dtype=bool)
+        first[self.song_offsets[:-1][np.diff(self.song_offsets) > 0]] = True
+        return first
+
+    def gaps_ms(self) -> np.ndarray:
+        """
+        Gap to the previous block of the same song (negative = overlap; 0 for a song's first block).
+        """
+        gaps = np.zeros(len(self), dtype=np.int64)
+        if len(self) > 1:
+            gaps[1:] = self.start_ms[1:] - self.end_ms[:-1]
+        gaps[self.song_first] = 0
+        return gaps
+
+    def merge_short(self, min_ms: int, max_gap_ms: int = 500) -> "LyricsCorpus":
+        """
+        Fold a block shorter than min_ms into the next block of the same song
+        when the gap between them is at most max_gap_ms (chains merge into one).
+        """
+        n = len(self)
+        if n == 0:
+            return self
+        song = self.song
+        short = self.duration_ms < min_ms
+        joinable = np.zeros(n, dtype=bool)  # block i continues the group of block i - 1
+        joinable[1:] = short[:-1] & (song[1:] == song[:-1]) & (self.start_ms[1:] - self.end_ms[:-1] <= max_gap_ms)
+        heads = np.flatnonzero(~joinable)
+        group_song = song[heads]
+
+        start = self.start_ms[heads]
+        end = np.maximum.reduceat(self.end_ms, heads)
+        bounds = np.append(heads, n).tolist()
+        offs = self.text_offsets.tolist()
+        texts = []
+        for g in range(len(heads)):
+            a, b = bounds[g], bounds[g + 1]
+            if b - a == 1:
+                texts.append(self.text[offs[a]:offs[a + 1]])
+            else:
+                texts.append("\n".join(self.text[offs[i]:offs[i + 1]] for i in range(a, b)))
+        return LyricsCorpus(self.paths, _offsets(np.bincount(group_song, minlength=self.n_songs)),
+                            self.index[heads], start, end, "".join(texts), _offsets([len(t) for t in texts]),
+                            names=self.names, raw_ts=np.where(np.diff(bounds) > 1, -1, self.raw_ts[heads]),
+                            raw_stamps=self.raw_stamps)
+
+    def classify(self, *, min_text_len: int = 2, min_kana_ratio: float = 0.10, drop_music_markers: bool = True,
+                 drop_vocalize: bool = True, drop_phrase_loops: bool = False) -> np.ndarray:
+        """
+        Store and return reason codes of lyrics_cleanup.should_drop_block. Blocks the
+        NumPy pre-pass settles are not handed to it; the rest are, one at a time.
+        """
+        opts = dict(min_text_len=min_text_len, min_kana_ratio=min_kana_ratio, drop_music_markers=drop_music_markers,
+                    drop_vocalize=drop_vocalize, drop_phrase_loops=drop_phrase_loops)
+        keep, empty = self._settled(**opts)
+        reason = np.zeros(len(self), dtype=np.uint8)
+        reason[empty] = REASON_CODE["empty_or_too_short"]
+        offs = self.text_offsets.tolist()
+        for i in np.flatnonzero(~(keep | empty)).tolist():
+            drop, why = lc.should_drop_block(lc.Block("", "", self.text[offs[i]:offs[i + 1]].split("\n")), **opts)
+            if drop:
+                reason[i] = REASON_CODE[why.split("(", 1)[0]]
+        self.reason = reason
+        return reason
+
+    def _settled(self, *, min_text_len: int, min_kana_ratio: float, drop_music_markers: bool,
+                 drop_vocalize: bool, drop_phrase_loops: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (keep, empty) block masks from per-code-point flags summed per block.
+        empty: no visible char (should_drop_block: empty_or_too_short).
+        keep: no rule can fire. Counts over the raw text bound the normalized text
+        (normalizing only removes whitespace), so the tests are conservative:
+        - visible chars >= min_text_len and at least one kana / CJK / Hangul / ASCII
+          letter (so not every line is noise)
+        - markers: no marker's first char, and no blank line unless > 6 visible chars
+        - vocalize: fewer than WA_REPEAT_MIN わ/ワ/ﾜ/"wa" units (a chain, or the
+          wa-only line rule, needs more), no run of REPEAT_CHAR_MIN equal chars, and
+          (phrase loops) fewer than LOOP_MIN_CHARS chars
+        - kana ratio: ASCII letters or CJK, or kana / raw length >= min_kana_ratio
+        """
+        n = len(self)
+        offs = self.text_offsets
+        cp = np.frombuffer(self.text.encode("utf-32-le"), dtype="<u4")
+        block = np.repeat(np.arange(n), np.diff(offs))
+
+        def per_block(flags: np.ndarray) -> np.ndarray:
+            c = np.zeros(len(flags) + 1, dtype=np.int64)
+            np.cumsum(flags, out=c[1:])
+            return c[offs[1:]] - c[offs[:-1]]
+
+        def lut(table: np.ndarray) -> np.ndarray:
+            return np.where(cp < len(table), table[np.minimum(cp, len(table) - 1)], table.dtype.type(0))
+
+        cls = lut(_CLASS_LUT)
+        space = lut(_SPACE_LUT)
+        visible = per_block(~space)
+        empty = visible == 0
+        keep = (visible >= min_text_len) & (per_block(cls != 0) > 0)
+
+        if drop_music_markers:
+            keep &= per_block(np.isin(cp, _MARKER_LEAD)) == 0
+            # blank lines count as marker lines (music_marker_short): lines with a
+            # visible char = runs of one (newlines so far + block) key among them
+            newline = cp == ord("\n")
+            key = (np.cumsum(newline) + block)[~space]
+            first = np.ones(len(key), dtype=bool)
+            first[1:] = key[1:] != key[:-1]
+            filled = np.bincount(block[~space][first], minlength=n)
+            keep &= (filled == per_block(newline) + 1) | (visible > 6)
+
+        if drop_vocalize:
+            k = lc.REPEAT_CHAR_MIN - 1  # equal neighbour pairs in a run
+            eq = np.zeros(len(cp) + 1, dtype=np.int64)
+            if len(cp) > 1:
+                np.cumsum(cp[1:] == cp[:-1], out=eq[2:])
+            run = np.zeros(len(cp), dtype=bool)
+            if len(cp) > k:
+                run[:len(cp) - k] = eq[k + 1:] - eq[1:-k] == k
+            wa = np.isin(cp, _WA_CODES)
+            wa[:-1] |= ((cp[:-1] | 0x20) == ord("w")) & ((cp[1:] | 0x20) == ord("a"))
+            keep &= (per_block(run) == 0) & (per_block(wa) < lc.WA_REPEAT_MIN)
+            if drop_phrase_loops:
+                keep &= np.diff(offs) < lc.LOOP_MIN_CHARS
+
+        kana = per_block(cls == ord(lc._KANA))
+        letters_or_cjk = per_block((cls == ord(lc._ASCII)) | (cls == ord(lc._CJK))) > 0
+        keep &= letters_or_cjk | (kana / np.maximum(np.diff(offs), 1) >= min_kana_ratio)
+        return keep, empty
+
+    def song_stats(self) -> Dict[str, np.ndarray]:
+        """
+        Per-song columns: blocks, span/voiced/mean-gap (s), blocks per minute, overlaps.
+        """
+        song = self.song
+        n = self.n_songs
+        counts = np.diff(self.song_offsets)
+        nonempty = counts > 0
+        first = self.song_offsets[:-1][nonempty]
+        last = self.song_offsets[1:][nonempty] - 1
+
+        span = np.zeros(n)
+        span[nonempty] = (self.end_ms[last] - self.start_ms[first]) / 1000.0
+        voiced = np.bincount(song, weights=np.maximum(self.duration_ms, 0), minlength=n) / 1000.0
+        gaps = self.gaps_ms()
+        has_gap = ~self.song_first
+        gap_sum = np.bincount(song[has_gap], weights=gaps[has_gap], minlength=n)
+        gap_n = np.bincount(song[has_gap], minlength=n)
+        overlaps = np.bincount(song, weights=gaps < 0, minlength=n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_gap = np.where(gap_n > 0, gap_sum / np.maximum(gap_n, 1) / 1000.0, 0.0)
+            per_min = np.where(span > 0, counts / np.maximum(span, 1e-9) * 60.0, 0.0)
+        return {"blocks": counts, "span_s": span, "voiced_s": voiced, "mean_gap_s": mean_gap,
+                "blocks_per_min": per_min, "overlaps": overlaps.astype(np.int64)}
+
+    # ---- compact storage ----
+    def save(self, path: str) -> None:
+        np.savez_compressed(
+            path, paths=np.array(self.paths, dtype=str), names=np.array(self.names, dtype=str), song_offsets=self.song_offsets, index=self.index,
+            start_ms=self.start_ms, end_ms=self.end_ms, text_offsets=self.text_offsets,
+            text=np.frombuffer(self.text.encode("utf-8"), dtype=np.uint8),
+            raw_ts=self.raw_ts, raw_stamps=np.array(self.raw_stamps, dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "LyricsCorpus":
+        with np.load(path) as z:
+            names = [str(p) for p in z["names"]] if "names" in z.files else None  # older packs: basenames
+            raw = "raw_ts" in z.files  # older packs: timestamps are reformatted
+            return cls([str(p) for p in z["paths"]], z["song_offsets"], z["index"], z["start_ms"],
+                       z["end_ms"], z["text"].tobytes().decode("utf-8"), z["text_offsets"], names=names,
+                       raw_ts=z["raw_ts"] if raw else None,
+                       raw_stamps=[str(t) for t in z["raw_stamps"]] if raw else None)
+
+
+def _offsets(lengths: Sequence[int]) -> np.ndarray:
+    out = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=out[1:])
+    return out
+
+
+# ---------------- CLI ----------------
+def load_inputs(inputs: List[str], pattern: str, recursive: bool) -> Tuple[LyricsCorpus, List[Tuple[str, str]]]:
+    files = lc.collect_inputs(inputs, pattern=pattern, recursive=recursive)
+    names = [os.path.relpath(p, root) if root else os.path.basename(p) for p, root in files]
+    return LyricsCorpus.from_files([p for p, _ in files], names), files
+
+def duplicate_names(names: Sequence[str]) -> List[str]:
+    return sorted(n for n, c in Counter(names).items() if c > 1)
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    corpus, _ = load_inputs(args.inputs, args.pattern, args.recursive)
+    if not corpus.n_songs:
+        print(f"[ERROR] no input files: {' '.join(args.inputs)}", file=sys.stderr)
+        return 2
+    st = corpus.song_stats()
+    reason = corpus.classify()
+    dropped = np.bincount(corpus.song, weights=reason > 0, minlength=corpus.n_songs).astype(np.int64)
+
+    order = np.argsort(-st["blocks"], kind="stable")[:args.top] if args.top else np.arange(corpus.n_songs)
+    print(f"{'blocks':>7} {'drop':>5} {'span s':>8} {'voiced s':>9} {'gap s':>6} {'blk/min':>8} {'ovl':>4}  file")
+    for k in order:
+        print(f"{st['blocks'][k]:>7} {dropped[k]:>5} {st['span_s'][k]:>8.1f} {st['voiced_s'][k]:>9.1f} "
+              f"{st['mean_gap_s'][k]:>6.2f} {st['blocks_per_min'][k]:>8.1f} {st['overlaps'][k]:>4}  "
+              f"{os.path.basename(corpus.paths[k])}")
+
+    dur = corpus.duration_ms
+    print(f"[OK] songs: {corpus.n_songs}, blocks: {len(corpus)}, dropped by rules: {int((reason > 0).sum())}")
+    if len(corpus):
+        print(f"[OK] block duration ms: median {np.median(dur):.0f}, p95 {np.percentile(dur, 95):.0f}, "
+              f"negative {int((dur < 0).sum())}")
+    for code, n in enumerate(np.bincount(reason, minlength=len(REASONS))):
+        if code and n:
+            print(f"  {REASONS[code]:<24} {n}")
+    return 0
+
+def cmd_clean(args: argparse.Namespace) -> int:
+    corpus, files = load_inputs(args.inputs, args.pattern, args.recursive)
+    if not corpus.n_songs:
+        print(f"[ERROR] no input files: {' '.join(args.inputs)}", file=sys.stderr)
+        return 2
+    total = len(corpus)
+    reason = corpus.classify(min_text_len=args.min_text_len, min_kana_ratio=args.min_kana_ratio,
+                             drop_phrase_loops=args.drop_phrase_loops)
+    mask = reason == 0
+    if args.min_dur_ms:
+        mask &= corpus.duration_ms >= args.min_dur_ms
+    corpus = corpus.select(mask)
+    if args.shift_ms or args.scale != 1.0:
+        corpus.retime(shift_ms=args.shift_ms, scale=args.scale)
+    if args.merge_short_ms:
+        corpus = corpus.merge_short(args.merge_short_ms, args.max_gap_ms)
+
+    for k, (in_path, root) in enumerate(files):
+        out_path = lc.output_path_for(in_path, root, args.output or "")
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        corpus.write_srt(k, out_path, renumber=not args.keep_index)
+    print(f"[OK] files: {corpus.n_songs}, blocks kept: {len(corpus)} / {total}")
+    return 0
+
+def cmd_pack(args: argparse.Namespace) -> int:
+    corpus, _ = load_inputs(args.inputs, args.pattern, args.recursive)
+    if not corpus.n_songs:
+        print(f"[ERROR] no input files: {' '.join(args.inputs)}", file=sys.stderr)
+        return 2
+    dups = duplicate_names(corpus.names)
+    if dups:
+        print(f"[ERROR] same file name from different inputs (pass their common parent directory with -r): "
+              f"{', '.join(dups[:5])}", file=sys.stderr)
+        return 2
+    corpus.save(args.output)
+    print(f"[OK] {corpus.n_songs} songs, {len(corpus)} blocks -> {args.output} ({os.path.getsize(args.output)} bytes)")
+    return 0
+
+def cmd_unpack(args: argparse.Namespace) -> int:
+    corpus = LyricsCorpus.load(args.input)
+    dups = duplicate_names(corpus.names)
+    if dups:
+        print(f"[ERROR] pack has several songs named {', '.join(dups[:5])}; they would overwrite each other",
+              file=sys.stderr)
+        return 2
+    root = os.path.abspath(args.output)
+    out_paths = [os.path.abspath(os.path.join(root, name)) for name in corpus.names]
+    unsafe = [n for n, p in zip(corpus.names, out_paths) if os.path.commonpath([root, p]) != root]
+    if unsafe:
+        print(f"[ERROR] pack has paths outside the output directory: {', '.join(unsafe[:5])}", file=sys.stderr)
+        return 2
+    for k, out_path in enumerate(out_paths):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        corpus.write_srt(k, out_path, renumber=False)
+    print(f"[OK] {corpus.n_songs} songs -> {args.output}")
+    return 0
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Columnar lyrics corpus: library stats, vectorized filtering, packing.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    def add_inputs(p: argparse.ArgumentParser) -> None:
+        p.add_argument("inputs", nargs="+", metavar="input", help="SRT-like files, directories or globs")
+        p.add_argument("-r", "--recursive", action="store_true", help="Descend into subdirectories")
+        p.add_argument("--pattern", default="*.srt.txt", help="File pattern inside directories (default: *.srt.txt)")
+
+    p = sub.add_parser("stats", help="Per-song timing stats and drop-rule counts")
+    add_inputs(p)
+    p.add_argument("--top", type=int, default=20, help="Show the N songs with most blocks (0 = all, default: 20)")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("clean", help="Filter / re-time / merge the whole library and write SRT")
+    add_inputs(p)
+    p.add_argument("-o", "--output", help="Output directory (default: <input>.cleaned.txt next to each input)")
+    p.add_argument("--keep-index", action="store_true", help="Keep original indices (no renumber)")
+    p.add_argument("--min-text-len", type=int, default=2, help="Drop blocks shorter than this (default: 2)")
+    p.add_argument("--min-kana-ratio", type=float, default=0.10, help="Drop blocks with very low kana ratio (default: 0.10)")
+    p.add_argument("--drop-phrase-loops", action="store_true", help="Also drop Whisper phrase loops (see lyrics_cleanup)")
+    p.add_argument("--min-dur-ms", type=int, default=0, help="Also drop blocks shorter than this many ms")
+    p.add_argument("--shift-ms", type=int, default=0, help="Shift all timestamps by this many ms")
+    p.add_argument("--scale", type=float, default=1.0, help="Scale all timestamps (drift correction)")
+    p.add_argument("--merge-short-ms", type=int, default=0, help="Merge blocks shorter than this into the next one")
+    p.add_argument("--max-gap-ms", type=int, default=500, help="Max gap for --merge-short-ms (default: 500)")
+    p.set_defaults(func=cmd_clean)
+
+    p = sub.add_parser("pack", help="Save the corpus as one compressed .npz")
+    add_inputs(p)
+    p.add_argument("-o", "--output", required=True, help="Output .npz path")
+    p.set_defaults(func=cmd_pack)
+
+    p = sub.add_parser("unpack", help="Write the songs of a packed corpus back to SRT")
+    p.add_argument("input", help="Packed .npz")
+    p.add_argument("-o", "--output", required=True, help="Output directory")
+    p.set_defaults(func=cmd_unpack)
+
+    args = ap.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,765 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+lyrics_pipeline.py
+In-process driver for lyrics_auto_no_vad.sh: segmentation, per-segment
+transcription, whisper output cleaning and SRT assembly in one Python process
+(the shell script used to fork python3 several times per segment).
+
+Segments are transcribed by several whisper-cli processes at once (CPU cores
+split between them) and reassembled in timestamp order. Segment audio comes
+from whisper-cli's own offset/duration options on the full WAV when available,
+otherwise from slices of the memory-mapped full WAV (no ffmpeg per segment).
+Silence detection runs on the same mapping (framed RMS in NumPy, with
+hysteresis), so the song is decoded once; ffmpeg silencedetect is the fallback.
+
+Cleaned segment text is cached by content (segment PCM + model + lang + flags),
+so re-running a song, or another mode that yields the same segment boundaries,
+only transcribes segments not seen before; an interrupted run resumes.
+
+The assembled blocks go straight into lyrics_cleanup's filters, so the raw
+transcript and its cleaned version come out of the same run.
+
+Any executable taking whisper-cli's arguments can stand in for it
+(--whisper-cli / $WHISPER_CLI), e.g. a stub script when testing the scheduler.
+
+Usage (normally called by lyrics_auto_no_vad.sh):
+  python3 lyrics_pipeline.py work/song.full.wav --work-dir work --lang ja \\
+      --mode hybrid --interval 12 --model ggml-small.bin --out lyrics_song.ja.srt.txt
+
+Exit codes: 0 ok, 2 bad args / missing tools, 3 no segments, 130 interrupted.
+"""
+
+from __future__ import annotations
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import subprocess
+import sys
+import threading
+import time
+import wave
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import lyrics_cleanup as lc  # noqa: E402
+
+
+MODES = ("auto", "fixed", "hybrid")
+MIN_FIXED_SEG = 1.0  # fixed mode: skip a trailing piece shorter than this
+NO_TEXT = "[音楽] "   # placeholder text for segments whisper returned nothing for
+WHISPER_THREADS_PER_JOB = 4  # whisper.cpp's own default thread count
+SLICE_MODES = ("auto", "offset", "mmap", "ffmpeg")
+SILENCE_ENGINES = ("auto", "numpy", "ffmpeg")
+SILENCE_FRAME_SEC = 0.02     # numpy engine: RMS frame (20 ms)
+SILENCE_HYSTERESIS_DB = 3.0  # numpy engine: leave silence only this far above the threshold
+SILENCE_CHUNK_SEC = 60.0     # numpy engine: frames per vectorized chunk (bounds temp memory)
+WHISPER_FLAGS = ("-nt",)     # output-affecting whisper-cli flags (part of the cache key)
+CACHE_VERSION = "1"          # bump when clean_whisper_output changes what gets stored
+CACHE_MAX_MB = 32
+DEFAULT_CACHE = os.environ.get("LYRICS_CACHE_DB") or os.path.join(
+    os.environ.get("TOOLBOX_DIR") or os.path.expanduser("~/toolbox"), "_out", "Lyrics", ".cache", "transcripts.sqlite")
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+Segment = Tuple[float, float]
+
+SILENCE_START_RE = re.compile(r"silence_start:\s*([\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end:\s*([\d.]+)")
+
+# whisper-cli -nt output: drop log lines, keep lyrics
+LOG_PREFIXES = ("whisper_", "ggml_", "main:", "system_info:")
+LOG_WORDS = ("loading model", "gpu device", "metal total size", "model size", "processing",
+             "print_timings", "fallbacks", "deallocating")
+FALLBACK_LOG_WORDS = ("whisper_", "load", "model", "error:", "init", "ggml", "metal", "timings")
+WHISPER_TS_RE = re.compile(r"\[\d\d:\d\d:\d\d\.\d+ --> \d\d:\d\d:\d\d\.\d+\]\s*")
+LYRIC_CHAR_RE = re.compile(r"[a-zA-Z\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af♪~]")
+BRACKET_RE = re.compile(r"\[.*?\]")
+
+
+# ---------------- Timestamps ----------------
+def round_ms(t: float) -> float:
+    # segments.tsv keeps 3 decimals; everything downstream uses the rounded value
+    return float(f"{t:.3f}")
+
+def sec_to_srt(t: float) -> str:
+    """
+    Seconds -> "HH:MM:SS,mmm" (negative clamps to 0, ms rounding carries over).
+    """
+    if t < 0:
+        t = 0.0
+    hh = int(t // 3600); t -= hh * 3600
+    mm = int(t // 60);   t -= mm * 60
+    ss = int(t);         t -= ss
+    ms = int(round(t * 1000))
+    if ms >= 1000:
+        ss += 1
+        ms -= 1000
+    if ss >= 60:
+        mm += 1
+        ss -= 60
+    if mm >= 60:
+        hh += 1
+        mm -= 60
+    return f"{hh:02d}:{mm:02d}:{ss:02d},{ms:03d}"
+
+
+# ---------------- PCM ----------------
+class PcmWav:
+    """
+    Read-only mmap of a PCM WAV (the 16 kHz mono full.wav ffmpeg decoded):
+    the header is parsed once, a segment is header + a slice of the mapping.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.f = open(path, "rb")
+        try:
+            self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self.f.close()
+            raise ValueError(f"cannot map {path}")
+        try:
+            self._parse_header()
+        except ValueError:
+            self.close()
+            raise
+
+    def _parse_header(self) -> None:
+        mm = self.mm
+        if len(mm) < 12 or mm[0:4] != b"RIFF" or mm[8:12] != b"WAVE":
+            raise ValueError("not a RIFF/WAVE file")
+        fmt = None
+        pos = 12
+        while pos + 8 <= len(mm):
+            cid = mm[pos:pos + 4]
+            size = struct.unpack_from("<I", mm, pos + 4)[0]
+            body = pos + 8
+            if cid == b"fmt ":
+                fmt = struct.unpack_from("<HHIIHH", mm, body)
+            elif cid == b"data":
+                if fmt is None:
+                    raise ValueError("data chunk before fmt chunk")
+                tag, self.channels, self.rate, _, self.block_align, self.bits = fmt
+                if tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE) or self.bits != 16:
+                    raise ValueError(f"unsupported WAV format (tag {tag:#x}, {self.bits} bit)")
+                if size in (0, 0xFFFFFFFF):  # left unset when ffmpeg wrote to a pipe
+                    size = len(mm) - body
+                self.data_start = body
+                self.data_end = min(body + size, len(mm))
+                return
+            pos = body + size + (size & 1)  # chunks are word-aligned
+        raise ValueError("no data chunk")
+
+    @property
+    def frames(self) -> int:
+        return (self.data_end - self.data_start) // self.block_align
+
+    def segment_bytes(self, start: float, end: float) -> memoryview:
+        a = min(self.frames, max(0, round(start * self.rate)))
+        b = min(self.frames, max(a, round(end * self.rate)))
+        off = self.data_start
+        return memoryview(self.mm)[off + a * self.block_align:off + b * self.block_align]
+
+    def write_segment(self, path: str, start: float, end: float) -> None:
+        with wave.open(path, "wb") as w:
+            w.setnchannels(self.channels)
+            w.setsampwidth(self.bits // 8)
+            w.setframerate(self.rate)
+            with self.segment_bytes(start, end) as data:
+                w.writeframes(data)
+
+    @property
+    def duration(self) -> float:
+        return self.frames / float(self.rate)
+
+    def samples(self, start_frame: int, end_frame: int) -> np.ndarray:
+        # int16 view of the mapping (channels averaged for non-mono input), no copy for mono
+        import numpy as np
+
+        n = end_frame - start_frame
+        x = np.frombuffer(self.mm, dtype="<i2", count=n * self.channels,
+                          offset=self.data_start + start_frame * self.block_align)
+        if self.channels > 1:
+            x = x.reshape(n, self.channels).mean(axis=1)
+        return x
+
+    def close(self) -> None:
+        try:
+            self.mm.close()
+        except BufferError:  # a NumPy view is still alive; the mapping goes with it
+            pass
+        self.f.close()
+
+
+# ---------------- Segmentation ----------------
+def wav_duration(path: str) -> float:
+    try:
+        with wave.open(path, "rb") as w:
+            return w.getnframes() / float(w.getframerate())
+    except (wave.Error, EOFError):
+        # not plain PCM: ask ffprobe
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        return float(out.strip())
+
+def run_silencedetect(wav: str, threshold: str, duration: float) -> List[str]:
+    """
+    ffmpeg silencedetect; returns only the silence_start / silence_end log lines.
+    """
+    proc = subprocess.run(
+        ["ffmpeg", "-i", wav, "-af", f"silencedetect=noise={threshold}:d={duration}", "-f", "null", "-"],
+        capture_output=True, text=True, errors="replace",
+    )
+    return [ln for ln in proc.stderr.splitlines() if "silence_start" in ln or "silence_end" in ln]
+
+def parse_silencedetect(log_lines: Iterable[str]) -> Tuple[List[float], List[float]]:
+    starts: List[float] = []
+    ends: List[float] = []
+    for line in log_lines:
+        if "silence_start:" in line:
+            m = SILENCE_START_RE.search(line)
+            if m:
+                starts.append(float(m.group(1)))
+        elif "silence_end:" in line:
+            m = SILENCE_END_RE.search(line)
+            if m:
+                ends.append(float(m.group(1)))
+    return starts, ends
+
+def noise_db(threshold: str) -> float:
+    """
+    silencedetect's noise= value: "-35dB", or an amplitude ratio like "0.02".
+    """
+    t = threshold.strip()
+    if t.lower().endswith("db"):
+        return float(t[:-2])
+    ratio = float(t)
+    if ratio <= 0:
+        raise ValueError(f"invalid noise threshold: {threshold}")
+    return 20.0 * math.log10(ratio)
+
+def detect_silence_pcm(pcm: PcmWav, threshold_db: float, min_silence: float, *,
+                       hysteresis_db: float = SILENCE_HYSTERESIS_DB,
+                       frame_sec: float = SILENCE_FRAME_SEC) -> Tuple[List[float], List[float]]:
+    """
+    Framed RMS over the mapped PCM, vectorized with NumPy (one pass, in chunks).
+    A frame enters silence below threshold_db and leaves it only above
+    threshold_db + hysteresis_db; frames in between keep the previous state.
+    Returns silencedetect-style (starts, ends) for silences >= min_silence.
+    """
+    import numpy as np
+
+    hop = max(1, round(frame_sec * pcm.rate))
+    n_frames = pcm.frames // hop
+    chunk = hop * max(1, round(SILENCE_CHUNK_SEC / frame_sec))
+    rms_db = np.empty(n_frames, dtype=np.float32)
+    for first in range(0, n_frames * hop, chunk):
+        last = min(first + chunk, n_frames * hop)
+        x = pcm.samples(first, last).astype(np.float32).reshape(-1, hop)
+        rms = np.sqrt(np.einsum("ij,ij->i", x, x) / hop) / 32768.0
+        rms_db[first // hop:last // hop] = 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+    enter = rms_db < threshold_db
+    leave = rms_db >= threshold_db + hysteresis_db
+    decided = enter | leave
+    # state of the last frame that was clearly quiet or loud (audio starts "loud")
+    last = np.maximum.accumulate(np.where(decided, np.arange(n_frames), -1))
+    silent = np.where(last >= 0, enter[np.maximum(last, 0)], False)
+
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+    keep = (run_ends - run_starts) * hop >= min_silence * pcm.rate
+    to_sec = hop / float(pcm.rate)
+    return ([round(float(i) * to_sec, 6) for i in run_starts[keep]],
+            [round(min(float(i) * to_sec, pcm.duration), 6) for i in run_ends[keep]])
+
+def silence_log_lines(starts: List[float], ends: List[float]) -> List[str]:
+    # same shape as ffmpeg's silencedetect lines, so silence.txt reads the same either way
+    out: List[str] = []
+    for s, e in zip(starts, ends):
+        out.append(f"[silencedetect] silence_start: {s:g}")
+        out.append(f"[silencedetect] silence_end: {e:g} | silence_duration: {e - s:g}")
+    return out
+
+def segments_from_silence(starts: List[float], ends: List[float], total: float, *,
+                          min_dur: float, max_gap: float) -> List[Segment]:
+    """
+    Speech = gaps between silences; drop pieces shorter than min_dur,
+    then merge neighbours closer than max_gap.
+    """
+    segments: List[Segment] = []
+    last_end = 0.0
+    for i, silence_start in enumerate(starts):
+        if silence_start > last_end and silence_start - last_end >= min_dur:
+            segments.append((last_end, silence_start))
+        if i < len(ends):
+            last_end = ends[i]
+    if last_end < total and total - last_end >= min_dur:
+        segments.append((last_end, total))
+
+    merged: List[List[float]] = []
+    for s, e in segments:
+        if merged and s - merged[-1][1] < max_gap:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return [(s, e) for s, e in merged]
+
+def segments_fixed(total: float, interval: float) -> List[Segment]:
+    segments: List[Segment] = []
+    start = 0.0
+    while start < total:
+        end = min(start + interval, total)
+        if end - start >= MIN_FIXED_SEG:
+            segments.append((start, end))
+        start = end
+    return segments
+
+def write_segments(path: str, segments: List[Segment]) -> List[Segment]:
+    """
+    Write segments.tsv and return the segments as they were written (3 decimals).
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for s, e in segments:
+            f.write(f"{s:.3f}\t{e:.3f}\n")
+    return [(round_ms(s), round_ms(e)) for s, e in segments]
+
+def silence_engine(requested: str, pcm: Optional[PcmWav]) -> str:
+    """
+    auto: NumPy over the mapped PCM when both are available, else ffmpeg silencedetect.
+    """
+    if requested != "auto":
+        return requested
+    if pcm is None:
+        return "ffmpeg"
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return "ffmpeg"
+    return "numpy"
+
+def plan_segments(args: argparse.Namespace, total: float, pcm: Optional[PcmWav] = None) -> List[Segment]:
+    def by_silence() -> List[Segment]:
+        engine = silence_engine(args.silence, pcm)
+        print(f"🔍 Mode: Silence detection (threshold: {args.silence_threshold}, engine: {engine})")
+        if engine == "numpy":
+            t0 = time.perf_counter()
+            starts, ends = detect_silence_pcm(pcm, noise_db(args.silence_threshold), args.silence_duration,
+                                              hysteresis_db=args.silence_hysteresis)
+            log_lines = silence_log_lines(starts, ends)
+            print(f"[INFO] silence scan: {(time.perf_counter() - t0) * 1000:.0f} ms for {total:.0f}s of audio")
+        else:
+            log_lines = run_silencedetect(args.wav, args.silence_threshold, args.silence_duration)
+            starts, ends = parse_silencedetect(log_lines)
+        with open(os.path.join(args.work_dir, "silence.txt"), "w", encoding="utf-8") as f:
+            f.writelines(ln + "\n" for ln in log_lines)
+        if not starts:
+            print("⚠️  No silence detected")
+            return []
+        segs = segments_from_silence(starts, ends, total, min_dur=args.min_segment_dur, max_gap=args.max_segment_gap)
+        print(f"Found {len(segs)} segments via silence detection")
+        return segs
+
+    def by_interval() -> List[Segment]:
+        print(f"📏 Mode: Fixed interval (every {args.interval:g}s)")
+        segs = segments_fixed(total, args.interval)
+        print(f"Created {len(segs)} segments of ~{args.interval:g}s each")
+        return segs
+
+    if args.mode == "auto":
+        segs = by_silence()
+        if not segs:
+            print("❌ Silence detection failed. Try 'fixed' or 'hybrid' mode.")
+    elif args.mode == "fixed":
+        segs = by_interval()
+    else:
+        segs = by_silence()
+        if not segs:
+            print("⚠️  Silence detection failed, using fixed interval")
+            segs = by_interval()
+        elif len(segs) < args.min_segments:
+            print(f"⚠️  Only {len(segs)} segments found, switching to fixed interval")
+            segs = by_interval()
+    return write_segments(os.path.join(args.work_dir, "segments.tsv"), segs)
+
+
+# ---------------- Cache ----------------
+class TranscriptCache:
+    """
+    Cleaned segment text keyed by blake2b(segment PCM, model, lang, whisper flags).
+    SQLite, one row per segment, committed as soon as the segment finishes
+    (an interrupted run resumes from there); least recently used rows are
+    evicted once the stored text exceeds max_bytes. Shared by the worker threads.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = CACHE_MAX_MB * 1024 * 1024) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            " key TEXT PRIMARY KEY, text TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS transcripts_lru ON transcripts (last_used)")
+        self.db.commit()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+
+    @staticmethod
+    def key(pcm: bytes, model: str, lang: str, flags: Iterable[str]) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        try:
+            st = os.stat(model)
+            model_id = f"{os.path.abspath(model)}|{st.st_size}|{st.st_mtime_ns}"  # a replaced model misses
+        except OSError:
+            model_id = model
+        for part in (CACHE_VERSION, model_id, lang, " ".join(flags)):
+            h.update(part.encode("utf-8") + b"\0")
+        h.update(pcm)
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.db.execute("SELECT text FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE transcripts SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8")) + len(key)
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO transcripts (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                            (key, text, size, time.time()))
+            self.db.commit()
+
+    def evict(self) -> int:
+        """
+        Drop least recently used rows until the cache is back under max_bytes.
+        """
+        with self.lock:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            drop: List[str] = []
+            for key, size in self.db.execute("SELECT key, size FROM transcripts ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                drop.append(key)
+                total -= size
+            self.db.executemany("DELETE FROM transcripts WHERE key = ?", ((k,) for k in drop))
+            self.db.commit()
+            return len(drop)
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# ---------------- Transcription ----------------
+def clean_whisper_output(lines: List[str]) -> str:
+    """
+    whisper-cli -nt output (stdout+stderr) -> one line of lyrics.
+    """
+    out: List[str] = []
+    for line in lines:
+        t = line.strip()
+        if not t:
+            continue
+        low = t.lower()
+        if low.startswith(LOG_PREFIXES) or any(k in low for k in LOG_WORDS):
+            continue
+        t = WHISPER_TS_RE.sub("", t).strip()
+        if t and LYRIC_CHAR_RE.search(t):
+            out.append(t)
+
+    if not out:
+        # Fallback: last non-empty, non-log lines
+        for line in lines[-15:]:
+            t = line.strip()
+            if t and not any(k in t.lower() for k in FALLBACK_LOG_WORDS):
+                t = BRACKET_RE.sub("", t).strip()
+                if len(t) > 3:
+                    out.append(t)
+    return " ".join(out)
+
+def slice_wav_ffmpeg(full_wav: str, seg_wav: str, start: float, end: float) -> None:
+    subprocess.run(
+        ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+         "-i", full_wav, "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-ar", "16000", "-ac", "1", seg_wav],
+        check=True,
+    )
+
+def whisper_supports_offset(whisper_cli: str) -> bool:
+    """
+    whisper-cli --help lists --offset-t / --duration (milliseconds) on every
+    whisper.cpp release that has them; a stub or an old build just won't.
+    """
+    try:
+        proc = subprocess.run([whisper_cli, "--help"], capture_output=True, text=True,
+                              errors="replace", timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    text = proc.stdout + proc.stderr
+    return "--offset-t" in text and "--duration" in text
+
+def choose_slice_mode(mode: str, whisper_cli: str, pcm: Optional[PcmWav]) -> str:
+    """
+    auto: whisper offsets if supported, else mmap slices, else one ffmpeg per segment.
+    """
+    if mode == "offset" or (mode == "auto" and whisper_supports_offset(whisper_cli)):
+        return "offset"
+    if mode in ("auto", "mmap") and pcm is not None:
+        return "mmap"
+    return "ffmpeg"
+
+def transcribe(whisper_cli: str, model: str, lang: str, wav: str, seg_txt: str, *,
+               threads: int = 0, span: Optional[Segment] = None) -> Tuple[str, int]:
+    """
+    -> (cleaned text, whisper-cli exit status)
+    span=(start, end): let whisper-cli read only that part of `wav` (-ot/-d, ms).
+    """
+    cmd = [whisper_cli, "-m", model, "-l", lang, "-f", wav, *WHISPER_FLAGS]
+    if span is not None:
+        cmd += ["-ot", str(round(span[0] * 1000)), "-d", str(round((span[1] - span[0]) * 1000))]
+    if threads > 0:
+        cmd += ["-t", str(threads)]
+    with open(seg_txt, "wb") as f:
+        proc = subprocess.run(cmd, stdout=f, stderr=subprocess.STDOUT)  # non-zero exit: keep whatever it printed
+    with open(seg_txt, "r", encoding="utf-8", errors="ignore") as f:
+        return clean_whisper_output(f.read().splitlines()), proc.returncode
+
+def plan_workers(n_segments: int, jobs: int = 0, threads: int = 0, cpus: int = 0) -> Tuple[int, int]:
+    """
+    (whisper processes at once, threads per process).
+    jobs=0: one worker per WHISPER_THREADS_PER_JOB cores; threads=0: cores split evenly.
+    """
+    cpus = cpus or os.cpu_count() or 1
+    if jobs <= 0:
+        jobs = max(1, cpus // WHISPER_THREADS_PER_JOB)
+    jobs = max(1, min(jobs, n_segments))
+    if threads <= 0:
+        threads = max(1, cpus // jobs)
+    return jobs, threads
+
+def _segment_task(args: argparse.Namespace, i: int, seg: Segment, threads: int,
+                  mode: str, pcm: Optional[PcmWav], cache: Optional[TranscriptCache]) -> Tuple[str, bool]:
+    """
+    -> (cleaned text, served from cache)
+    """
+    s, e = seg
+    seg_txt = os.path.join(args.work_dir, "txt", f"seg_{i}.txt")
+    seg_wav = os.path.join(args.work_dir, "wav", f"seg_{i}.wav")
+
+    key = ""
+    if cache is not None:
+        if pcm is not None:
+            with pcm.segment_bytes(s, e) as data:
+                key = TranscriptCache.key(data, args.model, args.lang, WHISPER_FLAGS)
+        elif mode == "ffmpeg":
+            slice_wav_ffmpeg(args.wav, seg_wav, s, e)
+            with wave.open(seg_wav, "rb") as w:
+                key = TranscriptCache.key(w.readframes(w.getnframes()), args.model, args.lang, WHISPER_FLAGS)
+        if key:
+            text = cache.get(key)
+            if text is not None:
+                with open(seg_txt, "w", encoding="utf-8") as f:
+                    f.write(text + "\n")
+                return text, True
+
+    if mode == "offset":
+        text, rc = transcribe(args.whisper_cli, args.model, args.lang, args.wav, seg_txt, threads=threads, span=seg)
+    else:
+        if mode == "mmap":
+            pcm.write_segment(seg_wav, s, e)
+        elif not key:  # ffmpeg slice not made above
+            slice_wav_ffmpeg(args.wav, seg_wav, s, e)
+        text, rc = transcribe(args.whisper_cli, args.model, args.lang, seg_wav, seg_txt, threads=threads)
+    if rc != 0:
+        print(f"[WARN] seg {i}: whisper-cli exited with status {rc} (see {seg_txt}); not cached", flush=True)
+    elif key and text:
+        # only a clean, non-empty run is cached: a crashed / OOM-killed run would
+        # otherwise be served for this segment on every later run
+        cache.put(key, text)
+    return text, False
+
+def transcribe_segments(args: argparse.Namespace, segments: List[Segment],
+                        pcm: Optional[PcmWav] = None) -> List[lc.Block]:
+    """
+    Runs up to `jobs` slice+whisper tasks at once (threads are enough: the work
+    is in the child processes) and reassembles the blocks in segment order.
+    """
+    os.makedirs(os.path.join(args.work_dir, "wav"), exist_ok=True)
+    os.makedirs(os.path.join(args.work_dir, "txt"), exist_ok=True)
+    jobs, threads = plan_workers(len(segments), args.jobs, args.threads)
+    mode = choose_slice_mode(args.slice, args.whisper_cli, pcm)
+    print(f"🎵 Transcribing segments... (workers: {jobs}, threads each: {threads}, slicing: {mode})")
+
+    cache = None if args.no_cache else TranscriptCache(args.cache, args.cache_mb * 1024 * 1024)
+    texts: List[str] = [""] * len(segments)
+    done = 0
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            futs = {pool.submit(_segment_task, args, i, seg, threads, mode, pcm, cache): i
+                    for i, seg in enumerate(segments, start=1)}
+            try:
+                for fut in as_completed(futs):
+                    i = futs[fut]
+                    texts[i - 1], cached = fut.result()
+                    done += 1
+                    print(f"  [{done}/{len(segments)}] seg {i} " + ("✓ (cached)" if cached else "✓"), flush=True)
+            except BaseException:
+                for f in futs:
+                    f.cancel()
+                raise
+        if cache is not None:
+            evicted = cache.evict()
+            print(f"[INFO] cache: {cache.hits}/{len(segments)} segments reused"
+                  + (f", {evicted} old entries evicted" if evicted else ""))
+    finally:
+        if cache is not None:
+            cache.close()
+
+    return [lc.Block(str(i), f"{sec_to_srt(s)} --> {sec_to_srt(e)}", [text or NO_TEXT])
+            for i, ((s, e), text) in enumerate(zip(segments, texts), start=1)]
+
+
+# ---------------- Output ----------------
+def write_raw(path: str, blocks: List[lc.Block]) -> None:
+    # Same layout the shell loop produced (text unnormalized, blank line after every block)
+    with open(path, "w", encoding="utf-8") as f:
+        for b in blocks:
+            f.write(f"{b.raw_index}\n{b.timestamp}\n" + "\n".join(b.lines) + "\n\n")
+
+def write_cleaned(path: str, blocks: List[lc.Block]) -> Tuple[int, Counter]:
+    """
+    lyrics_cleanup's default filters over the in-memory blocks (no re-parse).
+    """
+    reasons: Counter = Counter()
+    with open(path, "w", encoding="utf-8") as f:
+        sink = lc.BlockSink(f, plain=False, renumber=True)
+        for b in blocks:
+            drop, reason = lc.should_drop_block(b)
+            if drop:
+                reasons[reason.split("(", 1)[0]] += 1
+            else:
+                sink.write(b)
+        sink.close()
+    return sink.count, reasons
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Segment + transcribe + assemble SRT lyrics in one process.")
+    ap.add_argument("wav", help="Mono 16 kHz WAV of the whole song")
+    ap.add_argument("--work-dir", required=True, help="Work dir (segments.tsv, silence.txt, wav/, txt/)")
+    ap.add_argument("--lang", default="en", choices=["en", "ja", "zh"], help="Whisper language (default: en)")
+    ap.add_argument("--mode", default="hybrid", choices=MODES, help="Segmentation mode (default: hybrid)")
+    ap.add_argument("--interval", type=float, default=12.0, help="Fixed-interval length in seconds (default: 12)")
+    ap.add_argument("--model", required=True, help="whisper.cpp model file")
+    ap.add_argument("--whisper-cli", default=os.environ.get("WHISPER_CLI") or "whisper-cli", help="whisper-cli binary")
+    ap.add_argument("--silence-threshold", default="-35dB", help="silencedetect noise level (default: -35dB)")
+    ap.add_argument("--silence-duration", type=float, default=0.8, help="Minimum silence length (default: 0.8)")
+    ap.add_argument("--silence-hysteresis", type=float, default=SILENCE_HYSTERESIS_DB,
+                    help=f"numpy engine: dB above the threshold needed to leave silence (default: {SILENCE_HYSTERESIS_DB:g})")
+    ap.add_argument("--silence", default=os.environ.get("LYRICS_SILENCE") or "auto", choices=SILENCE_ENGINES,
+                    help="Silence detection: NumPy RMS over the mapped WAV, or ffmpeg silencedetect "
+                         "(default: $LYRICS_SILENCE or auto = numpy when available)")
+    ap.add_argument("--min-segment-dur", type=float, default=2.0, help="Ignore speech shorter than this (default: 2.0)")
+    ap.add_argument("--max-segment-gap", type=float, default=1.5, help="Merge segments closer than this (default: 1.5)")
+    ap.add_argument("--min-segments", type=int, default=3, help="hybrid: fall back to fixed below this many (default: 3)")
+    ap.add_argument("-j", "--jobs", type=int, default=int(os.environ.get("WHISPER_JOBS") or 0),
+                    help="whisper processes at once (default: $WHISPER_JOBS or CPU count / 4)")
+    ap.add_argument("--threads", type=int, default=int(os.environ.get("WHISPER_THREADS") or 0),
+                    help="whisper -t per process (default: $WHISPER_THREADS or CPU count / jobs)")
+    ap.add_argument("--slice", default=os.environ.get("LYRICS_SLICE") or "auto", choices=SLICE_MODES,
+                    help="Segment audio: whisper -ot/-d on the full WAV, mmap slices, or ffmpeg per segment "
+                         "(default: $LYRICS_SLICE or auto = offset if whisper-cli supports it, else mmap)")
+    ap.add_argument("--cache", default=DEFAULT_CACHE,
+                    help="Transcript cache DB (default: $LYRICS_CACHE_DB or $TOOLBOX_DIR/_out/Lyrics/.cache/transcripts.sqlite)")
+    ap.add_argument("--cache-mb", type=int, default=int(os.environ.get("LYRICS_CACHE_MB") or CACHE_MAX_MB),
+                    help=f"Cache size bound, LRU eviction (default: $LYRICS_CACHE_MB or {CACHE_MAX_MB})")
+    ap.add_argument("--no-cache", action="store_true", help="Transcribe every segment, bypassing the cache")
+    ap.add_argument("--out", default="", help="Raw transcript path (default: <work-dir>/lyrics.<lang>.srt.txt only)")
+    ap.add_argument("--cleaned", default="", help="Also write the lyrics_cleanup-filtered transcript here")
+    return ap.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not os.path.isfile(args.wav):
+        print(f"[ERROR] WAV not found: {args.wav}", file=sys.stderr)
+        return 2
+    if args.interval <= 0:
+        print(f"[ERROR] Invalid interval: {args.interval}", file=sys.stderr)
+        return 2
+    try:
+        noise_db(args.silence_threshold)
+    except ValueError:
+        print(f"[ERROR] Invalid silence threshold: {args.silence_threshold}", file=sys.stderr)
+        return 2
+
+    try:
+        pcm: Optional[PcmWav] = PcmWav(args.wav)
+    except (OSError, ValueError) as e:
+        pcm = None
+        if args.slice == "mmap" or args.silence == "numpy":
+            print(f"[ERROR] cannot map {args.wav}: {e}", file=sys.stderr)
+            return 2
+        print(f"[WARN] {args.wav} is not 16-bit PCM ({e}); using ffmpeg for silence/slicing")
+
+    try:
+        needs_ffmpeg = pcm is None or args.silence == "ffmpeg" or args.slice == "ffmpeg"
+        for tool in (["ffmpeg"] if needs_ffmpeg else []) + [args.whisper_cli]:
+            if not shutil.which(tool):
+                print(f"[ERROR] {tool} not found", file=sys.stderr)
+                return 2
+        os.makedirs(args.work_dir, exist_ok=True)
+
+        total = pcm.duration if pcm is not None else wav_duration(args.wav)
+        segments = plan_segments(args, total, pcm)
+        if not segments:
+            print("❌ No segments created")
+            return 3
+
+        blocks = transcribe_segments(args, segments, pcm)
+    finally:
+        if pcm is not None:
+            pcm.close()
+
+    merged = os.path.join(args.work_dir, f"lyrics.{args.lang}.srt.txt")
+    write_raw(merged, blocks)
+    if args.out:
+        shutil.copyfile(merged, args.out)
+
+    if args.cleaned:
+        kept, reasons = write_cleaned(args.cleaned, blocks)
+        detail = ", ".join(f"{r}={n}" for r, n in reasons.most_common())
+        print(f"[OK] cleaned blocks: {kept} / {len(blocks)}" + (f" ({detail})" if detail else ""))
+        print(f"[OK] cleaned: {args.cleaned}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        raise SystemExit(main())
+    except KeyboardInterrupt:
+        print("\n[WARN] interrupted", file=sys.stderr)
+        raise SystemExit(130)
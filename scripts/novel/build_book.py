@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os
-import re
 import argparse
-import subprocess
+import os
+import sys
+
+from novelkit.cli import main as novelkit_main
 
 ##=========用法=========
 #运行方式（举例）：
@@ -13,69 +14,62 @@ import subprocess
 #易中天品三国.md
 #易中天品三国.epub
 #
+#合并/转换逻辑在 novelkit 包里，等价于：
+#python3 -m novelkit merge --in-dir DIR --title T --out-md T.md --style book
+#python3 -m novelkit epub T.md --title T --toc
 #
+#需要多种格式时（一次读取章节，同时写出）：
+#python3 build_book.py --in-dir "./yztpingsanguo" --title "易中天品三国" --format md --format txt --format epub
 #
+#超长书按卷拆分（每卷 200 章，多进程并行生成 易中天品三国.vol001.epub ...，--omnibus 另出合订本）：
+#python3 build_book.py --in-dir "./yztpingsanguo" --title "易中天品三国" --volume-size 200 --omnibus
 #
-CHAPTER_RE = re.compile(r"^(\d+)\.md$", re.IGNORECASE)
-
-def find_chapter_files(folder: str):
-    items = []
-    for fn in os.listdir(folder):
-        m = CHAPTER_RE.match(fn)
-        if m:
-            idx = int(m.group(1))
-            items.append((idx, os.path.join(folder, fn)))
-    items.sort(key=lambda x: x[0])
-    return items
-
-def merge_md(chapters, out_md: str, book_title: str, drop_source_line: bool = True):
-    with open(out_md, "w", encoding="utf-8") as w:
-        w.write(f"# {book_title}\n\n")
-        for idx, path in chapters:
-            with open(path, "r", encoding="utf-8") as r:
-                content = r.read().strip()
-
-            # 可选：去掉每章的 “来源：xxx” 这行（更适合做 epub）
-            if drop_source_line:
-                content = re.sub(r"^来源：.*\n\n", "", content, flags=re.M)
-
-            w.write("\n\n---\n\n")
-            w.write(content)
-            w.write("\n")
-
-def md_to_epub(in_md: str, out_epub: str, book_title: str):
-    cmd = [
-        "pandoc",
-        in_md,
-        "-o", out_epub,
-        "--toc",
-        "--metadata", f"title={book_title}",
-    ]
-    subprocess.run(cmd, check=True)
 
-def main():
+def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--in-dir", required=True, help="章节 md 所在目录（包含 001.md/002.md...）")
     ap.add_argument("--title", required=True, help="书名（用于 md 标题与 epub metadata）")
     ap.add_argument("--out-md", default="", help="合并后的 md 文件名（默认：书名.md）")
     ap.add_argument("--out-epub", default="", help="输出 epub 文件名（默认：书名.epub）")
+    ap.add_argument("--zero-copy", action="store_true", help="零拷贝合并：只扫描章节头部，正文直接按字节拷贝")
+    ap.add_argument("--format", action="append", choices=["md", "txt", "epub", "html", "jsonl"],
+                    help="单次遍历导出的格式，可重复（指定后 epub 不再经过 pandoc）")
+    ap.add_argument("--volume-size", type=int, default=0, help="每卷章节数，>0 时按卷拆成多个 epub 并行生成")
+    ap.add_argument("--by-heading", action="store_true", help="按抓取时记录的分卷标题（第一卷 ...）拆分")
+    ap.add_argument("--jobs", type=int, default=0, help="分卷并行进程数（默认：CPU 核数）")
+    ap.add_argument("--omnibus", action="store_true", help="分卷之外再生成整本合订 epub（即 --out-epub）")
+    ap.add_argument("--engine", choices=["pandoc", "native"], default="pandoc", help="分卷 epub 生成方式")
     args = ap.parse_args()
 
-    in_dir = args.in_dir
     book_title = args.title
     out_md = args.out_md or f"{book_title}.md"
     out_epub = args.out_epub or f"{book_title}.epub"
 
-    chapters = find_chapter_files(in_dir)
-    if not chapters:
-        raise SystemExit(f"在 {in_dir} 未找到形如 001.md/002.md 的章节文件。")
+    if args.volume_size > 0 or args.by_heading:
+        argv = ["volumes", "--in-dir", args.in_dir, "--title", book_title, "--style", "book",
+                "--out-base", os.path.splitext(out_epub)[0], "--volume-size", str(args.volume_size),
+                "--jobs", str(args.jobs), "--engine", args.engine]
+        if args.by_heading:
+            argv.append("--by-heading")
+        if args.omnibus:
+            argv.append("--omnibus")
+        return novelkit_main(argv)
 
-    merge_md(chapters, out_md, book_title, drop_source_line=True)
-    md_to_epub(out_md, out_epub, book_title)
+    if args.format:
+        argv = ["export", "--in-dir", args.in_dir, "--title", book_title, "--style", "book",
+                "--out-base", book_title, "--out-md", out_md, "--out-epub", out_epub]
+        for fmt in args.format:
+            argv += ["--format", fmt]
+        return novelkit_main(argv)
 
-    print("完成：")
-    print(" -", os.path.abspath(out_md))
-    print(" -", os.path.abspath(out_epub))
+    merge_argv = ["merge", "--in-dir", args.in_dir, "--title", book_title,
+                  "--out-md", out_md, "--style", "book"]
+    if args.zero_copy:
+        merge_argv.append("--zero-copy")
+    rc = novelkit_main(merge_argv)
+    if rc != 0:
+        return rc
+    return novelkit_main(["epub", out_md, "--out-epub", out_epub, "--title", book_title, "--toc"])
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
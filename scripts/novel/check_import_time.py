@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Startup smoke check for novelkit (run after touching novelkit imports).
+
+Runs the launchers under `python3 -X importtime` and fails (exit 1) when:
+- a launcher exits non-zero (its stderr is printed)
+- --help / merge / epub --help / stats / reparse pull in requests, bs4, lxml, ...
+- the summed top-level import time after interpreter startup (site) exceeds --budget-ms
+
+Usage:
+  python3 check_import_time.py
+  python3 check_import_time.py --budget-ms 40 -v
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ("requests", "bs4", "lxml", "urllib3", "charset_normalizer", "soupsieve")
+
+
+def import_profile(argv: List[str]) -> Tuple[int, int, int, Dict[str, int], List[str]]:
+    """
+    返回 (退出码, 解释器启动 site 耗时, site 之后顶层 import 累计微秒, {模块名: 累计微秒}, 其余 stderr 行)。
+    site（含 .pth 引入的东西）取决于环境，不计入 novelkit 预算。
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=HERE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    modules: Dict[str, int] = {}
+    errors: List[str] = []
+    site_us = top_level_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header row
+        cumulative = int(parts[1].strip())
+        name = parts[2]
+        modules[name.strip()] = cumulative
+        # 顶层模块名前只有一个空格；嵌套 import 会额外缩进
+        if len(name) - len(name.lstrip()) != 1:
+            continue
+        if name.strip() == "site":
+            site_us, top_level_us = cumulative, 0
+        else:
+            top_level_us += cumulative
+    return proc.returncode, site_us, top_level_us, modules, errors
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Enforce novelkit import-time budget for light commands.")
+    ap.add_argument("--budget-ms", type=float, default=50.0, help="顶层 import 总耗时上限（毫秒，默认 50）")
+    ap.add_argument("-v", "--verbose", action="store_true", help="打印每个场景最慢的 import")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as book:
+        for i in range(1, 4):
+            with open(os.path.join(book, f"{i:03d} 第{i}章.md"), "w", encoding="utf-8") as f:
+                f.write(f"# 第{i}章\n\n正文。\n")
+
+        cases = [
+            ["novel_crawler.py", "--help"],
+            ["build_book.py", "--help"],
+            ["-m", "novelkit", "--help"],
+            ["-m", "novelkit", "merge", "--in-dir", book, "--out-md", os.path.join(book, "all.md")],
+            ["-m", "novelkit", "epub", "--help"],
+            ["-m", "novelkit", "stats", book],
+            ["-m", "novelkit", "reparse", book, "--dry-run"],
+        ]
+
+        failed = 0
+        for argv in cases:
+            rc, site_us, total_us, modules, errors = import_profile(argv)
+            heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY_MODULES)
+            label = " ".join(a.replace(book, "<book>") for a in argv)
+            over = total_us / 1000 > args.budget_ms
+            # 启动即崩溃的命令 import 得少、耗时也低，必须按退出码判失败
+            status = "FAIL" if (rc != 0 or heavy or over) else "OK"
+            print(f"[{status}] {total_us / 1000:6.1f} ms (+{site_us / 1000:.1f} ms site)  {label}")
+            if rc != 0:
+                print(f"       exit status {rc}:")
+                for line in errors[-20:]:
+                    print(f"       | {line.replace(book, '<book>')}")
+            if heavy:
+                print(f"       heavy imports: {', '.join(heavy[:6])}")
+            if args.verbose:
+                for name, us in sorted(modules.items(), key=lambda kv: -kv[1])[:5]:
+                    print(f"       {us / 1000:6.1f} ms  {name}")
+            failed += status == "FAIL"
+
+    if failed:
+        print(f"[ERROR] {failed} case(s) failed, over budget ({args.budget_ms:.0f} ms) or importing heavy deps", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Novel Watch (launcher) -> `novelkit watch`
+
+Example:
+  novel_watch add "https://www.bidutuijian.com/books/yztpingsanguo/000.html" \
+    --out "./yztpingsanguo" --merge "易中天品三国.md" --epub
+  novel_watch status
+  novel_watch run            # Ctrl+C to stop (exit 130)
+  novel_watch run --once     # poll only the books that are due, then exit
+"""
+
+import sys
+
+from novelkit.cli import main
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(["watch", *sys.argv[1:]]))
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+"""
+novelkit — novel crawler / merge / epub toolkit.
+
+Subcommands (python3 -m novelkit <cmd> --help):
+  crawl    抓取目录页与章节（requests + bs4）
+  catalog  从分类/作者列表页发现整批书并逐本抓取（可续跑）
+  merge    合并章节 md 为单文件
+  epub     md -> epub（pandoc）
+  export   一次读取章节，同时导出 md/txt/epub/html/jsonl
+  volumes  超长书按卷拆成多个 epub，多进程并行生成
+  reparse  对已下载章节重新跑清洗规则
+  stats    统计书目录（章节数 / 字数 / 体积）
+  suspects 离线找出截断 / 占位章节，可标记为下次续抓时重抓
+  index    把书库增量写入全文索引（SQLite FTS5，汉字双字切分）
+  search   全文检索书库，输出 书 / 章节 / 摘要
+  watch    常驻监视连载，按更新节奏轮询
+
+Heavy dependencies (requests / bs4) are imported only inside the commands
+that need them, so --help and merge/epub/stats start fast.
+"""
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+from novelkit.cli import main
+
+raise SystemExit(main())
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+
+"""
+Catalog crawl: mirror whole categories / author pages.
+
+- Listing pages are walked for book TOC URLs (--book-pattern) and further
+  listing pages (--listing-pattern, up to --max-depth)
+- URL frontier with priorities (books before more listings), persisted in SQLite
+- Failed books / listings stay queued with exponential backoff (--retries, --retry-backoff)
+- Visited set: in-memory Bloom filter (≈1.2 MB per million URLs) in front of an
+  exact on-disk store of 64-bit URL hashes, so memory stays flat
+- Every discovered book goes through extract_chapters_from_toc -> fetch_chapters
+- State: $TOOLBOX_DIR/_out/novel_catalog/<host>.sqlite (resume = rerun the same command)
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import math
+import os
+import posixpath
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from urllib import robotparser
+from urllib.parse import urldefrag, urlparse
+
+import requests
+
+from novelkit.common import DEFAULT_UA, TOOLBOX_DIR, ensure_dir, polite_sleep, sanitize_filename
+from novelkit.crawl import build_outputs, fetch_chapters
+from novelkit.fetch import build_session, fetch_html
+from novelkit.parse import extract_chapters_from_toc, extract_links
+
+
+DEFAULT_STATE_DIR = os.path.join(TOOLBOX_DIR, "_out", "novel_catalog")
+
+BOOK_PRIORITY = 100      # 已发现的书优先抓完，再继续翻列表页
+LISTING_PRIORITY = 50    # 列表页：越深优先级越低
+SAVE_EVERY = 200         # 每处理/入队这么多条落盘一次 Bloom
+QUEUE_COLUMNS = {"attempts": "INTEGER NOT NULL DEFAULT 0", "not_before": "REAL NOT NULL DEFAULT 0"}
+
+
+def url_hash(url: str) -> int:
+    """
+    64-bit 有符号整数（SQLite INTEGER 直接存），同时用作 Bloom 的双哈希种子。
+    """
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+# ----------------------------- Bloom filter -----------------------------
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = 0.01, data: Optional[bytes] = None) -> None:
+        self.m = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.bits = bytearray(data) if data and len(data) == (self.m + 7) // 8 else bytearray((self.m + 7) // 8)
+
+    def _positions(self, h: int) -> Iterable[int]:
+        h &= (1 << 64) - 1
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return ((h1 + i * h2) % self.m for i in range(self.k))
+
+    def add(self, h: int) -> None:
+        for p in self._positions(h):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, h: int) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(h))
+
+
+# ----------------------------- Frontier -----------------------------
+class Frontier:
+    """
+    queue: 待处理 URL（priority 高者先出，同级先进先出；失败的条目带 attempts，not_before 之前不出队）
+    seen:  所有入过队的 URL 哈希（精确集合，WITHOUT ROWID 紧凑存储）
+    books: 每本书的处理结果（可直接用 sqlite3 查看）
+    """
+
+    def __init__(self, path: str, capacity: int = 1_000_000) -> None:
+        ensure_dir(os.path.dirname(os.path.abspath(path)))
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL, kind TEXT NOT NULL, priority INTEGER NOT NULL, depth INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0, not_before REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS queue_order ON queue (priority DESC, id);
+            CREATE TABLE IF NOT EXISTS seen (h INTEGER PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS books (
+                url TEXT PRIMARY KEY, out TEXT, chapters INTEGER, written INTEGER,
+                status TEXT, error TEXT, updated REAL
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value BLOB);
+            """
+        )
+        # 旧版本建的库没有重试列：补上
+        have = {r[1] for r in self.db.execute("PRAGMA table_info(queue)")}
+        for col, decl in QUEUE_COLUMNS.items():
+            if col not in have:
+                self.db.execute(f"ALTER TABLE queue ADD COLUMN {col} {decl}")
+        row = self.db.execute("SELECT value FROM meta WHERE key='bloom'").fetchone()
+        self.bloom = BloomFilter(capacity, data=row[0] if row else None)
+        if row is None or len(row[0]) != len(self.bloom.bits):
+            # 容量变了 / 首次：从精确集合重建（哈希本身即 Bloom 种子，无需原始 URL）
+            for (h,) in self.db.execute("SELECT h FROM seen"):
+                self.bloom.add(h)
+        self.pending = 0
+
+    def seen(self, url: str) -> bool:
+        h = url_hash(url)
+        if h not in self.bloom:
+            return False  # Bloom 说没有就一定没有，不碰磁盘
+        return self.db.execute("SELECT 1 FROM seen WHERE h=?", (h,)).fetchone() is not None
+
+    def push(self, url: str, kind: str, priority: int, depth: int) -> bool:
+        if self.seen(url):
+            return False
+        h = url_hash(url)
+        self.db.execute("INSERT OR IGNORE INTO seen (h) VALUES (?)", (h,))
+        self.db.execute("INSERT INTO queue (url, kind, priority, depth) VALUES (?, ?, ?, ?)",
+                        (url, kind, priority, depth))
+        self.bloom.add(h)
+        self._tick()
+        return True
+
+    def pop(self) -> Optional[Tuple[int, str, str, int, float]]:
+        """
+        取队首但不删除（处理完再 done / retry），中途 Ctrl+C 的条目下次续跑会重做。
+        已到期的条目按优先级出队；全都在退避中时返回最早到期的那条（调用方等到 not_before）。
+        """
+        cols = "SELECT id, url, kind, depth, not_before FROM queue"
+        return (
+            self.db.execute(f"{cols} WHERE not_before <= ? ORDER BY priority DESC, id LIMIT 1", (time.time(),)).fetchone()
+            or self.db.execute(f"{cols} ORDER BY not_before, id LIMIT 1").fetchone()
+        )
+
+    def done(self, item_id: int) -> None:
+        self.db.execute("DELETE FROM queue WHERE id=?", (item_id,))
+        self._tick()
+
+    def retry(self, item_id: int, *, max_attempts: int, backoff: float) -> int:
+        """
+        失败的条目留在队里，backoff * 2^(n-1) 秒后再试；第 max_attempts 次仍失败则出队。
+        返回已失败次数，出队时返回 0。
+        """
+        row = self.db.execute("SELECT attempts FROM queue WHERE id=?", (item_id,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        if attempts >= max_attempts:
+            self.done(item_id)
+            return 0
+        delay = backoff * (2 ** min(attempts - 1, 10))
+        self.db.execute("UPDATE queue SET attempts=?, not_before=? WHERE id=?", (attempts, time.time() + delay, item_id))
+        self._tick()
+        return attempts
+
+    def record_book(self, url: str, out: str, *, chapters: int = 0, written: int = 0,
+                    status: str = "ok", error: str = "") -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO books (url, out, chapters, written, status, error, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, out, chapters, written, status, error, time.time()),
+        )
+
+    def _tick(self) -> None:
+        self.pending += 1
+        if self.pending >= SAVE_EVERY:
+            self.save()
+
+    def save(self) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('bloom', ?)", (bytes(self.bloom.bits),))
+        self.db.commit()
+        self.pending = 0
+
+    def get_meta(self, key: str, default: str = "") -> str:
+        row = self.db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def stats(self) -> Dict[str, int]:
+        q = dict(self.db.execute("SELECT kind, COUNT(*) FROM queue GROUP BY kind").fetchall())
+        b = dict(self.db.execute("SELECT status, COUNT(*) FROM books GROUP BY status").fetchall())
+        return {
+            "seen": self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0],
+            "queued_listings": q.get("listing", 0),
+            "queued_books": q.get("book", 0),
+            "queued_retries": self.db.execute("SELECT COUNT(*) FROM queue WHERE attempts > 0").fetchone()[0],
+            "books_ok": b.get("ok", 0),
+            "books_failed": b.get("failed", 0),
+        }
+
+    def close(self) -> None:
+        self.save()
+        self.db.close()
+
+
+# ----------------------------- Crawl -----------------------------
+def book_slug(toc_url: str) -> str:
+    """
+    /books/yztpingsanguo/000.html -> yztpingsanguo；/book/123/ -> 123
+    """
+    parts = [p for p in urlparse(toc_url).path.split("/") if p]
+    while parts and re.fullmatch(r"(?:index|000)\.html?", parts[-1], re.IGNORECASE):
+        parts.pop()
+    name = posixpath.splitext(parts[-1])[0] if parts else urlparse(toc_url).netloc
+    return sanitize_filename(name)
+
+
+class RobotsCache:
+    def __init__(self, session: requests.Session) -> None:
+        self.session = session
+        self.parsers: Dict[str, Optional[robotparser.RobotFileParser]] = {}
+
+    def allowed(self, url: str) -> bool:
+        parsed = urlparse(url)
+        host = f"{parsed.scheme}://{parsed.netloc}"
+        if host not in self.parsers:
+            rp: Optional[robotparser.RobotFileParser] = robotparser.RobotFileParser()
+            try:
+                rp.parse(fetch_html(self.session, host + "/robots.txt", retries=2).splitlines())
+            except Exception:
+                rp = None  # 没有 robots.txt 视为允许
+            self.parsers[host] = rp
+        rp = self.parsers[host]
+        return rp is None or rp.can_fetch(DEFAULT_UA, url)
+
+
+def crawl_listing(session: requests.Session, frontier: Frontier, url: str, depth: int,
+                  ns: argparse.Namespace, book_re: re.Pattern, listing_re: re.Pattern) -> Tuple[int, int]:
+    html = fetch_html(session, url, timeout=ns.timeout)
+    host = urlparse(url).netloc
+    books = listings = 0
+    for link in extract_links(html, url):
+        link = urldefrag(link)[0]
+        parsed = urlparse(link)
+        if parsed.netloc != host or parsed.scheme not in ("http", "https"):
+            continue
+        if book_re.search(parsed.path):
+            books += frontier.push(link, "book", BOOK_PRIORITY, depth + 1)
+        elif depth < ns.max_depth and listing_re.search(link):
+            listings += frontier.push(link, "listing", LISTING_PRIORITY - depth - 1, depth + 1)
+    return books, listings
+
+
+def crawl_book(session: requests.Session, frontier: Frontier, toc_url: str, ns: argparse.Namespace) -> None:
+    out_dir = os.path.join(ns.out_root, book_slug(toc_url))
+    bns = argparse.Namespace(
+        toc_url=toc_url,
+        out=out_dir,
+        merge=f"{book_slug(toc_url)}.md" if ns.merge else "",
+        epub=ns.epub,
+        title="",
+        min_sleep=ns.min_sleep,
+        max_sleep=ns.max_sleep,
+        timeout=ns.timeout,
+        page_workers=ns.page_workers,
+        force=False,
+        dedupe=ns.dedupe,
+        volume_size=0,
+        by_heading=False,
+        jobs=0,
+        omnibus=False,
+        engine="pandoc",
+        progress_every=0,
+        progress_seconds=0.0,
+        quality_gate="requeue",
+        quality_retries=2,
+        quality_backoff=30.0,
+    )
+    toc_html = fetch_html(session, toc_url, timeout=ns.timeout)
+    chapters = extract_chapters_from_toc(toc_html, toc_url)
+    if not chapters:
+        frontier.record_book(toc_url, out_dir, status="failed", error="no chapter links in TOC")
+        print(f"[WARN] no chapters: {toc_url}")
+        return
+
+    print(f"[BOOK] {book_slug(toc_url)}: {len(chapters)} chapters -> {out_dir}")
+    ensure_dir(out_dir)
+    written = fetch_chapters(session, chapters, bns)
+    build_outputs(bns)
+    frontier.record_book(toc_url, out_dir, chapters=len(chapters), written=written)
+
+
+def default_state_path(seeds: Iterable[str]) -> str:
+    host = next((urlparse(s).netloc for s in seeds), "") or "catalog"
+    return os.path.join(DEFAULT_STATE_DIR, f"{sanitize_filename(host)}.sqlite")
+
+
+def run_catalog(ns: argparse.Namespace) -> int:
+    if not ns.seeds and not ns.state:
+        print("[ERROR] give seed listing URL(s), or --state to resume an existing frontier.")
+        return 2
+    state = ns.state or default_state_path(ns.seeds)
+    frontier = Frontier(state, capacity=ns.capacity)
+
+    if ns.status:
+        for key, val in frontier.stats().items():
+            print(f"{key:<16} {val}")
+        frontier.close()
+        return 0
+
+    # 续跑时沿用首次的输出根目录
+    if ns.out_root:
+        frontier.set_meta("out_root", os.path.abspath(ns.out_root))
+    ns.out_root = frontier.get_meta("out_root") or os.path.abspath("./novel_catalog")
+
+    book_re = re.compile(ns.book_pattern)
+    listing_re = re.compile(ns.listing_pattern)
+    session = build_session()
+    robots = RobotsCache(session)
+
+    for seed in ns.seeds:
+        kind = "book" if book_re.search(urlparse(seed).path) else "listing"
+        frontier.push(seed, kind, BOOK_PRIORITY if kind == "book" else LISTING_PRIORITY, 0)
+
+    print(f"[INFO] frontier: {state}")
+    books_done = 0
+    try:
+        while True:
+            item = frontier.pop()
+            if item is None:
+                break
+            item_id, url, kind, depth, not_before = item
+            if kind == "book" and ns.max_books and books_done >= ns.max_books:
+                print(f"[INFO] --max-books {ns.max_books} reached; rerun to continue.")
+                break
+            wait = not_before - time.time()
+            if wait > 0:
+                print(f"[INFO] 等待 {wait:.0f}s 后重试 {kind}: {url}")
+                time.sleep(wait)
+
+            if not ns.ignore_robots and not robots.allowed(url):
+                print(f"[SKIP] robots.txt: {url}")
+                frontier.done(item_id)
+                continue
+
+            try:
+                if kind == "listing":
+                    books, listings = crawl_listing(session, frontier, url, depth, ns, book_re, listing_re)
+                    print(f"[LIST] d={depth} +{books} books, +{listings} listings <- {url}")
+                else:
+                    crawl_book(session, frontier, url, ns)
+                    books_done += 1
+            except Exception as e:
+                attempts = frontier.retry(item_id, max_attempts=max(1, ns.retries), backoff=ns.retry_backoff)
+                later = f"; retry {attempts + 1}/{ns.retries} later" if attempts else ""
+                print(f"[WARN] {kind} failed: {url} ({e}){later}")
+                if kind == "book":
+                    frontier.record_book(url, "", status="failed", error=str(e))
+            else:
+                frontier.done(item_id)
+            polite_sleep(ns.min_sleep, ns.max_sleep)
+        print("[完成] catalog: " + ", ".join(f"{k}={v}" for k, v in frontier.stats().items()))
+    finally:
+        frontier.close()
+    return 0
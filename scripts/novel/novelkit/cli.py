@@ -0,0 +1,434 @@
+# -*- coding: utf-8 -*-
+
+"""
+novelkit command line. Keep this module stdlib-only: every heavy import
+(requests / bs4 / the crawl pipeline) happens inside the command that needs it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+
+# ----------------------------- Commands -----------------------------
+def cmd_crawl(ns: argparse.Namespace) -> int:
+    from novelkit import crawl
+
+    if not ns.toc_url:
+        ns = crawl.interactive_args()
+    crawl.run(ns)
+    return 0
+
+
+def cmd_catalog(ns: argparse.Namespace) -> int:
+    from novelkit import catalog
+
+    return catalog.run_catalog(ns)
+
+
+def cmd_merge(ns: argparse.Namespace) -> int:
+    from novelkit.output import find_chapter_files, merge_chapters
+
+    if ns.zero_copy:
+        from novelkit.fastmerge import merge_chapters_zero_copy as merge_chapters
+
+    title = ns.title or os.path.basename(os.path.abspath(ns.in_dir))
+    out_md = ns.out_md or os.path.join(ns.in_dir, f"{title}.md")
+    chapters = find_chapter_files(ns.in_dir, exclude=os.path.basename(out_md))
+    if not chapters:
+        print(f"[ERROR] 在 {ns.in_dir} 未找到形如 001.md / '001 标题.md' 的章节文件。", file=sys.stderr)
+        return 1
+
+    merge_chapters(
+        chapters,
+        out_md,
+        title,
+        section_headings=(ns.style == "crawl"),
+        drop_source_line=not ns.keep_source_line,
+    )
+    print(f"[完成] 已合并: {os.path.abspath(out_md)} ({len(chapters)} chapters)")
+    return 0
+
+
+def cmd_export(ns: argparse.Namespace) -> int:
+    from novelkit.export import export_book
+    from novelkit.output import find_chapter_files
+
+    title = ns.title or os.path.basename(os.path.abspath(ns.in_dir))
+    out_base = ns.out_base or os.path.join(ns.in_dir, title)
+    paths = {"md": ns.out_md, "epub": ns.out_epub}
+    chapters = find_chapter_files(ns.in_dir, exclude=os.path.basename(ns.out_md or f"{out_base}.md"))
+    if not chapters:
+        print(f"[ERROR] 在 {ns.in_dir} 未找到形如 001.md / '001 标题.md' 的章节文件。", file=sys.stderr)
+        return 1
+
+    results = export_book(
+        chapters,
+        out_base,
+        title,
+        ns.format or ["md"],
+        section_headings=(ns.style == "crawl"),
+        drop_source_line=not ns.keep_source_line,
+        volume_size=ns.volume_size,
+        lang=ns.lang,
+        paths=paths,
+    )
+    for fmt, path in results.items():
+        print(f"[完成] {fmt:<5} {os.path.abspath(path)}")
+    return 0
+
+
+def cmd_epub(ns: argparse.Namespace) -> int:
+    from novelkit.output import pandoc_epub
+
+    title = ns.title or os.path.splitext(os.path.basename(ns.md))[0]
+    out_epub = ns.out_epub or os.path.splitext(ns.md)[0] + ".epub"
+    if not pandoc_epub(ns.md, out_epub, title=title, lang=ns.lang, toc=ns.toc):
+        return 1
+    print(f"[完成] EPUB 已生成: {os.path.abspath(out_epub)}")
+    return 0
+
+
+def cmd_volumes(ns: argparse.Namespace) -> int:
+    from novelkit.output import find_chapter_files
+    from novelkit.volumes import build_volume_epubs, volume_names_from_manifest
+
+    title = ns.title or os.path.basename(os.path.abspath(ns.in_dir))
+    out_base = ns.out_base or os.path.join(ns.in_dir, title)
+    chapters = find_chapter_files(ns.in_dir)
+    if not chapters:
+        print(f"[ERROR] 在 {ns.in_dir} 未找到形如 001.md / '001 标题.md' 的章节文件。", file=sys.stderr)
+        return 1
+
+    volume_names = volume_names_from_manifest(ns.in_dir) if ns.by_heading else None
+    if ns.by_heading and not volume_names:
+        print("[WARN] manifest 里没有分卷标题，改按章数切分。")
+    done = build_volume_epubs(
+        chapters,
+        out_base,
+        title,
+        volume_size=ns.volume_size,
+        volume_names=volume_names,
+        jobs=ns.jobs,
+        engine=ns.engine,
+        omnibus=ns.omnibus,
+        section_headings=(ns.style == "crawl"),
+        lang=ns.lang,
+    )
+    print(f"[完成] 分卷 EPUB: {len(done)} 个")
+    return 0 if done else 1
+
+
+def cmd_reparse(ns: argparse.Namespace) -> int:
+    from novelkit.library import reparse_dir
+    from novelkit.normalize import book_normalizer
+
+    checked = changed = 0
+    for in_dir in ns.in_dirs:
+        # --dry-run 只预览，不改 normalize.json
+        norm = book_normalizer(in_dir, save=not ns.dry_run, enabled=ns.normalize, t2s=ns.t2s)
+        c, n = reparse_dir(in_dir, dry_run=ns.dry_run, norm=norm)
+        if len(ns.in_dirs) > 1:
+            print(f"[INFO] {in_dir}: checked {c}, changed {n} (normalize: {norm.describe()})")
+        checked += c
+        changed += n
+    print(f"[OK] checked: {checked}, changed: {changed}{' (dry-run)' if ns.dry_run else ''}")
+    return 0
+
+
+def cmd_stats(ns: argparse.Namespace) -> int:
+    from novelkit.library import book_stats
+
+    print(f"{'book':<32} {'chapters':>8} {'chars':>10} {'MB':>7} {'min':>7} {'median':>7} {'max':>7}")
+    for folder in ns.dirs:
+        st = book_stats(folder)
+        name = os.path.basename(os.path.abspath(folder))
+        print(
+            f"{name[:32]:<32} {st['chapters']:>8} {st['chars']:>10} {st['bytes'] / 1e6:>7.1f} "
+            f"{st['min_chars']:>7} {st['median_chars']:>7.0f} {st['max_chars']:>7}"
+        )
+    return 0
+
+
+def cmd_suspects(ns: argparse.Namespace) -> int:
+    from novelkit.quality import REPORT_DIR, scan_book
+
+    total = 0
+    for folder in ns.dirs:
+        checked, found = scan_book(folder, requeue=ns.requeue)
+        name = os.path.basename(os.path.abspath(folder))
+        print(f"[INFO] {name}: checked {checked}, suspect {len(found)}")
+        for index, fn, reason, detail in found:
+            print(f"  {index:03d} {reason:<11} {detail}  {fn}")
+        total += len(found)
+    print(f"[OK] suspect chapters: {total}{' (marked for refetch)' if ns.requeue and total else ''}; report dir: {REPORT_DIR}")
+    return 0
+
+
+def cmd_index(ns: argparse.Namespace) -> int:
+    from novelkit.search import DEFAULT_DB, DEFAULT_ROOT, SearchIndex, index_library
+
+    ns.db = ns.db or DEFAULT_DB
+    ns.root = ns.root or DEFAULT_ROOT
+    if not os.path.isdir(ns.root):
+        print(f"[ERROR] 目录不存在: {ns.root}", file=sys.stderr)
+        return 2
+    index = SearchIndex(ns.db)
+    try:
+        t = index_library(index, ns.root)
+        books, chapters = index.stats()
+    finally:
+        index.close()
+    print(
+        f"[完成] 扫描 {t['books']} 本：新增 {t['added']}，更新 {t['updated']}，删除 {t['removed']}，"
+        f"未变 {t['unchanged']}；索引共 {books} 本 / {chapters} 章 -> {ns.db}"
+    )
+    return 0
+
+
+def cmd_search(ns: argparse.Namespace) -> int:
+    from novelkit.search import DEFAULT_DB, SearchIndex
+
+    ns.db = ns.db or DEFAULT_DB
+    if not os.path.exists(ns.db):
+        print(f"[ERROR] 索引不存在: {ns.db}（先运行 novelkit index）", file=sys.stderr)
+        return 2
+    index = SearchIndex(ns.db)
+    try:
+        hits = index.search(" ".join(ns.query), limit=ns.limit, book=ns.book)
+    finally:
+        index.close()
+    for book, file, title, snippet in hits:
+        print(f"{book} / {os.path.splitext(file)[0]}")
+        print(f"    {snippet}")
+    if not hits:
+        print("[INFO] 没有匹配")
+        return 1
+    return 0
+
+
+def cmd_watch(ns: argparse.Namespace) -> int:
+    from novelkit import watch
+
+    watch.apply_defaults(ns)
+    func = {
+        "add": watch.cmd_add,
+        "remove": watch.cmd_remove,
+        "status": watch.cmd_status,
+        "run": watch.run_daemon,
+    }[ns.watch_cmd]
+    return func(ns)
+
+
+# ----------------------------- Parser -----------------------------
+def add_fetch_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--min-sleep", type=float, default=0.8, help="每章最小延迟秒")
+    p.add_argument("--max-sleep", type=float, default=1.5, help="每章最大延迟秒")
+    p.add_argument("--timeout", type=int, default=20, help="请求超时秒")
+    p.add_argument("--page-workers", type=int, default=4, help="分页章节的后续页并发预取数")
+
+
+def add_dedupe_arg(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--dedupe", choices=["skip", "flag", "off"], default="skip",
+                   help="近重复/占位章节：skip=不写入（默认），flag=照写但提示，off=不检测")
+
+
+def add_quality_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--quality-gate", choices=["requeue", "flag", "off"], default="requeue",
+                   help="截断/占位章节：requeue=退避重抓、占位页不写入（默认），flag=照写但记录，off=不检测")
+    p.add_argument("--quality-retries", type=int, default=2, help="可疑章节最多重抓次数（默认 2）")
+    p.add_argument("--quality-backoff", type=float, default=30.0,
+                   help="第 n 次重抓前等待 backoff*2^(n-1) 秒（默认 30）")
+
+
+def on_off(value: str) -> bool:
+    if value not in ("on", "off"):
+        raise argparse.ArgumentTypeError(f"expected on/off, got {value!r}")
+    return value == "on"
+
+
+def add_normalize_args(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--normalize", type=on_off, default=None, metavar="{on,off}",
+                   help="文本规范化（全/半角、零宽字符、标点）；给出时写入本书 .novel/normalize.json（默认 on）")
+    p.add_argument("--t2s", type=on_off, default=None, metavar="{on,off}",
+                   help="繁体 -> 简体（字级，data/t2s_chars.tsv）；给出时写入本书配置（默认 off）")
+
+
+def add_volume_args(p: argparse.ArgumentParser, *, volume_size: int) -> None:
+    p.add_argument("--volume-size", type=int, default=volume_size,
+                   help=f"每卷最多章节数，超长书拆成多个 epub 并行生成（默认 {volume_size}，0=不按章数切）")
+    p.add_argument("--by-heading", action="store_true", help="按目录页的分卷标题（第一卷 ...）切分，记录在 manifest 里")
+    p.add_argument("--jobs", type=int, default=0, help="并行进程数（默认：CPU 核数）")
+    p.add_argument("--omnibus", action="store_true", help="另外生成整本合订 epub")
+    p.add_argument("--engine", choices=["pandoc", "native"], default="pandoc",
+                   help="pandoc=每卷合并后调用 pandoc；native=直接写 EPUB，不依赖 pandoc")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="novelkit", description="Novel crawler / merge / epub toolkit.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    # crawl
+    p = sub.add_parser("crawl", help="抓取目录页与章节（无 URL 时进入交互模式）")
+    p.add_argument("toc_url", nargs="?", default="", help="目录页 URL（通常是 000.html）")
+    p.add_argument("--out", default="./out_book", help="输出目录")
+    p.add_argument("--start", type=int, default=1, help="从第几章开始（按目录顺序，从1计数）")
+    p.add_argument("--end", type=int, default=10**9, help="到第几章结束（含）")
+    add_fetch_args(p)
+    p.add_argument("--merge", default="", help="合并输出单文件名（如 '全书.md'），留空则不合并")
+    p.add_argument("--epub", action="store_true", help="合并后生成 epub（依赖 pandoc）")
+    p.add_argument("--title", default="", help="书名（用于合并标题 & epub metadata），留空则用 merge 文件名")
+    p.add_argument("--progress-every", type=int, default=50,
+                   help="抓取中每新写入 N 章重建一次合并 md/epub（需 --merge；0=不按章数）")
+    p.add_argument("--progress-seconds", type=float, default=60.0,
+                   help="抓取中至少每 T 秒重建一次合并 md/epub（需 --merge；0=不按时间）")
+    p.add_argument("--ignore-robots", action="store_true", help="忽略 robots.txt（不推荐）")
+    p.add_argument("--force", action="store_true", help="覆盖已存在章节文件（默认跳过用于断点续抓）")
+    add_dedupe_arg(p)
+    add_quality_args(p)
+    add_normalize_args(p)
+    add_volume_args(p, volume_size=0)
+    p.set_defaults(func=cmd_crawl)
+
+    # catalog
+    p = sub.add_parser("catalog", help="从分类/作者列表页发现并抓取整批书（可续跑）")
+    p.add_argument("seeds", nargs="*", help="列表页 URL（分类 / 作者页）；续跑时可省略并用 --state")
+    p.add_argument("--out-root", default="", help="每本书输出到 <out-root>/<书 slug>/（默认 ./novel_catalog；续跑沿用首次）")
+    p.add_argument("--state", default="", help="frontier 数据库（默认：$TOOLBOX_DIR/_out/novel_catalog/<host>.sqlite）")
+    p.add_argument("--book-pattern", default=r"/books?/[^/]+/(?:(?:index|000)\.html?)?$",
+                   help="URL path 命中即视为书的目录页（正则）")
+    p.add_argument("--listing-pattern", default=r"(?:list|sort|class|category|fenlei|author|top)",
+                   help="URL 命中即视为列表页继续翻（正则）")
+    p.add_argument("--max-depth", type=int, default=3, help="列表页最大翻页深度")
+    p.add_argument("--max-books", type=int, default=0, help="本次最多抓多少本（0=不限）")
+    p.add_argument("--capacity", type=int, default=1_000_000, help="Bloom 过滤器容量（URL 数）")
+    p.add_argument("--retries", type=int, default=3, help="书 / 列表页失败后最多尝试几次（含首次）")
+    p.add_argument("--retry-backoff", type=float, default=60.0, help="失败重试的初始等待（秒，每次翻倍）")
+    p.add_argument("--status", action="store_true", help="只打印 frontier 统计")
+    p.add_argument("--merge", action="store_true", help="每本书合并为 <slug>.md")
+    p.add_argument("--epub", action="store_true", help="合并后生成 epub（依赖 pandoc）")
+    p.add_argument("--ignore-robots", action="store_true", help="忽略 robots.txt（不推荐）")
+    add_fetch_args(p)
+    add_dedupe_arg(p)
+    p.set_defaults(func=cmd_catalog)
+
+    # merge
+    p = sub.add_parser("merge", help="合并章节 md 为单文件")
+    p.add_argument("--in-dir", required=True, help="章节 md 所在目录（001.md 或 '001 标题.md'）")
+    p.add_argument("--title", default="", help="书名（默认：目录名）")
+    p.add_argument("--out-md", default="", help="合并后的 md 路径（默认：<in-dir>/<书名>.md）")
+    p.add_argument("--style", choices=["crawl", "book"], default="crawl",
+                   help="crawl: 每章 '## 文件名' 标题；book: 章间 '---' 分隔并保留章内标题")
+    p.add_argument("--keep-source-line", action="store_true", help="保留每章的 “来源：xxx” 行")
+    p.add_argument("--zero-copy", action="store_true",
+                   help="只扫描每章头部，正文按字节区间直接拷贝（copy_file_range/sendfile/mmap），大书更快")
+    p.set_defaults(func=cmd_merge)
+
+    # export
+    p = sub.add_parser("export", help="一次读取章节，同时导出多种格式（md/txt/epub/html/jsonl）")
+    p.add_argument("--in-dir", required=True, help="章节 md 所在目录")
+    p.add_argument("--title", default="", help="书名（默认：目录名）")
+    p.add_argument("--format", action="append", choices=["md", "txt", "epub", "html", "jsonl"],
+                   help="输出格式，可重复（默认：md）")
+    p.add_argument("--out-base", default="", help="输出路径前缀（默认：<in-dir>/<书名>），各格式追加扩展名")
+    p.add_argument("--out-md", default="", help="md 输出路径（覆盖 --out-base）")
+    p.add_argument("--out-epub", default="", help="epub 输出路径（覆盖 --out-base）")
+    p.add_argument("--style", choices=["crawl", "book"], default="crawl",
+                   help="md 格式：crawl=每章 '## 文件名'；book=章间 '---' 分隔")
+    p.add_argument("--keep-source-line", action="store_true", help="保留每章的 “来源：xxx” 行")
+    p.add_argument("--volume-size", type=int, default=100, help="html 每卷章节数")
+    p.add_argument("--lang", default="zh-CN", help="epub/html 语言")
+    p.set_defaults(func=cmd_export)
+
+    # epub
+    p = sub.add_parser("epub", help="md -> epub（依赖 pandoc）")
+    p.add_argument("md", help="合并后的 md 文件")
+    p.add_argument("--out-epub", default="", help="输出 epub 路径（默认：同名 .epub）")
+    p.add_argument("--title", default="", help="书名（epub metadata，默认：md 文件名）")
+    p.add_argument("--lang", default="zh-CN", help="epub 语言（默认：zh-CN）")
+    p.add_argument("--toc", action="store_true", help="生成目录页（pandoc --toc）")
+    p.set_defaults(func=cmd_epub)
+
+    # volumes
+    p = sub.add_parser("volumes", help="超长书按卷拆成多个 epub，多进程并行生成")
+    p.add_argument("--in-dir", required=True, help="章节 md 所在目录")
+    p.add_argument("--title", default="", help="书名（默认：目录名）")
+    p.add_argument("--out-base", default="", help="输出前缀（默认：<in-dir>/<书名>），生成 <前缀>.vol001.epub ...")
+    p.add_argument("--style", choices=["crawl", "book"], default="crawl",
+                   help="crawl: 每章 '## 文件名' 标题；book: 章间 '---' 分隔并保留章内标题")
+    p.add_argument("--lang", default="zh-CN", help="epub 语言（默认：zh-CN）")
+    add_volume_args(p, volume_size=200)
+    p.set_defaults(func=cmd_volumes)
+
+    # reparse
+    p = sub.add_parser("reparse", help="对已下载章节重新跑规范化 + 清洗规则（不联网）")
+    p.add_argument("in_dirs", nargs="+", metavar="in_dir", help="章节 md 所在目录（可多个，整库重跑）")
+    p.add_argument("--dry-run", action="store_true", help="只列出会变化的章节")
+    add_normalize_args(p)
+    p.set_defaults(func=cmd_reparse)
+
+    # stats
+    p = sub.add_parser("stats", help="统计书目录：章节数 / 字数 / 体积")
+    p.add_argument("dirs", nargs="+", help="一个或多个章节目录")
+    p.set_defaults(func=cmd_stats)
+
+    # suspects
+    p = sub.add_parser("suspects", help="离线找出截断/占位章节（按本书字数/行数统计），报告写到 _out/novel_quality/")
+    p.add_argument("dirs", nargs="+", help="一个或多个章节目录")
+    p.add_argument("--requeue", action="store_true", help="标记为待重抓：下次 crawl 续抓只重抓这些章节")
+    p.set_defaults(func=cmd_suspects)
+
+    # index / search
+    p = sub.add_parser("index", help="把书库章节增量写入全文索引（SQLite FTS5）")
+    p.add_argument("--root", default=None, help="书库根目录（默认：$NOVEL_OUT_DIR，未设置则 ~/Downloads/novels）")
+    p.add_argument("--db", default=None, help="索引文件（默认：$TOOLBOX_DIR/_out/novel_search/index.sqlite）")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("search", help="全文检索书库，输出 书 / 章节 / 摘要")
+    p.add_argument("query", nargs="+", help="关键词；多个词之间为 AND")
+    p.add_argument("--book", default="", help="只搜书名包含该字符串的书")
+    p.add_argument("--limit", type=int, default=20, help="最多返回条数")
+    p.add_argument("--db", default=None, help="索引文件（默认：$TOOLBOX_DIR/_out/novel_search/index.sqlite）")
+    p.set_defaults(func=cmd_search)
+
+    # watch
+    p = sub.add_parser("watch", help="常驻监视连载，按更新节奏轮询")
+    p.add_argument("--state-dir", default=None, help="状态目录（默认：$TOOLBOX_DIR/_out/novel_watch）")
+    wsub = p.add_subparsers(dest="watch_cmd", required=True)
+
+    w = wsub.add_parser("add", help="登记一本书")
+    w.add_argument("toc_url", help="目录页 URL")
+    w.add_argument("--out", required=True, help="章节输出目录")
+    w.add_argument("--id", default="", help="书的标识（默认：输出目录名）")
+    w.add_argument("--merge", default="", help="有新章时合并输出的文件名，留空则不合并")
+    w.add_argument("--epub", action="store_true", help="合并后生成 epub（依赖 pandoc）")
+    w.add_argument("--title", default="", help="书名（合并标题 & epub metadata）")
+    w.add_argument("--interval", type=float, default=None, help="初始更新周期（秒，默认 6h），学到节奏前使用")
+    w.add_argument("--ignore-robots", action="store_true", help="忽略 robots.txt（不推荐）")
+    add_dedupe_arg(w)
+
+    w = wsub.add_parser("remove", help="取消登记")
+    w.add_argument("id", help="书的标识（见 status）")
+
+    wsub.add_parser("status", help="查看每本书的节奏与下次轮询时间")
+
+    w = wsub.add_parser("run", help="常驻轮询（Ctrl+C 退出）")
+    w.add_argument("--once", action="store_true", help="只处理当前已到期的书，然后退出")
+    w.add_argument("--min-interval", type=float, default=None, help="两次轮询最短间隔（秒，默认 600）")
+    w.add_argument("--max-interval", type=float, default=None, help="两次轮询最长间隔（秒，默认 3 天）")
+    add_fetch_args(w)
+    p.set_defaults(func=cmd_watch)
+
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ns = build_parser().parse_args(argv)
+    try:
+        return ns.func(ns)
+    except KeyboardInterrupt:
+        print("\n[INFO] interrupted.")
+        return 130
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shared model + small helpers (stdlib only; safe to import from any command).
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+
+DEFAULT_UA = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/121.0.0.0 Safari/537.36"
+)
+
+TOOLBOX_DIR = os.environ.get("TOOLBOX_DIR", os.path.expanduser("~/toolbox"))
+
+# 文件名清理
+FILENAME_BAD_CHARS = re.compile(r'[\\/:*?"<>|]+')
+
+
+# ----------------------------- Data model -----------------------------
+@dataclass
+class Chapter:
+    index: int        # 1-based sequential index in output
+    num: int          # numeric chapter id parsed from URL (for sorting)
+    title: str
+    url: str
+    pages: List[str] = field(default_factory=list)  # follow-up page URLs (1234_2.html ...), stitched into one chapter
+    volume: str = ""  # volume heading from the TOC ("第一卷 ..."), empty if none
+
+
+# ----------------------------- Utilities -----------------------------
+def ensure_dir(path: str) -> None:
+    os.makedirs(path, exist_ok=True)
+
+
+def sanitize_filename(name: str, max_len: int = 120) -> str:
+    name = name.strip()
+    name = FILENAME_BAD_CHARS.sub("_", name)
+    name = re.sub(r"\s+", " ", name).strip()
+    if len(name) > max_len:
+        name = name[:max_len].rstrip()
+    return name or "untitled"
+
+
+def chapter_filename(chapter: Chapter, title: str) -> str:
+    return f"{chapter.index:03d} {sanitize_filename(title)}.md"
+
+
+def polite_sleep(min_s: float, max_s: float) -> None:
+    time.sleep(random.uniform(min_s, max_s))
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+"""
+Novel Crawler v6 (final)
+- Robust TOC parsing for 3/4-digit chapter html links (supports relative paths)
+- Polite fetch: retries, backoff, timeout, random sleep
+- Optional robots.txt respect (default ON), with --ignore-robots to override
+- Resume: skip existing chapter files by default (use --force to overwrite)
+- Clean navigation noise ("上一页/下一页/本书目录/第一～四集..." etc.)
+- Paginated chapters (1234_2.html ...) are prefetched concurrently and stitched
+- Chapters go through a writer thread: atomic temp+rename, group-committed fsync
+- Near-duplicate / placeholder chapters are skipped before writing (--dedupe)
+- Chapter text is normalized (width / stray spaces / optional 繁->简) per book config
+- Quality gate: placeholder / truncated chapters are re-queued with backoff and
+  reported under $TOOLBOX_DIR/_out/novel_quality/ (--quality-gate)
+- Optional merge into one Markdown and generate EPUB via pandoc
+- With --merge, the merged Markdown/EPUB is rebuilt every N chapters / T seconds
+  during the crawl (--progress-every / --progress-seconds), so reading can start early
+- Interactive mode when no TOC URL is given
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import requests
+
+from novelkit.common import Chapter, chapter_filename, ensure_dir, polite_sleep
+from novelkit.fetch import build_session, fetch_html, robots_allowed
+from novelkit.fingerprint import DedupeIndex, minhash
+from novelkit.library import split_chapter_md
+from novelkit.manifest import Manifest
+from novelkit.normalize import Normalizer, book_normalizer
+from novelkit.output import find_chapter_files, merge_markdown, pandoc_epub
+from novelkit.parse import extract_chapters_from_toc, page_url, parse_chapter_page, stitch_pages
+from novelkit.progressive import ProgressiveOutput
+from novelkit.quality import (
+    HARD_REASONS,
+    STATUS_FLAGGED,
+    STATUS_RETRYING,
+    STATUS_SKIPPED,
+    STATUS_WRITTEN,
+    QualityGate,
+    RetryQueue,
+    with_retries,
+)
+from novelkit.volumes import build_volume_epubs, volume_names_from_manifest
+from novelkit.writer import ChapterWriter
+
+
+# ----------------------------- Interactive -----------------------------
+def prompt(msg: str, default: str = "") -> str:
+    if default:
+        s = input(f"{msg} [default: {default}]: ").strip()
+        return s if s else default
+    return input(f"{msg}: ").strip()
+
+
+def interactive_args() -> argparse.Namespace:
+    print("== Novel Crawler ==")
+    toc_url = prompt("TOC URL", "https://www.bidutuijian.com/books/yztpingsanguo/000.html")
+    out_dir = prompt("Output dir", "./out_book")
+
+    merge = prompt("Merge filename (blank=skip)", "")
+    epub = "n"
+    if merge:
+        epub = prompt("Generate EPUB after merge? (y/N)", "N")
+
+    start = prompt("Start chapter index", "1")
+    end = prompt("End chapter index", "999999")
+
+    ns = argparse.Namespace(
+        toc_url=toc_url,
+        out=out_dir,
+        start=int(start),
+        end=int(end),
+        min_sleep=0.8,
+        max_sleep=1.5,
+        timeout=20,
+        merge=merge,
+        epub=(epub.lower().startswith("y")),
+        title="",
+        ignore_robots=False,
+        force=False,
+        dedupe="skip",
+        page_workers=4,
+        volume_size=0,
+        by_heading=False,
+        jobs=0,
+        omnibus=False,
+        engine="pandoc",
+        progress_every=50,
+        progress_seconds=60.0,
+        normalize=None,
+        t2s=None,
+        quality_gate="requeue",
+        quality_retries=2,
+        quality_backoff=30.0,
+    )
+    return ns
+
+
+# ----------------------------- Main -----------------------------
+def run(ns: argparse.Namespace) -> None:
+    out_dir = ns.out
+    ensure_dir(out_dir)
+
+    session = build_session()
+
+    # robots 校验（只校验 toc_url）
+    if not ns.ignore_robots:
+        allowed = robots_allowed(session, ns.toc_url)
+        if not allowed:
+            raise RuntimeError(
+                "robots.txt disallows crawling this URL. "
+                "If you have permission, rerun with --ignore-robots."
+            )
+
+    toc_html = fetch_html(session, ns.toc_url, timeout=ns.timeout)
+    chapters = extract_chapters_from_toc(toc_html, ns.toc_url)
+
+    if not chapters:
+        raise RuntimeError("Cannot parse any chapter links from TOC.")
+
+    # 章节范围过滤（按目录顺序 index）
+    start = max(1, ns.start)
+    end = min(ns.end, len(chapters))
+    selected = [c for c in chapters if start <= c.index <= end]
+
+    print(f"[INFO] 解析到章节数: {len(chapters)}, 本次抓取: {len(selected)} ({start}..{end})")
+
+    # 命令行给了 --normalize / --t2s 就写进本书配置，之后的续抓 / watch / reparse 沿用
+    norm = book_normalizer(out_dir, enabled=ns.normalize, t2s=ns.t2s)
+    print(f"[INFO] 文本规范化: {norm.describe()}")
+
+    fetch_chapters(session, selected, ns)
+    build_outputs(ns)
+
+    print("[完成] 所有任务结束。")
+
+
+def fetch_chapter(session: requests.Session, chap: Chapter, ns: argparse.Namespace,
+                  pool: ThreadPoolExecutor, norm: Optional[Normalizer] = None) -> Tuple[str, str]:
+    """
+    抓取一章（含分页），返回 (title, cleaned_text)，并把后续页 URL 记到 chap.pages。
+    后续页 URL 可由第一页推算（1234_2.html ...），因此并发预取，而不是顺着“下一页”逐页串行。
+    """
+    html = fetch_html(session, chap.url, timeout=ns.timeout)
+    title, raw, total = parse_chapter_page(html, chap.url)
+    raws = [raw]
+    chap.pages = []
+
+    fetched = 1
+    while total > fetched:
+        urls = [page_url(chap.url, n) for n in range(fetched + 1, total + 1)]
+        htmls = list(pool.map(lambda u: fetch_html(session, u, timeout=ns.timeout), urls))
+        last_total = total
+        for url, page_html in zip(urls, htmls):
+            _, page_raw, page_total = parse_chapter_page(page_html, url)
+            raws.append(page_raw)
+            total = max(total, page_total)  # 有的站只在后面几页才露出更多页码
+        chap.pages.extend(urls)
+        fetched = last_total
+
+    if chap.pages:
+        print(f"       + {len(chap.pages)} page(s) stitched")
+    if norm is not None:
+        title = norm(title)
+    return title, stitch_pages(title, raws, norm)
+
+
+def fetch_chapters(session: requests.Session, selected: List[Chapter], ns: argparse.Namespace) -> int:
+    """
+    逐章抓取并写入 ns.out；已存在且未 --force 的章节跳过。返回实际写入的章节数。
+    近重复检测（ns.dedupe）：skip=不写入（下次续抓会重试），flag=照写但记录，off=关闭。
+    selected 按目录（阅读）顺序抓；设置了 merge 时边抓边重建合并 md/epub（见 ProgressiveOutput）。
+    质量门（ns.quality_gate）：requeue=可疑章节退避重抓，占位页始终不写入；flag=照写但记录；off=关闭。
+    """
+    index = DedupeIndex.load(ns.out) if ns.dedupe != "off" else None
+    manifest = Manifest.load(ns.out)
+    pool = ThreadPoolExecutor(max_workers=max(1, ns.page_workers))
+
+    def on_written(chap: Chapter, path: str) -> None:
+        # manifest 只在章节真正落盘（rename 之后）才记录；标题变了（重抓 / --force）就删掉旧文件，免得合并出两份
+        old = manifest.file_for(chap.index)
+        if old and os.path.basename(old) != os.path.basename(path):
+            os.remove(old)
+        manifest.record(chap, os.path.basename(path))
+
+    writer = ChapterWriter(ns.out, on_written=on_written)
+    progress = ProgressiveOutput.from_ns(ns, writer)
+    norm = Normalizer.for_book(ns.out)
+    gate = QualityGate.load(ns.out) if ns.quality_gate != "off" else None
+    retries = RetryQueue(ns.quality_retries if ns.quality_gate == "requeue" else 0, ns.quality_backoff)
+    written = 0
+    try:
+        for chap, attempt in with_retries(sorted(selected, key=lambda c: c.index), retries):
+            # 断点续抓：按章序号查 manifest（记录的是实际写出的文件）；没有 manifest 的旧书
+            # 退回按规范化标题拼文件名。重抓 / 质量门标记过的可疑章节不跳过
+            out_path = manifest.file_for(chap.index) or os.path.join(ns.out, chapter_filename(chap, norm(chap.title)))
+            refetch = attempt > 0 or (gate is not None and gate.wants_refetch(chap.index))
+            if (not ns.force) and (not refetch) and os.path.exists(out_path):
+                print(f"[SKIP] {chap.index:03d} {chap.title} (exists)")
+                # 索引 / 统计建立之前下载的章节：补算签名与字数，后续新章也能和它们比对
+                need_sig = index is not None and chap.index not in index.sigs
+                need_stats = gate is not None and chap.index not in gate.samples and chap.index not in gate.suspects
+                if need_sig or need_stats:
+                    with open(out_path, "r", encoding="utf-8", errors="ignore") as f:
+                        body = split_chapter_md(f.read())[1]
+                    if need_sig:
+                        index.add(chap.index, minhash(body))
+                    if need_stats:
+                        gate.accept(chap, body)
+                continue
+
+            if attempt:
+                print(f"[重抓] {chap.index:03d} {chap.title} (第 {attempt} 次) -> {chap.url}")
+            else:
+                print(f"[抓取] {chap.index:03d} {chap.title} -> {chap.url}")
+            title, text = fetch_chapter(session, chap, ns, pool, norm)
+
+            # 如果章节页的 h1 为空或默认 Untitled，则用目录标题兜底
+            if not title or title == "Untitled":
+                title = norm(chap.title)
+
+            if gate is not None:
+                reason, detail = gate.check(text)
+                if not reason:
+                    gate.accept(chap, text)
+                else:
+                    delay = retries.push(chap, attempt + 1)
+                    if delay >= 0:
+                        print(f"[SUSPECT] {chap.index:03d} {title}: {reason}, {detail} -> {delay:.0f}s 后重抓")
+                        gate.flag(chap, title, reason, detail, text, attempts=attempt, status=STATUS_RETRYING)
+                        polite_sleep(ns.min_sleep, ns.max_sleep)
+                        continue
+                    if ns.quality_gate == "requeue" and reason in HARD_REASONS:
+                        print(f"[SUSPECT] {chap.index:03d} {title}: {reason}, {detail} -> 不写入（续抓时再试）")
+                        gate.flag(chap, title, reason, detail, text, attempts=attempt, status=STATUS_SKIPPED)
+                        polite_sleep(ns.min_sleep, ns.max_sleep)
+                        continue
+                    print(f"[SUSPECT] {chap.index:03d} {title}: {reason}, {detail} -> 照写（见报告）")
+                    status = STATUS_WRITTEN if ns.quality_gate == "requeue" else STATUS_FLAGGED
+                    gate.flag(chap, title, reason, detail, text, attempts=attempt, status=status)
+
+            if index is not None:
+                sig = minhash(text)
+                hit = index.find(sig, exclude=chap.index)
+                if hit:
+                    print(f"[DUP] {chap.index:03d} {title} ≈ {hit[0]:03d} (similarity={hit[1]:.2f})")
+                    if ns.dedupe == "skip":
+                        polite_sleep(ns.min_sleep, ns.max_sleep)
+                        continue
+                index.add(chap.index, sig, dup_of=hit[0] if hit else 0)
+
+            writer.submit(chap, title, text)
+            written += 1
+            if progress is not None:
+                progress.tick()
+            polite_sleep(ns.min_sleep, ns.max_sleep)
+        # 已经给出过部分结果：收尾再更新一次，即使随后 pandoc 不可用也不会停在旧进度
+        if progress is not None and progress.builds and progress.pending:
+            progress.rebuild()
+    finally:
+        # Ctrl+C 时也先把已入队的章节写完，保证磁盘上的章节都是完整的
+        writer.close()
+        pool.shutdown()
+        manifest.save()
+        if index is not None:
+            index.save()
+        if gate is not None:
+            gate.save()
+            report = gate.write_report(ns.out)
+            if report:
+                print(f"[WARN] 可疑章节 {len(gate.suspects)} 个，报告: {report}")
+    return written
+
+
+def build_outputs(ns: argparse.Namespace) -> str:
+    """
+    按 ns.merge / ns.epub 生成合并 md 与 epub；未设置 merge 时返回空串。
+    """
+    merged_md = ""
+    if ns.merge:
+        merged_md = merge_markdown(ns.out, ns.merge, book_title=ns.title or None)
+        print(f"[完成] 已合并: {merged_md}")
+
+        if ns.epub:
+            epub_path = os.path.splitext(merged_md)[0] + ".epub"
+            book_title = ns.title or os.path.splitext(os.path.basename(merged_md))[0]
+            if ns.volume_size > 0 or ns.by_heading:
+                # 超长书：按卷并行生成，合订本可选
+                chapters = find_chapter_files(ns.out, exclude=os.path.basename(merged_md))
+                done = build_volume_epubs(
+                    chapters,
+                    os.path.splitext(merged_md)[0],
+                    book_title,
+                    volume_size=ns.volume_size,
+                    volume_names=volume_names_from_manifest(ns.out) if ns.by_heading else None,
+                    jobs=ns.jobs,
+                    engine=ns.engine,
+                    omnibus=ns.omnibus,
+                )
+                print(f"[完成] 分卷 EPUB 已生成: {len(done)} 个")
+            elif pandoc_epub(merged_md, epub_path, title=book_title):
+                print(f"[完成] EPUB 已生成: {epub_path}")
+    return merged_md
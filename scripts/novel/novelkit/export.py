@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+Single-pass multi-format export.
+
+Each chapter file is read once and handed to every requested writer:
+  md     merged Markdown (same layout as merge_chapters)
+  txt    plain text
+  epub   EPUB 3 written directly with zipfile (no pandoc), one XHTML per chapter
+  html   per-volume HTML split: <base>_html/index.html + vol_001.html ...
+  jsonl  one JSON object per chapter (index / file / title / text)
+
+Memory stays bounded by one chapter (plus one HTML volume); writers only keep
+titles for their tables of contents.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import os
+import re
+import uuid
+import zipfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from novelkit.common import ensure_dir
+from novelkit.library import split_chapter_md
+from novelkit.output import H1_LINE_RE, SOURCE_LINE_RE
+
+
+FORMATS = ("md", "txt", "epub", "html", "jsonl")
+
+
+@dataclass
+class ChapterDoc:
+    index: int
+    stem: str       # 文件名（不含扩展名）
+    content: str    # 去掉首尾空白 /（可选）来源行后的整章 Markdown
+    title: str
+    body: str
+
+
+def iter_chapters(chapters: List[Tuple[int, str]], *, drop_source_line: bool = True) -> Iterator[ChapterDoc]:
+    for idx, path in chapters:
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            content = f.read().strip()
+        if drop_source_line:
+            content = SOURCE_LINE_RE.sub("", content)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        title, body = split_chapter_md(content)
+        yield ChapterDoc(idx, stem, content, title or stem, body.strip())
+
+
+# ----------------------------- Markdown -> HTML -----------------------------
+def md_to_html(md: str) -> str:
+    """
+    章节只用到标题 / 段落 / 分隔线，够用即可（不引入 markdown 依赖）。
+    """
+    out: List[str] = []
+    for block in re.split(r"\n\s*\n", md.strip()):
+        block = block.strip()
+        if not block:
+            continue
+        m = re.match(r"^(#{1,6})\s+(.*)$", block)
+        if m and "\n" not in block:
+            level = len(m.group(1))
+            out.append(f"<h{level}>{html.escape(m.group(2))}</h{level}>")
+        elif re.fullmatch(r"-{3,}|\*{3,}", block):
+            out.append("<hr/>")
+        else:
+            out.append("<p>" + "<br/>".join(html.escape(x) for x in block.split("\n")) + "</p>")
+    return "\n".join(out)
+
+
+def xhtml_page(title: str, body: str, lang: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+        f'lang="{lang}" xml:lang="{lang}">\n'
+        f"<head><meta charset=\"utf-8\"/><title>{html.escape(title)}</title></head>\n"
+        f"<body>\n{body}\n</body>\n</html>\n"
+    )
+
+
+# ----------------------------- Writers -----------------------------
+class Writer(ABC):
+    """
+    一种输出格式：每章 add 一次，close 收尾并返回输出路径。
+    """
+
+    @abstractmethod
+    def add(self, doc: ChapterDoc) -> None:
+        ...
+
+    @abstractmethod
+    def close(self) -> str:
+        ...
+
+
+class MdWriter(Writer):
+    def __init__(self, path: str, book_title: str, *, section_headings: bool) -> None:
+        self.path = path
+        self.section_headings = section_headings
+        self.f = open(path, "w", encoding="utf-8")
+        self.f.write(f"# {book_title}\n\n")
+
+    def add(self, doc: ChapterDoc) -> None:
+        if self.section_headings:
+            self.f.write(f"## {doc.stem}\n\n{H1_LINE_RE.sub('', doc.content)}\n\n")
+        else:
+            self.f.write(f"\n\n---\n\n{doc.content}\n")
+
+    def close(self) -> str:
+        self.f.close()
+        return self.path
+
+
+class TxtWriter(Writer):
+    def __init__(self, path: str, book_title: str) -> None:
+        self.path = path
+        self.f = open(path, "w", encoding="utf-8")
+        self.f.write(f"{book_title}\n\n")
+
+    def add(self, doc: ChapterDoc) -> None:
+        self.f.write(f"\n{doc.title}\n\n{doc.body}\n")
+
+    def close(self) -> str:
+        self.f.close()
+        return self.path
+
+
+class JsonlWriter(Writer):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.f = open(path, "w", encoding="utf-8")
+
+    def add(self, doc: ChapterDoc) -> None:
+        rec = {"index": doc.index, "file": doc.stem, "title": doc.title, "text": doc.body}
+        self.f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def close(self) -> str:
+        self.f.close()
+        return self.path
+
+
+class HtmlWriter(Writer):
+    """
+    按 volume_size 章切分卷：每卷一个 html，外加 index.html 目录页。
+    """
+
+    def __init__(self, out_dir: str, book_title: str, *, volume_size: int, lang: str) -> None:
+        ensure_dir(out_dir)
+        self.out_dir = out_dir
+        self.book_title = book_title
+        self.volume_size = max(1, volume_size)
+        self.lang = lang
+        self.volumes: List[List[Tuple[str, str]]] = []  # [(anchor, title)] per volume
+        self.parts: List[str] = []
+
+    def _flush(self) -> None:
+        if not self.parts:
+            return
+        vol = len(self.volumes)
+        name = f"vol_{vol:03d}.html"
+        with open(os.path.join(self.out_dir, name), "w", encoding="utf-8") as f:
+            f.write(xhtml_page(f"{self.book_title} ({vol})", "\n".join(self.parts), self.lang))
+        self.parts = []
+
+    def add(self, doc: ChapterDoc) -> None:
+        if not self.volumes or len(self.volumes[-1]) >= self.volume_size:
+            self._flush()
+            self.volumes.append([])
+        anchor = f"c{doc.index:04d}"
+        self.volumes[-1].append((anchor, doc.title))
+        self.parts.append(f'<section id="{anchor}">\n<h2>{html.escape(doc.title)}</h2>\n{md_to_html(doc.body)}\n</section>')
+
+    def close(self) -> str:
+        self._flush()
+        items = []
+        for vol, chapters in enumerate(self.volumes, start=1):
+            items.append(f"<li>卷 {vol}<ol>")
+            items.extend(f'<li><a href="vol_{vol:03d}.html#{a}">{html.escape(t)}</a></li>' for a, t in chapters)
+            items.append("</ol></li>")
+        body = f"<h1>{html.escape(self.book_title)}</h1>\n<ol>\n" + "\n".join(items) + "\n</ol>"
+        index = os.path.join(self.out_dir, "index.html")
+        with open(index, "w", encoding="utf-8") as f:
+            f.write(xhtml_page(self.book_title, body, self.lang))
+        return index
+
+
+class EpubWriter(Writer):
+    """
+    直接写 EPUB 3（zip）：mimetype 必须是第一个且不压缩；opf/nav 需要全部章节标题，最后写。
+    """
+
+    def __init__(self, path: str, book_title: str, *, lang: str) -> None:
+        self.path = path
+        self.book_title = book_title
+        self.lang = lang
+        self.items: List[Tuple[str, str]] = []  # (href, title)
+        self.z = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.z.writestr(zipfile.ZipInfo("mimetype"), "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        self.z.writestr(
+            "META-INF/container.xml",
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">\n'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>\n'
+            "</container>\n",
+        )
+
+    def add(self, doc: ChapterDoc) -> None:
+        href = f"ch{len(self.items) + 1:05d}.xhtml"
+        body = f"<h2>{html.escape(doc.title)}</h2>\n{md_to_html(doc.body)}"
+        self.z.writestr(f"OEBPS/{href}", xhtml_page(doc.title, body, self.lang))
+        self.items.append((href, doc.title))
+
+    def close(self) -> str:
+        nav = "\n".join(f'<li><a href="{h}">{html.escape(t)}</a></li>' for h, t in self.items)
+        self.z.writestr(
+            "OEBPS/nav.xhtml",
+            xhtml_page(self.book_title, f'<nav epub:type="toc" id="toc"><h1>目录</h1><ol>\n{nav}\n</ol></nav>', self.lang),
+        )
+        manifest = "\n".join(
+            f'<item id="c{i}" href="{h}" media-type="application/xhtml+xml"/>' for i, (h, _) in enumerate(self.items, 1)
+        )
+        spine = "\n".join(f'<itemref idref="c{i}"/>' for i in range(1, len(self.items) + 1))
+        self.z.writestr(
+            "OEBPS/content.opf",
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="bookid">\n'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">\n'
+            f'<dc:identifier id="bookid">urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, self.book_title)}</dc:identifier>\n'
+            f"<dc:title>{html.escape(self.book_title)}</dc:title>\n"
+            f"<dc:language>{self.lang}</dc:language>\n"
+            '<meta property="dcterms:modified">2000-01-01T00:00:00Z</meta>\n'
+            "</metadata>\n"
+            "<manifest>\n"
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>\n'
+            f"{manifest}\n</manifest>\n"
+            f"<spine>\n{spine}\n</spine>\n</package>\n",
+        )
+        self.z.close()
+        return self.path
+
+
+# ----------------------------- Pipeline -----------------------------
+def export_book(
+    chapters: List[Tuple[int, str]],
+    out_base: str,
+    book_title: str,
+    formats: List[str],
+    *,
+    section_headings: bool = False,
+    drop_source_line: bool = True,
+    volume_size: int = 100,
+    lang: str = "zh-CN",
+    paths: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """
+    一次读完所有章节，同时写出 formats 里的每种格式。返回 {格式: 输出路径}。
+    paths 可覆盖某种格式的默认输出路径（默认 <out_base>.<fmt>，html 为 <out_base>_html/）。
+    """
+    if not chapters:
+        raise RuntimeError("No chapter md files to export.")
+    paths = dict(paths or {})
+    writers: Dict[str, Writer] = {}
+    try:
+        for fmt in dict.fromkeys(formats):  # 去重但保序
+            if fmt == "md":
+                writers[fmt] = MdWriter(paths.get("md") or f"{out_base}.md", book_title, section_headings=section_headings)
+            elif fmt == "txt":
+                writers[fmt] = TxtWriter(paths.get("txt") or f"{out_base}.txt", book_title)
+            elif fmt == "jsonl":
+                writers[fmt] = JsonlWriter(paths.get("jsonl") or f"{out_base}.jsonl")
+            elif fmt == "html":
+                writers[fmt] = HtmlWriter(paths.get("html") or f"{out_base}_html", book_title,
+                                          volume_size=volume_size, lang=lang)
+            elif fmt == "epub":
+                writers[fmt] = EpubWriter(paths.get("epub") or f"{out_base}.epub", book_title, lang=lang)
+            else:
+                raise ValueError(f"unknown format: {fmt} (use {'/'.join(FORMATS)})")
+
+        for doc in iter_chapters(chapters, drop_source_line=drop_source_line):
+            for w in writers.values():
+                w.add(doc)
+    finally:
+        results = {fmt: w.close() for fmt, w in writers.items()}
+    return results
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+Zero-copy merge: splice chapter bytes straight into the merged Markdown.
+
+Only the head of each chapter (first HEADER_BYTES) is read. The head, up to
+its last plain body line, goes through the same drop rules as merge_chapters
+(output.drop_merge_lines) and is written from memory; the rest is copied
+file-to-file in the kernel:
+  os.copy_file_range (Linux) -> os.sendfile (Linux) -> mmap slices (macOS etc.)
+
+A chapter that fits in the head is processed in memory like merge_chapters.
+Longer chapters whose head cannot be split safely (CRLF, undecodable head, no
+plain body line, nothing after it) take the normal read/decode path, so the
+header handling matches merge_chapters exactly. Remaining difference: body
+bytes after the head are copied verbatim — "来源：" / "# " lines past the first
+HEADER_BYTES are kept, and invalid UTF-8 there is not dropped.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+from typing import List, Optional, Tuple
+
+from novelkit.output import drop_merge_lines
+
+
+HEADER_BYTES = 4096
+TAIL_BYTES = 256
+SOURCE_PREFIX = "来源："
+
+# 依次尝试，失败（不支持）的方法会被关掉，后续章节不再尝试
+_methods = {"copy_file_range": hasattr(os, "copy_file_range"), "sendfile": hasattr(os, "sendfile")}
+
+
+def split_point(text: str) -> int:
+    """
+    text 里最后一行“安全”行之后的字符偏移；没有则返回 -1。
+    安全：非空、不像标题 / 来源行，且前一个非空行也不是单独的 "#" 或来源行，
+    这样 SOURCE_LINE_RE / H1_LINE_RE 的任何匹配都不会跨过这一行。
+    """
+    prev = ""
+    pos = 0
+    cut = -1
+    for line in text.split("\n")[:-1]:
+        pos += len(line) + 1
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not (stripped.startswith("#") or line.startswith(SOURCE_PREFIX)
+                or prev.strip() == "#" or prev.startswith(SOURCE_PREFIX)):
+            cut = pos
+        prev = line
+    return cut
+
+
+def plan_chapter(fd: int, size: int, *, section_headings: bool,
+                 drop_source_line: bool) -> Optional[Tuple[bytes, int, int]]:
+    """
+    (处理后的头部字节, 切分点, 正文终点)：头部直接写，[切分点, 终点) 零拷贝。
+    头部无法安全切分时返回 None，调用方改走普通合并。
+    """
+    head = os.pread(fd, min(size, HEADER_BYTES), 0)
+    if len(head) >= size:
+        # 整章已在内存里：照 merge_chapters 的文本模式读法处理（换行统一、忽略坏字节）
+        text = head.decode("utf-8", "ignore").replace("\r\n", "\n").replace("\r", "\n")
+        return drop_merge_lines(text.strip(), section_headings=section_headings,
+                                drop_source_line=drop_source_line).encode("utf-8"), 0, 0
+    if b"\r" in head:
+        return None  # 文本模式会把 CRLF 换成 LF，按字节拷贝做不到
+    try:
+        text = head[:head.rfind(b"\n") + 1].decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    cut = split_point(text)
+    if cut < 0:
+        return None
+    prefix = text[:cut]
+    start = len(prefix.encode("utf-8"))
+
+    # 尾部空白（等价于原来的 .strip()，含全角空格等 Unicode 空白）
+    tail = os.pread(fd, min(size, TAIL_BYTES), max(0, size - TAIL_BYTES)).decode("utf-8", "ignore")
+    body_tail = tail.rstrip()
+    if not body_tail:
+        return None
+    end = size - len(tail[len(body_tail):].encode("utf-8"))
+    if end <= start:
+        return None
+
+    prefix = drop_merge_lines(prefix.lstrip(), section_headings=section_headings, drop_source_line=drop_source_line)
+    return prefix.encode("utf-8"), start, end
+
+
+def write_all(dst_fd: int, data) -> None:
+    view = memoryview(data)
+    while view:
+        n = os.write(dst_fd, view)
+        view = view[n:]
+
+
+def splice(src_fd: int, dst_fd: int, offset: int, count: int) -> None:
+    if _methods["copy_file_range"]:
+        try:
+            while count > 0:
+                n = os.copy_file_range(src_fd, dst_fd, count, offset)
+                if n == 0:
+                    break
+                offset += n
+                count -= n
+            if count == 0:
+                return
+        except OSError:
+            _methods["copy_file_range"] = False  # 跨文件系统 / 不支持：退回下一种
+
+    if _methods["sendfile"]:
+        try:
+            while count > 0:
+                n = os.sendfile(dst_fd, src_fd, offset, count)
+                if n == 0:
+                    break
+                offset += n
+                count -= n
+            if count == 0:
+                return
+        except OSError:
+            _methods["sendfile"] = False  # macOS 的 sendfile 只能写 socket
+
+    with mmap.mmap(src_fd, 0, access=mmap.ACCESS_READ) as mm:
+        write_all(dst_fd, memoryview(mm)[offset:offset + count])
+
+
+def merge_chapters_zero_copy(
+    chapters: List[Tuple[int, str]],
+    out_md: str,
+    book_title: str,
+    *,
+    section_headings: bool = True,
+    drop_source_line: bool = True,
+) -> str:
+    if not chapters:
+        raise RuntimeError("No chapter md files to merge.")
+
+    dst_fd = os.open(out_md, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        write_all(dst_fd, f"# {book_title}\n\n".encode("utf-8"))
+        for _, path in chapters:
+            src_fd = os.open(path, os.O_RDONLY)
+            try:
+                size = os.fstat(src_fd).st_size
+                plan = plan_chapter(src_fd, size, section_headings=section_headings,
+                                    drop_source_line=drop_source_line)
+                if section_headings:
+                    stem = os.path.splitext(os.path.basename(path))[0]
+                    write_all(dst_fd, f"## {stem}\n\n".encode("utf-8"))
+                else:
+                    write_all(dst_fd, b"\n\n---\n\n")
+                if plan is None:
+                    with open(path, "r", encoding="utf-8", errors="ignore") as r:
+                        content = drop_merge_lines(r.read().strip(), section_headings=section_headings,
+                                                   drop_source_line=drop_source_line)
+                    write_all(dst_fd, content.encode("utf-8"))
+                else:
+                    prefix, start, end = plan
+                    write_all(dst_fd, prefix)
+                    splice(src_fd, dst_fd, start, end - start)
+                write_all(dst_fd, b"\n\n" if section_headings else b"\n")
+            finally:
+                os.close(src_fd)
+    finally:
+        os.close(dst_fd)
+    return out_md
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""
+HTTP layer: polite fetch with retries, robots.txt, conditional TOC requests.
+Imports requests at module load — only crawl/watch import this module.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from typing import Dict, Optional, Tuple
+from urllib import robotparser
+from urllib.parse import urlparse
+
+import requests
+
+from novelkit.common import DEFAULT_UA
+
+
+def build_session() -> requests.Session:
+    s = requests.Session()
+    s.headers.update({"User-Agent": DEFAULT_UA})
+    return s
+
+
+def fetch_html(
+    session: requests.Session,
+    url: str,
+    *,
+    timeout: int = 20,
+    retries: int = 3,
+    backoff: float = 0.8,
+) -> str:
+    last_err: Optional[Exception] = None
+    for attempt in range(1, retries + 1):
+        try:
+            resp = session.get(url, timeout=timeout)
+            resp.raise_for_status()
+            # 自动检测编码
+            if not resp.encoding or resp.encoding.lower() == "iso-8859-1":
+                resp.encoding = resp.apparent_encoding or "utf-8"
+            return resp.text
+        except Exception as e:
+            last_err = e
+            if attempt < retries:
+                sleep_s = backoff * attempt + random.uniform(0, 0.6)
+                time.sleep(sleep_s)
+    raise RuntimeError(f"Fetch failed: {url} (err={last_err})")
+
+
+def fetch_toc_conditional(
+    session: requests.Session,
+    url: str,
+    *,
+    etag: str = "",
+    last_modified: str = "",
+    timeout: int = 20,
+) -> Tuple[Optional[str], str, str]:
+    """
+    条件请求目录页。返回 (html 或 None(304 未修改), etag, last_modified)。
+    """
+    headers: Dict[str, str] = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    resp = session.get(url, headers=headers, timeout=timeout)
+    if resp.status_code == 304:
+        return None, etag, last_modified
+    resp.raise_for_status()
+    if not resp.encoding or resp.encoding.lower() == "iso-8859-1":
+        resp.encoding = resp.apparent_encoding or "utf-8"
+    return (
+        resp.text,
+        resp.headers.get("ETag", ""),
+        resp.headers.get("Last-Modified", ""),
+    )
+
+
+def robots_allowed(session: requests.Session, url: str, user_agent: str = DEFAULT_UA) -> bool:
+    """
+    读取 robots.txt 并判断是否允许抓取该 URL。
+    注意：并非所有站点都有 robots.txt；无则视为允许。
+    """
+    parsed = urlparse(url)
+    robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+    rp = robotparser.RobotFileParser()
+    try:
+        txt = fetch_html(session, robots_url, retries=2)
+        rp.parse(txt.splitlines())
+        return rp.can_fetch(user_agent, url)
+    except Exception:
+        return True
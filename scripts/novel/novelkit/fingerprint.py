@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""
+Near-duplicate chapter detection: MinHash over character shingles + LSH banding.
+
+- Catches the same chapter listed twice under different numbers, and the
+  placeholder page ("章节内容正在手打中") served for many URLs
+- One index per book, persisted in <out>/.novel/fingerprints.json
+- Each lookup touches only BANDS buckets, so checking a whole book is ~linear
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import random
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from novelkit.common import ensure_dir
+
+
+SHINGLE_K = 5                # 字符 5-gram（去掉空白后）
+NUM_PERM = 64                # MinHash 签名长度
+BANDS = 16                   # LSH 分带：16 带 × 4 行，候选阈值约 J≈0.5
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.8      # 估计 Jaccard ≥ 此值视为近重复
+
+_MERSENNE = (1 << 61) - 1
+# 固定种子：签名要写盘，跨进程必须稳定
+_rng = random.Random(0x6E6F76)
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+
+def shingle_hashes(text: str, k: int = SHINGLE_K) -> Set[int]:
+    t = "".join(text.split())
+    if not t:
+        return set()
+    if len(t) <= k:
+        return {zlib.crc32(t.encode("utf-8"))}
+    return {zlib.crc32(t[i:i + k].encode("utf-8")) for i in range(len(t) - k + 1)}
+
+
+def minhash(text: str) -> List[int]:
+    hs = shingle_hashes(text)
+    if not hs:
+        return []
+    return [min((a * x + b) % _MERSENNE for x in hs) for a, b in _PERMS]
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    if not sig_a or not sig_b:
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def index_path(out_dir: str) -> str:
+    return os.path.join(out_dir, ".novel", "fingerprints.json")
+
+
+class DedupeIndex:
+    """
+    每本书一个 LSH 索引：{章序号: 签名}，外加 (band, rows) -> [章序号] 的桶。
+    """
+
+    def __init__(self, path: str, threshold: float = DEFAULT_THRESHOLD) -> None:
+        self.path = path
+        self.threshold = threshold
+        self.sigs: Dict[int, List[int]] = {}
+        self.dups: Dict[int, int] = {}          # 章序号 -> 与之重复的章序号
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, out_dir: str, threshold: float = DEFAULT_THRESHOLD) -> "DedupeIndex":
+        idx = cls(index_path(out_dir), threshold)
+        if os.path.exists(idx.path):
+            with open(idx.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, sig in data.get("chapters", {}).items():
+                idx._insert(int(key), sig)
+            idx.dups = {int(k): int(v) for k, v in data.get("dups", {}).items()}
+        return idx
+
+    def _bands(self, sig: List[int]):
+        for b in range(BANDS):
+            yield b, tuple(sig[b * ROWS:(b + 1) * ROWS])
+
+    def _insert(self, index: int, sig: List[int]) -> None:
+        self.sigs[index] = sig
+        for key in self._bands(sig):
+            self.buckets.setdefault(key, []).append(index)
+
+    def find(self, sig: List[int], *, exclude: int = 0) -> Optional[Tuple[int, float]]:
+        """
+        返回 (最相似的已有章序号, 估计 Jaccard)；没有超过阈值的则返回 None。
+        """
+        if not sig:
+            return None
+        seen: Set[int] = set()
+        best: Optional[Tuple[int, float]] = None
+        for key in self._bands(sig):
+            for other in self.buckets.get(key, ()):
+                if other == exclude or other in seen:
+                    continue
+                seen.add(other)
+                sim = similarity(sig, self.sigs[other])
+                if sim >= self.threshold and (best is None or sim > best[1]):
+                    best = (other, sim)
+        return best
+
+    def add(self, index: int, sig: List[int], *, dup_of: int = 0) -> None:
+        if not sig:
+            return
+        old = self.sigs.get(index)
+        if old is not None:
+            for key in self._bands(old):
+                self.buckets[key].remove(index)
+        self._insert(index, sig)
+        if dup_of:
+            self.dups[index] = dup_of
+        else:
+            self.dups.pop(index, None)
+        self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        ensure_dir(os.path.dirname(self.path))
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "k": SHINGLE_K,
+                    "num_perm": NUM_PERM,
+                    "bands": BANDS,
+                    "chapters": {str(k): v for k, v in sorted(self.sigs.items())},
+                    "dups": {str(k): v for k, v in sorted(self.dups.items())},
+                },
+                f,
+            )
+        os.replace(tmp, self.path)
+        self.dirty = False
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+Offline maintenance over downloaded books: stats + reparse (re-run normalization + cleanup rules).
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+from typing import Dict, List, Optional, Tuple
+
+from novelkit.normalize import Normalizer
+from novelkit.output import atomic_write_text, find_chapter_files
+from novelkit.text import clean_text
+
+
+def split_chapter_md(content: str) -> Tuple[str, str]:
+    """
+    拆出 ("# 标题" 行, 正文)。没有一级标题时标题为空。
+    """
+    if content.startswith("# "):
+        head, _, body = content.partition("\n")
+        return head[2:].strip(), body
+    return "", content
+
+
+def book_stats(folder: str) -> Dict[str, float]:
+    chapters = find_chapter_files(folder)
+    sizes: List[int] = []
+    total_bytes = 0
+    for _, path in chapters:
+        total_bytes += os.path.getsize(path)
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            _, body = split_chapter_md(f.read())
+        sizes.append(len("".join(body.split())))
+
+    return {
+        "chapters": len(chapters),
+        "chars": sum(sizes),
+        "bytes": total_bytes,
+        "min_chars": min(sizes) if sizes else 0,
+        "median_chars": statistics.median(sizes) if sizes else 0,
+        "max_chars": max(sizes) if sizes else 0,
+    }
+
+
+def reparse_dir(folder: str, *, dry_run: bool = False, norm: Optional[Normalizer] = None) -> Tuple[int, int]:
+    """
+    对已下载章节重新跑文本规范化 + clean_text（规则更新后无需重新抓取）。
+    norm 缺省时按本书 normalize.json。返回 (检查章节数, 变化章节数)。
+    """
+    if norm is None:
+        norm = Normalizer.for_book(folder)
+    checked = changed = 0
+    for _, path in find_chapter_files(folder):
+        checked += 1
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            content = f.read()
+        title, body = split_chapter_md(content)
+        title = norm(title)
+        text = clean_text(norm(body))
+        new = (f"# {title}\n\n" if title else "") + text + "\n"
+        if new == content:
+            continue
+
+        changed += 1
+        print(f"[{'DRY' if dry_run else 'FIX'}] {os.path.basename(path)}")
+        if not dry_run:
+            atomic_write_text(path, new)
+    return checked, changed
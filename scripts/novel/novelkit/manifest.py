@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-book resume manifest: <out>/.novel/manifest.json
+One entry per written chapter (a paginated chapter is still one entry).
+Resume looks chapters up here by index, so the file actually written (page h1 /
+normalized title) is found even when it differs from the TOC title.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict
+
+from novelkit.common import Chapter, ensure_dir
+
+
+def manifest_path(out_dir: str) -> str:
+    return os.path.join(out_dir, ".novel", "manifest.json")
+
+
+class Manifest:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.chapters: Dict[int, Dict[str, Any]] = {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, out_dir: str) -> "Manifest":
+        m = cls(manifest_path(out_dir))
+        if os.path.exists(m.path):
+            with open(m.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            m.chapters = {int(k): v for k, v in data.get("chapters", {}).items()}
+        return m
+
+    def file_for(self, index: int) -> str:
+        """
+        已记录且仍在磁盘上的章节文件路径；没有记录或文件已删时返回空串。
+        """
+        entry = self.chapters.get(index)
+        if not entry or not entry.get("file"):
+            return ""
+        out_dir = os.path.dirname(os.path.dirname(self.path))
+        path = os.path.join(out_dir, entry["file"])
+        return path if os.path.exists(path) else ""
+
+    def record(self, chapter: Chapter, filename: str, **extra: Any) -> None:
+        self.chapters[chapter.index] = {
+            "num": chapter.num,
+            "title": chapter.title,
+            "url": chapter.url,
+            "pages": list(chapter.pages),
+            "volume": chapter.volume,
+            "file": filename,
+            **extra,
+        }
+        self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        ensure_dir(os.path.dirname(self.path))
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"chapters": {str(k): v for k, v in sorted(self.chapters.items())}},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        self.dirty = False
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+Table-driven text normalization for chapter bodies (stdlib only).
+
+All character-level rules are merged into one str.translate table, built once
+per option set, so a chapter is normalized in a single pass:
+  width   full-width ASCII letters/digits/symbols -> half-width (Ａ１ -> A1);
+          CJK compatibility / small / vertical punctuation forms -> standard (﹐ -> ，)
+  spaces  NBSP and other Unicode spaces -> " "; zero-width chars, BOM, soft hyphen,
+          C0/C1 controls -> removed (newline and tab are kept)
+  t2s     traditional -> simplified, character level (data/t2s_chars.tsv, or t2s_table)
+Optional second pass:
+  punct   half-width , ! ? : ; next to CJK text -> full-width (，！？：；)
+
+Per-book settings live in <out>/.novel/normalize.json; defaults below apply to
+keys it does not set.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from novelkit.common import ensure_dir
+
+
+DEFAULTS: Dict[str, Any] = {"enabled": True, "width": True, "spaces": True, "punct": True, "t2s": False, "t2s_table": ""}
+
+T2S_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "t2s_chars.tsv")
+
+# 全角 ASCII 区里中文排版本来就用全角的标点：width 折叠时保留
+KEEP_FULLWIDTH = "，！？：；（）～"
+
+# 兼容/竖排/小型标点 -> 常用全角标点
+COMPAT_PUNCT = {
+    "﹐": "，", "﹑": "、", "﹒": "。", "﹔": "；", "﹕": "：", "﹖": "？", "﹗": "！",
+    "﹙": "（", "﹚": "）", "︐": "，", "︑": "、", "︒": "。", "︓": "：", "︔": "；",
+    "︕": "！", "︖": "？", "︵": "（", "︶": "）", "︰": "：", "﹁": "「", "﹂": "」",
+    "﹃": "『", "﹄": "』", "︙": "…",
+}
+
+SPACE_CHARS = "\u00a0\u1680" + "".join(chr(cp) for cp in range(0x2000, 0x200B)) + "\u202f\u205f"
+# 零宽字符、BOM、软连字符、方向控制
+DROP_CHARS = "\u200b\u200c\u200d\u200e\u200f\u2060\u2061\u2062\u2063\u2064\ufeff\u00ad\u202a\u202b\u202c\u202d\u202e"
+
+CJK = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3000-\u303f\uff00-\uffef"
+HALF_PUNCT = rf"(?<=[{CJK}])[,!?:;]|[,!?:;](?=[{CJK}])"
+HALF_TO_FULL = {",": "，", "!": "！", "?": "？", ":": "：", ";": "；"}
+
+
+def config_path(out_dir: str) -> str:
+    return os.path.join(out_dir, ".novel", "normalize.json")
+
+
+def load_book_config(out_dir: str) -> Dict[str, Any]:
+    """
+    读取书目录的 normalize.json，与 DEFAULTS 合并（文件缺失 / 损坏时用默认值）。
+    """
+    cfg = dict(DEFAULTS)
+    try:
+        with open(config_path(out_dir), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return cfg
+    if isinstance(data, dict):
+        cfg.update({k: v for k, v in data.items() if k in DEFAULTS})
+    return cfg
+
+
+def save_book_config(out_dir: str, **changes: Any) -> Dict[str, Any]:
+    """
+    只把 changes 写进 normalize.json（保留文件里已有的其它键），返回合并后的配置。
+    """
+    path = config_path(out_dir)
+    data: Dict[str, Any] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        pass
+    data.update({k: v for k, v in changes.items() if k in DEFAULTS})
+    ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+    return load_book_config(out_dir)
+
+
+@lru_cache(maxsize=None)
+def load_t2s(path: str = T2S_TABLE) -> Dict[int, str]:
+    """
+    读 "<繁>\\t<简>" 对照表（# 开头为注释；一行多个候选时取第一个）。只加载一次。
+    """
+    pairs: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            parts = line.split()
+            if len(parts) >= 2 and len(parts[0]) == 1 and len(parts[1]) == 1 and parts[0] != parts[1]:
+                pairs[parts[0]] = parts[1]
+    # 链式映射（A->B, B->C）压成 A->C，保证一遍 translate 就是终态
+    for k, v in pairs.items():
+        seen = {k}
+        while v in pairs and v not in seen:
+            seen.add(v)
+            v = pairs[v]
+        pairs[k] = v
+    return {ord(k): v for k, v in pairs.items()}
+
+
+@lru_cache(maxsize=None)
+def build_table(width: bool, spaces: bool, t2s: bool, t2s_table: str = "") -> Dict[int, Optional[str]]:
+    table: Dict[int, Optional[str]] = {}
+    if t2s:
+        table.update(load_t2s(t2s_table or T2S_TABLE))
+    if width:
+        for cp in range(0xFF01, 0xFF5F):
+            if chr(cp) not in KEEP_FULLWIDTH:
+                table[cp] = chr(cp - 0xFEE0)
+        table.update({ord(k): v for k, v in COMPAT_PUNCT.items()})
+    if spaces:
+        table.update({ord(c): " " for c in SPACE_CHARS})
+        table.update({ord(c): None for c in DROP_CHARS})
+        table.update({cp: None for cp in range(0x20) if cp not in (0x09, 0x0A, 0x0D)})
+        table.update({cp: None for cp in range(0x7F, 0xA0)})
+    return table
+
+
+def book_normalizer(out_dir: str, *, save: bool = True, **changes: Optional[bool]) -> "Normalizer":
+    """
+    书目录的 Normalizer；changes 里非 None 的项（来自命令行）覆盖配置，save=True 时写回 normalize.json。
+    """
+    changes = {k: v for k, v in changes.items() if v is not None}
+    if changes and save:
+        return Normalizer(save_book_config(out_dir, **changes))
+    return Normalizer({**load_book_config(out_dir), **changes})
+
+
+class Normalizer:
+    """
+    按配置预先合并好 translate 表；调用即规范化一段文本。
+    """
+
+    def __init__(self, cfg: Optional[Dict[str, Any]] = None) -> None:
+        cfg = {**DEFAULTS, **(cfg or {})}
+        self.cfg = cfg
+        self.enabled = bool(cfg["enabled"])
+        self.table = build_table(bool(cfg["width"]), bool(cfg["spaces"]), bool(cfg["t2s"]), str(cfg["t2s_table"] or ""))
+        # 正则只在启用 punct 的书上编译（reparse / stats 的启动时间）
+        self.punct_re = re.compile(HALF_PUNCT) if cfg["punct"] else None
+
+    @classmethod
+    def for_book(cls, out_dir: str) -> "Normalizer":
+        return cls(load_book_config(out_dir))
+
+    def __call__(self, text: str) -> str:
+        if not self.enabled or not text:
+            return text
+        if self.table:
+            text = text.translate(self.table)
+        if self.punct_re is not None:
+            text = self.punct_re.sub(lambda m: HALF_TO_FULL[m.group()], text)
+        return text
+
+    def describe(self) -> str:
+        if not self.enabled:
+            return "off"
+        on = [k for k in ("width", "spaces", "punct", "t2s") if self.cfg[k]]
+        return "+".join(on) or "none"
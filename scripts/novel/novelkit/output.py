@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter files on disk: write, list, merge into one Markdown, pandoc -> EPUB.
+Stdlib only — merge/epub never pay for requests/bs4 imports.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import subprocess
+from typing import List, Optional, Tuple
+
+from novelkit.common import Chapter, chapter_filename, ensure_dir
+
+
+# 章节文件：crawl 写出的 "001 标题.md"，以及 build_book 习惯的 "001.md"
+CHAPTER_FILE_RE = re.compile(r"^(\d+)(?:\s.*)?\.md$", re.IGNORECASE)
+
+SOURCE_LINE_RE = re.compile(r"^来源：.*\n\n", re.M)
+H1_LINE_RE = re.compile(r"^\s*#\s+.+?\n+", re.M)
+
+
+def drop_merge_lines(content: str, *, section_headings: bool, drop_source_line: bool) -> str:
+    """
+    合并时从章节内容里去掉的行：“来源：xxx”（drop_source_line），章内一级标题（section_headings）。
+    """
+    # 可选：去掉每章的 “来源：xxx” 这行（更适合做 epub）
+    if drop_source_line:
+        content = SOURCE_LINE_RE.sub("", content)
+    # 去掉每章文件里的一级标题（# xxx），避免在合并文件里重复
+    if section_headings:
+        content = H1_LINE_RE.sub("", content)
+    return content
+
+
+def render_chapter_md(title: str, text: str) -> str:
+    return f"# {title}\n\n{text.strip()}\n"
+
+
+def atomic_write_text(path: str, content: str) -> None:
+    """
+    先写 <path>.tmp 再 rename：中断时旧文件（或无文件）保持完整。
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def write_chapter_md(out_dir: str, chapter: Chapter, text: str, title: str) -> str:
+    ensure_dir(out_dir)
+    path = os.path.join(out_dir, chapter_filename(chapter, title))
+    atomic_write_text(path, render_chapter_md(title, text))
+    return path
+
+
+def find_chapter_files(folder: str, exclude: str = "") -> List[Tuple[int, str]]:
+    """
+    返回 [(章号, 路径)]，按章号（再按文件名）排序。
+    """
+    items: List[Tuple[int, str, str]] = []
+    for fn in os.listdir(folder):
+        if fn == exclude:
+            continue
+        m = CHAPTER_FILE_RE.match(fn)
+        if m:
+            items.append((int(m.group(1)), fn, os.path.join(folder, fn)))
+    items.sort()
+    return [(idx, path) for idx, _, path in items]
+
+
+def merge_chapters(
+    chapters: List[Tuple[int, str]],
+    out_md: str,
+    book_title: str,
+    *,
+    section_headings: bool = True,
+    drop_source_line: bool = True,
+) -> str:
+    """
+    section_headings=True：每章写 "## <文件名>" 并去掉章内一级标题（crawl 风格）
+    section_headings=False：章间用 "---" 分隔，保留章内标题（build_book 风格）
+    """
+    if not chapters:
+        raise RuntimeError("No chapter md files to merge.")
+
+    with open(out_md, "w", encoding="utf-8") as w:
+        w.write(f"# {book_title}\n\n")
+        for _, path in chapters:
+            with open(path, "r", encoding="utf-8", errors="ignore") as r:
+                content = r.read().strip()
+            content = drop_merge_lines(content, section_headings=section_headings, drop_source_line=drop_source_line)
+
+            if section_headings:
+                w.write(f"## {os.path.splitext(os.path.basename(path))[0]}\n\n")
+                w.write(content)
+                w.write("\n\n")
+            else:
+                w.write("\n\n---\n\n")
+                w.write(content)
+                w.write("\n")
+    return out_md
+
+
+def merged_md_path(out_dir: str, merge_name: str) -> str:
+    """
+    --merge 文件名 -> out_dir 下的合并 md 路径（缺省补 .md）。
+    """
+    if not merge_name.lower().endswith(".md"):
+        merge_name += ".md"
+    return os.path.join(out_dir, merge_name)
+
+
+def merge_markdown(out_dir: str, merge_name: str, book_title: Optional[str] = None) -> str:
+    """
+    crawl 的合并入口：把 out_dir 下的章节合并到 out_dir/merge_name。
+    """
+    ensure_dir(out_dir)
+
+    merge_path = merged_md_path(out_dir, merge_name)
+    merge_name = os.path.basename(merge_path)
+    chapters = find_chapter_files(out_dir, exclude=merge_name)
+    if not chapters:
+        raise RuntimeError(f"No chapter md files found in: {out_dir}")
+
+    if book_title is None:
+        book_title = os.path.splitext(os.path.basename(merge_name))[0]
+
+    return merge_chapters(chapters, merge_path, book_title)
+
+
+def pandoc_epub(md_path: str, epub_path: str, title: str, lang: str = "zh-CN", *, toc: bool = False) -> bool:
+    """
+    通过 pandoc 把 md 转成 epub
+    """
+    cmd = [
+        "pandoc",
+        md_path,
+        "-o",
+        epub_path,
+        "--from",
+        "markdown",
+        "--to",
+        "epub",
+        "--metadata",
+        f"title={title}",
+        "--metadata",
+        f"lang={lang}",
+        "--quiet",
+    ]
+    if toc:
+        cmd.append("--toc")
+    try:
+        subprocess.run(cmd, check=True)
+        return True
+    except FileNotFoundError:
+        print("[WARN] pandoc not found. Skip EPUB generation.")
+        return False
+    except subprocess.CalledProcessError as e:
+        print(f"[WARN] pandoc failed (skip epub): {e}")
+        return False
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+"""
+HTML parsing: TOC link extraction + chapter body extraction.
+TOC/link extraction streams through html.parser (no DOM tree); chapter bodies use bs4.
+Imports bs4 at module load — only crawl/watch import this module.
+"""
+
+from __future__ import annotations
+
+import re
+import posixpath
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse, urlunparse
+
+from bs4 import BeautifulSoup
+
+from novelkit.common import Chapter
+from novelkit.text import clean_text
+
+
+# 章节链接：3~4 位数字结尾，支持相对路径 books/xxx/0001.html
+# （分页 0001_2.html 不会命中：后续页属于同一章，由 chapter_page_urls 处理）
+CHAPTER_HREF_RE = re.compile(r"(?:^|/)(\d{3,4})\.html?$", re.IGNORECASE)
+
+# 分页：1234.html -> 1234_2.html / 1234_3.html
+PAGE_FILE_RE = re.compile(r"^(?P<stem>.+?)(?:_(?P<page>\d{1,3}))?(?P<ext>\.html?)$", re.IGNORECASE)
+# 页码提示：“第1/3页”、标题里的 “(1/3)”
+PAGE_COUNT_RE = re.compile(r"第\s*\d+\s*/\s*(\d+)\s*页")
+TITLE_PAGE_SUFFIX_RE = re.compile(r"\s*[（(]\s*\d+\s*/\s*(\d+)\s*[)）]\s*$")
+MAX_PAGES = 50
+
+# 目录页上的分卷标题：“第一卷 xxx”“卷三”“正文卷”
+VOLUME_RE = re.compile(r"^(?:第[\d一二三四五六七八九十百千零〇两]+卷|卷[\d一二三四五六七八九十百千]+|正文卷|作品相关)")
+VOLUME_TAGS = ["dt", "h2", "h3", "h4", "h5", "div", "span", "strong", "b", "td", "li", "p"]
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    # 尽量用 lxml（更快更宽容），没有就回落 html.parser
+    try:
+        return BeautifulSoup(html, "lxml")  # type: ignore[arg-type]
+    except Exception:
+        return BeautifulSoup(html, "html.parser")
+
+
+# ----------------------------- TOC parsing -----------------------------
+# 非章节导航：标题含这些词就丢（原先“含首页/返回/收藏…且含上一页/下一页/目录”，前者包含后者，等价于此）
+NAV_WORDS = ("上一页", "下一页", "目录")
+VOLUME_TAG_SET = frozenset(VOLUME_TAGS)
+SKIP_TEXT_TAGS = frozenset(("script", "style", "template"))
+
+
+class UrlResolver:
+    """
+    urljoin(base, href) 的快速版：base 只解析一次；
+    "/a/b.html"、"b.html" 这类常见 href 直接拼接，其余（带 scheme、./ ../、//、?、#、; ...）交给 urljoin。
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url
+        p = urlparse(base_url)
+        self.ok = bool(p.scheme in ("http", "https") and p.netloc and not p.params)
+        self.origin = f"{p.scheme}://{p.netloc}"
+        self.dir = self.origin + (p.path[:p.path.rfind("/") + 1] if "/" in p.path else "/")
+
+    def __call__(self, href: str) -> str:
+        if self.ok and href and href not in (".", "..") and not href.endswith(("/.", "/..")) \
+                and not any(c in href for c in (":", "?", "#", ";", "./", "//")):
+            return (self.origin if href[0] == "/" else self.dir) + href
+        return urljoin(self.base_url, href)
+
+
+class _TocLinkParser(HTMLParser):
+    """
+    流式扫描：不建树，只记 <a> 的 href/文字，以及不含链接的分卷标题元素的文字。
+    与 BeautifulSoup(html.parser) 的树一致：结束标签关闭最近的同名元素（中间未闭合的一并关闭）；
+    事件在开始标签处占位，保持 find_all 的先序（文档）顺序，文字在结束时补上。
+    """
+
+    def __init__(self, want_volumes: bool = True) -> None:
+        super().__init__(convert_charrefs=True)
+        self.want_volumes = want_volumes
+        # 打开的元素：[tag, 文字片段, 含 <a>, 事件下标]；只记 a 和 VOLUME_TAGS
+        self.stack: List[list] = []
+        self.events: List[Optional[Tuple[str, str, str]]] = []  # ("a", href, text) / ("vol", "", text) / None
+        self.skip = 0
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag in SKIP_TEXT_TAGS:
+            self.skip += 1
+            return
+        if tag == "a":
+            href = ""
+            for k, v in attrs:
+                if k == "href":
+                    href = v or ""  # 重复属性取最后一个（同 bs4）
+            for el in self.stack:
+                el[2] = True
+            self.stack.append(["a", [], False, len(self.events)])
+            self.events.append(("a", href, ""))
+        elif self.want_volumes and tag in VOLUME_TAG_SET:
+            self.stack.append([tag, [], False, len(self.events)])
+            self.events.append(None)
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag == "a" or (self.want_volumes and tag in VOLUME_TAG_SET):
+            self.handle_endtag(tag)
+        elif tag in SKIP_TEXT_TAGS:
+            self.skip -= 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TEXT_TAGS:
+            self.skip = max(0, self.skip - 1)
+            return
+        for k in range(len(self.stack) - 1, -1, -1):
+            if self.stack[k][0] == tag:
+                while len(self.stack) > k:
+                    self._close(self.stack.pop())
+                return
+
+    def handle_data(self, data: str) -> None:
+        if self.skip or not self.stack:
+            return
+        t = data.strip()
+        if t:
+            for el in self.stack:
+                el[1].append(t)
+
+    def _close(self, el: list) -> None:
+        text = " ".join(el[1])
+        i = el[3]
+        if el[0] == "a":
+            self.events[i] = ("a", self.events[i][1], text)
+        elif not el[2] and len(text) <= 40 and VOLUME_RE.match(text):
+            self.events[i] = ("vol", "", text)
+
+    def close(self) -> None:
+        super().close()
+        while self.stack:
+            self._close(self.stack.pop())
+
+
+def _scan_toc(html: str, want_volumes: bool) -> List[Tuple[str, str, str]]:
+    parser = _TocLinkParser(want_volumes)
+    parser.feed(html)
+    parser.close()
+    return [ev for ev in parser.events if ev is not None]
+
+
+def extract_links(html: str, base_url: str) -> List[str]:
+    """
+    页面上所有 <a href> 的绝对 URL（按出现顺序，去掉锚点/javascript）。
+    """
+    resolve = UrlResolver(base_url)
+    out: List[str] = []
+    for _, href, _ in _scan_toc(html, want_volumes=False):
+        href = href.strip()
+        if not href or href.startswith("#") or href[:11].lower() == "javascript:":
+            continue
+        out.append(resolve(href))
+    return out
+
+
+def extract_chapters_from_toc(toc_html: str, toc_url: str) -> List[Chapter]:
+    """
+    解析目录页，提取章节链接，去重、排序、过滤噪声。
+    流式扫描 <a> 与分卷标题（不建 DOM 树），几千章的目录也只是一遍正则扫描。
+    """
+    resolve = UrlResolver(toc_url)
+    candidates: List[Tuple[int, str, str, str]] = []  # (num, abs_url, title, volume)
+    volume = ""
+
+    # 按文档顺序同时看链接与分卷标题：每个章节归属它前面最近的分卷
+    for kind, href, text in _scan_toc(toc_html, want_volumes=True):
+        if kind == "vol":
+            volume = text
+            continue
+
+        href = href.strip()
+        if not href or href[0] == "#" or href[:11].lower() == "javascript:":
+            continue
+
+        m = CHAPTER_HREF_RE.search(href)
+        if not m:
+            continue
+
+        chap_no = int(m.group(1))
+        title = text or f"第{chap_no}章"
+
+        # 过滤明显非章节导航
+        if any(w in title for w in NAV_WORDS):
+            continue
+
+        candidates.append((chap_no, resolve(href), title, volume))
+
+    if not candidates:
+        return []
+
+    # 去重：同章号多次出现时，优先标题更长的；分卷取非空的那次（顶部“最新章节”块没有分卷）
+    best: Dict[int, Tuple[str, str, str]] = {}
+    for chap_no, abs_url, title, vol in candidates:
+        if chap_no not in best:
+            best[chap_no] = (abs_url, title, vol)
+        else:
+            old_url, old_title, old_vol = best[chap_no]
+            if len(title) > len(old_title):
+                best[chap_no] = (abs_url, title, vol or old_vol)
+            else:
+                best[chap_no] = (old_url, old_title, old_vol or vol)
+
+    # 排序：按章号升序；输出 index 从 1..N
+    out: List[Chapter] = []
+    for idx, chap_no in enumerate(sorted(best.keys()), start=1):
+        url, title, vol = best[chap_no]
+        out.append(Chapter(index=idx, num=chap_no, title=title, url=url, volume=vol))
+
+    return out
+
+
+# ----------------------------- Content extraction -----------------------------
+def choose_main_text_block(soup: BeautifulSoup) -> str:
+    """
+    选择正文块：优先常见 content 容器，否则选“最长文本块”。
+    """
+    # 移除脚本/样式
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+
+    # 1) 先尝试常见容器
+    for key, val in [
+        ("id", "content"),
+        ("id", "Content"),
+        ("id", "chaptercontent"),
+        ("id", "ChapterContent"),
+    ]:
+        node = soup.find(**{key: val})
+        if node:
+            return node.get_text("\n", strip=True)
+
+    for cls in ["content", "article", "chapter", "txt", "text", "read-content"]:
+        node = soup.find(class_=cls)
+        if node:
+            return node.get_text("\n", strip=True)
+
+    # 2) 兜底：找最大文本 div
+    best_text = ""
+    best_len = 0
+    for div in soup.find_all(["div", "article", "section"]):
+        txt = div.get_text("\n", strip=True)
+        if len(txt) > best_len:
+            best_len = len(txt)
+            best_text = txt
+
+    if best_text:
+        return best_text
+
+    # 3) 再兜底：body
+    body = soup.body.get_text("\n", strip=True) if soup.body else soup.get_text("\n", strip=True)
+    return body
+
+
+def page_url(first_url: str, page: int) -> str:
+    """
+    第 page 页的 URL：.../1234.html -> .../1234_<page>.html
+    """
+    parsed = urlparse(first_url)
+    head, base = posixpath.split(parsed.path)
+    m = PAGE_FILE_RE.match(base)
+    if not m:
+        return first_url
+    path = posixpath.join(head, f"{m.group('stem')}_{page}{m.group('ext')}")
+    return urlunparse(parsed._replace(path=path))
+
+
+def count_pages(soup: BeautifulSoup, url: str, title: str) -> int:
+    """
+    判断章节共几页（含第一页）；1 表示未分页。
+    依据：指向同一章后续页的链接（下一页 / 页码条），以及“第1/3页”“(1/3)”提示。
+    """
+    base = PAGE_FILE_RE.match(posixpath.basename(urlparse(url).path))
+    if not base:
+        return 1
+    stem = base.group("stem")
+    page_dir = posixpath.dirname(urlparse(url).path)
+
+    total = 1
+    for a in soup.find_all("a", href=True):
+        target = urlparse(urljoin(url, a["href"].strip())).path
+        if posixpath.dirname(target) != page_dir:
+            continue
+        m = PAGE_FILE_RE.match(posixpath.basename(target))
+        if m and m.group("page") and m.group("stem") == stem:
+            total = max(total, int(m.group("page")))
+
+    m = TITLE_PAGE_SUFFIX_RE.search(title)
+    if m:
+        total = max(total, int(m.group(1)))
+    for node in soup.find_all(string=PAGE_COUNT_RE):
+        total = max(total, int(PAGE_COUNT_RE.search(node).group(1)))
+
+    return min(total, MAX_PAGES)
+
+
+def parse_chapter_page(html: str, url: str = "") -> Tuple[str, str, int]:
+    """
+    解析章节的一页，返回 (title, 未清洗正文, 总页数)。url 为空时不检测分页。
+    """
+    soup = make_soup(html)
+    h1 = soup.find("h1")
+    title = h1.get_text(strip=True) if h1 else "Untitled"
+    total = count_pages(soup, url, title) if url else 1
+    title = TITLE_PAGE_SUFFIX_RE.sub("", title) or title
+    raw = choose_main_text_block(soup)
+    return title, raw, total
+
+
+def stitch_pages(title: str, raws: List[str], normalize: Optional[Callable[[str], str]] = None) -> str:
+    """
+    按页序拼接各页正文后统一清洗（导航“下一页”在这里才被过滤）。
+    normalize（见 novelkit.normalize）在清洗之前跑：零宽字符不会再挡住噪声规则。
+    """
+    raw = "\n".join(raws)
+    if normalize is not None:
+        raw = normalize(raw)
+    text = clean_text(raw)
+
+    # 避免正文第一行重复标题
+    if text.startswith(title):
+        text = text[len(title):].lstrip()
+
+    return text
+
+
+def parse_chapter(html: str) -> Tuple[str, str]:
+    """
+    返回 (title, cleaned_text)
+    """
+    title, raw, _ = parse_chapter_page(html)
+    return title, stitch_pages(title, [raw])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+Progressive merged output while a crawl is still running.
+
+Every N newly written chapters or T seconds (whichever comes first) the merged
+Markdown (and EPUB with --epub) is rebuilt from the chapter files on disk:
+  - writer.flush() first, so every submitted chapter is already renamed into place
+  - only complete chapter files are listed (.md.tmp never matches)
+  - both outputs are written to "<path>.part" and renamed, so a reader never
+    opens a half-written book
+The partial EPUB uses the native writer (no pandoc); the final build after the
+crawl still goes through build_outputs (pandoc / volumes as configured).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Optional
+
+from novelkit.export import export_book
+from novelkit.output import find_chapter_files, merged_md_path
+from novelkit.writer import ChapterWriter
+
+
+# 重建耗时随章节数增长：两次按时间触发的重建之间至少隔上次耗时的这么多倍
+MIN_IDLE_FACTOR = 10.0
+
+
+class ProgressiveOutput:
+    def __init__(self, ns: argparse.Namespace, writer: ChapterWriter, *, every: int, seconds: float) -> None:
+        self.out_dir = ns.out
+        self.md_path = merged_md_path(ns.out, ns.merge)
+        self.epub_path = os.path.splitext(self.md_path)[0] + ".epub" if ns.epub else ""
+        self.title = ns.title or os.path.splitext(os.path.basename(self.md_path))[0]
+        self.writer = writer
+        self.every = max(0, every)
+        self.seconds = max(0.0, seconds)
+        self.pending = 0
+        self.last_build = time.monotonic()
+        self.last_cost = 0.0
+        self.builds = 0
+
+    @classmethod
+    def from_ns(cls, ns: argparse.Namespace, writer: ChapterWriter) -> Optional["ProgressiveOutput"]:
+        """
+        只有 --merge 且 progress_every / progress_seconds 至少一个 > 0 时启用。
+        """
+        every = int(ns.progress_every or 0)
+        seconds = float(ns.progress_seconds or 0)
+        if not ns.merge or (every <= 0 and seconds <= 0):
+            return None
+        return cls(ns, writer, every=every, seconds=seconds)
+
+    def due(self) -> bool:
+        if self.pending <= 0:
+            return False
+        if self.every and self.pending >= self.every:
+            return True
+        idle = time.monotonic() - self.last_build
+        return bool(self.seconds) and idle >= max(self.seconds, self.last_cost * MIN_IDLE_FACTOR)
+
+    def tick(self, written: int = 1) -> bool:
+        """
+        每写入（入队）一章调用一次；到点则重建，返回是否重建了。
+        """
+        self.pending += written
+        if not self.due():
+            return False
+        self.rebuild()
+        return True
+
+    def rebuild(self) -> str:
+        t0 = time.monotonic()
+        self.writer.flush()
+        chapters = find_chapter_files(self.out_dir, exclude=os.path.basename(self.md_path))
+        if not chapters:
+            return ""
+
+        paths = {"md": self.md_path + ".part"}
+        formats = ["md"]
+        if self.epub_path:
+            paths["epub"] = self.epub_path + ".part"
+            formats.append("epub")
+        base = os.path.splitext(self.md_path)[0]
+        done = export_book(chapters, base, self.title, formats, section_headings=True, paths=paths)
+        # md 先就位，epub 随后：两者各自都是完整的一份
+        for fmt in formats:
+            os.replace(done[fmt], done[fmt][: -len(".part")])
+
+        self.pending = 0
+        self.builds += 1
+        self.last_build = time.monotonic()
+        self.last_cost = self.last_build - t0
+        extra = f" + {os.path.basename(self.epub_path)}" if self.epub_path else ""
+        print(f"[INFO] 进度输出: {len(chapters)} 章 -> {self.md_path}{extra} ({self.last_cost:.1f}s)")
+        return self.md_path
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter quality gate: catch truncated / placeholder pages before they are written.
+
+- Known placeholder / anti-crawl signatures ("正在手打中", "内容加载中", "Just a moment" ...)
+- Length outliers against the book's own running statistics (median chars / lines
+  of accepted chapters), once there are MIN_SAMPLES of them
+- Suspect chapters are re-queued with exponential backoff (RetryQueue); placeholders
+  that never recover are not written (resume retries them), short chapters are
+  written after the last attempt but stay in the report
+- State per book: <out>/.novel/quality.json; report: $TOOLBOX_DIR/_out/novel_quality/<book>.tsv
+- Suspects marked "refetch" (novelkit suspects --requeue) are re-fetched by the next
+  crawl even though the file exists, so a handful of bad pages never needs --force
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import json
+import os
+import random
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from novelkit.common import TOOLBOX_DIR, Chapter, ensure_dir, sanitize_filename
+
+
+REPORT_DIR = os.path.join(TOOLBOX_DIR, "_out", "novel_quality")
+
+MIN_SAMPLES = 20           # 已接受章节少于此数时只看特征串 / 绝对下限
+LOW_RATIO = 0.3            # 字数 / 行数低于本书中位数的这个比例视为截断
+MIN_CHARS = 50             # 绝对下限（去空白后的字数）
+SIGNATURE_MAX_CHARS = 1500  # 特征串只在短页里算数：长章节正文里出现“验证码”不算
+
+PLACEHOLDER_PATTERNS = [
+    r"正在手打中",
+    r"章节内容正在",
+    r"内容(?:正在)?加载中",
+    r"努力更新中",
+    r"请稍后(?:再)?(?:访问|刷新|重试)",
+    r"请(?:刷新|重新加载)(?:页面|本页)",
+    r"访问(?:过于|太)频繁",
+    r"(?:输入|请填写)验证码",
+    r"(?:开启|启用)\s*JavaScript",
+    r"Just a moment",
+    r"Checking your browser",
+    r"Access denied",
+    r"Too Many Requests",
+]
+PLACEHOLDER_RE = re.compile("|".join(f"(?:{p})" for p in PLACEHOLDER_PATTERNS), re.IGNORECASE)
+
+# 这些原因重抓不回来就不写入；其余（偏短）最后一次照写并留在报告里
+HARD_REASONS = ("placeholder", "empty")
+
+STATUS_RETRYING = "retrying"
+STATUS_SKIPPED = "skipped"     # 未写入，续抓时会再试
+STATUS_WRITTEN = "written"     # 重试用尽后照写
+STATUS_FLAGGED = "flagged"     # --quality-gate flag：照写只记录
+STATUS_REFETCH = "refetch"     # 离线扫描标记，下次抓取时重抓
+
+
+def text_stats(text: str) -> Tuple[int, int]:
+    """
+    (去空白后的字数, 非空行数)
+    """
+    lines = [ln for ln in text.split("\n") if ln.strip()]
+    return sum(len("".join(ln.split())) for ln in lines), len(lines)
+
+
+def median(sorted_values: List[int]) -> float:
+    n = len(sorted_values)
+    if not n:
+        return 0.0
+    mid = n // 2
+    return float(sorted_values[mid]) if n % 2 else (sorted_values[mid - 1] + sorted_values[mid]) / 2
+
+
+def quality_path(out_dir: str) -> str:
+    return os.path.join(out_dir, ".novel", "quality.json")
+
+
+class QualityGate:
+    """
+    每本书的运行统计：{章序号: (字数, 行数)}（只含通过检查的章节），外加可疑章节表。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.samples: Dict[int, Tuple[int, int]] = {}
+        self.suspects: Dict[int, Dict[str, object]] = {}
+        self.chars: List[int] = []   # 有序，用于中位数
+        self.lines: List[int] = []
+        self.dirty = False
+
+    @classmethod
+    def load(cls, out_dir: str) -> "QualityGate":
+        g = cls(quality_path(out_dir))
+        if os.path.exists(g.path):
+            with open(g.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for key, (chars, lines) in data.get("samples", {}).items():
+                g._insert(int(key), int(chars), int(lines))
+            g.suspects = {int(k): v for k, v in data.get("suspects", {}).items()}
+        return g
+
+    def _insert(self, index: int, chars: int, lines: int) -> None:
+        old = self.samples.get(index)
+        if old is not None:
+            del self.chars[bisect.bisect_left(self.chars, old[0])]
+            del self.lines[bisect.bisect_left(self.lines, old[1])]
+        self.samples[index] = (chars, lines)
+        bisect.insort(self.chars, chars)
+        bisect.insort(self.lines, lines)
+
+    def medians(self) -> Tuple[float, float]:
+        return median(self.chars), median(self.lines)
+
+    def check(self, text: str) -> Tuple[str, str]:
+        """
+        返回 (原因, 说明)；正常章节返回 ("", "")。
+        原因：placeholder / empty / short / few_lines。
+        """
+        chars, lines = text_stats(text)
+        if chars == 0:
+            return "empty", "no text"
+        if chars <= SIGNATURE_MAX_CHARS:
+            m = PLACEHOLDER_RE.search(text)
+            if m:
+                return "placeholder", f"matched {m.group(0)!r} ({chars} chars)"
+        if chars < MIN_CHARS:
+            return "short", f"{chars} chars < {MIN_CHARS}"
+        if len(self.samples) >= MIN_SAMPLES:
+            med_chars, med_lines = self.medians()
+            if chars < med_chars * LOW_RATIO:
+                return "short", f"{chars} chars < {LOW_RATIO:g} x median {med_chars:.0f}"
+            if lines < med_lines * LOW_RATIO:
+                return "few_lines", f"{lines} lines < {LOW_RATIO:g} x median {med_lines:.0f}"
+        return "", ""
+
+    def accept(self, chap: Chapter, text: str) -> None:
+        chars, lines = text_stats(text)
+        self._insert(chap.index, chars, lines)
+        self.suspects.pop(chap.index, None)
+        self.dirty = True
+
+    def flag(self, chap: Chapter, title: str, reason: str, detail: str, text: str, *,
+             attempts: int, status: str) -> None:
+        chars, lines = text_stats(text)
+        self.suspects[chap.index] = {
+            "num": chap.num,
+            "title": title,
+            "url": chap.url,
+            "reason": reason,
+            "detail": detail,
+            "chars": chars,
+            "lines": lines,
+            "attempts": attempts,
+            "status": status,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.dirty = True
+
+    def wants_refetch(self, index: int) -> bool:
+        """
+        已存在的章节文件是否仍要重抓（离线扫描标记过 / 上次是占位页没写入 / 重抓中被中断）。
+        """
+        s = self.suspects.get(index)
+        return bool(s) and s.get("status") in (STATUS_REFETCH, STATUS_SKIPPED, STATUS_RETRYING)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        ensure_dir(os.path.dirname(self.path))
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "samples": {str(k): list(v) for k, v in sorted(self.samples.items())},
+                    "suspects": {str(k): v for k, v in sorted(self.suspects.items())},
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def write_report(self, out_dir: str, report_dir: str = REPORT_DIR) -> str:
+        """
+        可疑章节写成 TSV（按章序号）；没有可疑章节时删除旧报告并返回空串。
+        """
+        name = sanitize_filename(os.path.basename(os.path.abspath(out_dir))) + ".tsv"
+        path = os.path.join(report_dir, name)
+        if not self.suspects:
+            if os.path.exists(path):
+                os.remove(path)
+            return ""
+        ensure_dir(report_dir)
+        med_chars, med_lines = self.medians()
+        cols = ("index", "num", "status", "reason", "chars", "lines", "attempts", "title", "url", "detail")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# book={os.path.abspath(out_dir)}\tsamples={len(self.samples)}\t"
+                    f"median_chars={med_chars:.0f}\tmedian_lines={med_lines:.0f}\n")
+            f.write("\t".join(cols) + "\n")
+            for index, s in sorted(self.suspects.items()):
+                row = [index] + [s.get(c, "") for c in cols[1:]]
+                f.write("\t".join(str(v).replace("\t", " ") for v in row) + "\n")
+        return path
+
+
+# ----------------------------- Re-queue with backoff -----------------------------
+class RetryQueue:
+    """
+    可疑章节的重抓队列：第 n 次重抓在 backoff * 2**(n-1) 秒（±20%）之后。
+    """
+
+    def __init__(self, max_attempts: int, backoff: float) -> None:
+        self.max_attempts = max(0, max_attempts)
+        self.backoff = max(0.0, backoff)
+        self.heap: List[Tuple[float, int, int, Chapter]] = []  # (到期时间, 章序号, 第几次, 章节)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, chap: Chapter, attempt: int) -> float:
+        """
+        排第 attempt 次重抓；次数用尽返回 -1，否则返回等待秒数。
+        """
+        if attempt > self.max_attempts:
+            return -1.0
+        delay = self.backoff * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+        heapq.heappush(self.heap, (time.monotonic() + delay, chap.index, attempt, chap))
+        return delay
+
+    def pop_due(self) -> Optional[Tuple[Chapter, int]]:
+        if self.heap and self.heap[0][0] <= time.monotonic():
+            _, _, attempt, chap = heapq.heappop(self.heap)
+            return chap, attempt
+        return None
+
+    def pop_wait(self) -> Tuple[Chapter, int]:
+        due, _, attempt, chap = heapq.heappop(self.heap)
+        wait = due - time.monotonic()
+        if wait > 0:
+            print(f"[INFO] 等待 {wait:.1f}s 后重抓 {chap.index:03d} {chap.title}")
+            time.sleep(wait)
+        return chap, attempt
+
+
+def with_retries(chapters: Iterable[Chapter], queue: RetryQueue) -> Iterator[Tuple[Chapter, int]]:
+    """
+    按顺序产出 (章节, 第几次重抓)：到期的重抓插在正常章节之间，最后等完剩下的。
+    """
+    for chap in chapters:
+        while True:
+            item = queue.pop_due()
+            if item is None:
+                break
+            yield item
+        yield chap, 0
+    while queue:
+        yield queue.pop_wait()
+
+
+# ----------------------------- Offline scan -----------------------------
+def scan_book(folder: str, *, requeue: bool = False) -> Tuple[int, List[Tuple[int, str, str, str]]]:
+    """
+    扫描已下载章节：先用全部章节算中位数，再逐章检查（不联网）。
+    requeue=True 时把可疑章节标成 refetch，下次 crawl 续抓会只重抓它们。
+    返回 (检查章节数, [(章序号, 文件名, 原因, 说明)])。
+    """
+    # 延迟导入：library 会拉进 normalize/output，scan 之外用不到
+    from novelkit.library import split_chapter_md
+    from novelkit.output import find_chapter_files
+
+    gate = QualityGate.load(folder)
+    docs: List[Tuple[int, str, str, str]] = []
+    fresh = QualityGate(gate.path)
+    for index, path in find_chapter_files(folder):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            title, body = split_chapter_md(f.read())
+        docs.append((index, path, title, body))
+        chars, lines = text_stats(body)
+        fresh._insert(index, chars, lines)
+
+    found: List[Tuple[int, str, str, str]] = []
+    for index, path, title, body in docs:
+        reason, detail = fresh.check(body)
+        if not reason:
+            gate.suspects.pop(index, None)  # 之前可疑、现在正常（已重抓 / 手工修过）
+            continue
+        found.append((index, os.path.basename(path), reason, detail))
+        prev = gate.suspects.get(index, {})
+        chap = Chapter(index=index, num=int(prev.get("num", index) or index), title=title,
+                       url=str(prev.get("url", "")))
+        status = STATUS_REFETCH if requeue else str(prev.get("status") or STATUS_FLAGGED)
+        gate.flag(chap, title, reason, detail, body, attempts=int(prev.get("attempts", 0) or 0), status=status)
+    # 统计以全书为准（含之前没有记录过的章节）
+    for index, (chars, lines) in fresh.samples.items():
+        if index not in gate.suspects:
+            gate._insert(index, chars, lines)
+    gate.dirty = True
+    gate.save()
+    gate.write_report(folder)
+    return len(docs), found
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+Full-text search over the downloaded library (SQLite FTS5, stdlib only).
+
+- CJK text is indexed as overlapping character bigrams plus the run's last
+  character ("江湖夜雨" -> 江湖 湖夜 夜雨 雨), Latin/digit runs as lower-cased words;
+  queries are tokenized the same way and matched as phrases, so lookups hit the
+  FTS index instead of scanning text (a single character is a prefix lookup)
+- The tokenizer version is kept in PRAGMA user_version; a mismatch drops the
+  chapter tables so the next `index` run rebuilds them
+- The FTS table is contentless; chapter text is kept zlib-compressed next to it
+  (for snippets, and to replay the old tokens when a chapter is re-indexed)
+- Incremental: unchanged files are skipped by size/mtime, then by content hash;
+  chapters whose files disappeared are dropped
+- Default DB: $NOVEL_SEARCH_DB or $TOOLBOX_DIR/_out/novel_search/index.sqlite
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import zlib
+from typing import Dict, Iterator, List, Tuple
+
+from novelkit.common import TOOLBOX_DIR, ensure_dir
+from novelkit.library import split_chapter_md
+from novelkit.output import SOURCE_LINE_RE, find_chapter_files
+
+
+DEFAULT_DB = os.environ.get("NOVEL_SEARCH_DB") or os.path.join(TOOLBOX_DIR, "_out", "novel_search", "index.sqlite")
+DEFAULT_ROOT = os.environ.get("NOVEL_OUT_DIR") or os.path.expanduser("~/Downloads/novels")
+
+TOKEN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9A-Za-z]+")
+CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+SNIPPET_CHARS = 40
+# 改动 iter_tokens 的输出时加一：contentless 表只能用写入时的 token 删除
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id    INTEGER PRIMARY KEY,
+    path  TEXT UNIQUE NOT NULL,
+    title TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    id       INTEGER PRIMARY KEY,
+    book_id  INTEGER NOT NULL REFERENCES books(id),
+    file     TEXT NOT NULL,
+    title    TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash     BLOB NOT NULL,
+    body     BLOB NOT NULL,
+    UNIQUE (book_id, file)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chapter_fts USING fts5(title, body, content='');
+"""
+
+
+# ----------------------------- Tokenizer -----------------------------
+def iter_tokens(text: str) -> Iterator[str]:
+    for m in TOKEN_RE.finditer(text):
+        run = m.group(0)
+        if not CJK_RE.match(run):
+            yield run.lower()
+        elif len(run) == 1:
+            yield run
+        else:
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+            # 末字单独再记一次：否则单字查询（前缀匹配）找不到串尾的字
+            yield run[-1]
+
+
+def tokenize(text: str) -> str:
+    """
+    交给 FTS5（unicode61）的文本：token 之间用空格隔开。
+    """
+    return " ".join(iter_tokens(text))
+
+
+def build_match(query: str) -> str:
+    """
+    空白分隔的每个词 -> 一个短语（双字 token 连续出现），词之间 AND。
+    词尾的汉字串在正文里可能还没结束，不带索引时补的末字 token；
+    词尾只剩单个汉字时退化为前缀匹配（“剑*” 命中 剑客/剑法，以及串尾的 剑）。
+    """
+    parts: List[str] = []
+    for term in query.split():
+        runs = TOKEN_RE.findall(term)
+        if not runs:
+            continue
+        toks = list(iter_tokens(term))
+        phrase = '"{}"'
+        if CJK_RE.match(runs[-1]):
+            if len(runs[-1]) > 1:
+                toks.pop()
+            else:
+                phrase += "*"
+        parts.append(phrase.format(" ".join(toks)))
+    return " AND ".join(parts)
+
+
+# ----------------------------- Index -----------------------------
+class SearchIndex:
+    def __init__(self, db_path: str = DEFAULT_DB) -> None:
+        ensure_dir(os.path.dirname(os.path.abspath(db_path)))
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self._reset_chapters()
+        self.db.executescript(SCHEMA)
+
+    def _reset_chapters(self) -> None:
+        # 分词规则变了，旧 token 无法再按规则删除：章节表整体重建
+        old = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'chapters'").fetchone()
+        self.db.executescript(
+            "DROP TABLE IF EXISTS chapter_fts; DROP TABLE IF EXISTS chapters;"
+            f"PRAGMA user_version = {INDEX_VERSION};"
+        )
+        if old:
+            print("[WARN] 搜索索引格式已更新，已清空旧索引；请重新运行 novelkit index", file=sys.stderr)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _book_id(self, path: str, title: str) -> int:
+        row = self.db.execute("SELECT id FROM books WHERE path = ?", (path,)).fetchone()
+        if row:
+            return row[0]
+        return self.db.execute("INSERT INTO books (path, title) VALUES (?, ?)", (path, title)).lastrowid
+
+    def _fts_delete(self, chapter_id: int, title: str, body_blob: bytes) -> None:
+        # contentless 表删除时必须给出当初写入的 token
+        body = zlib.decompress(body_blob).decode("utf-8")
+        self.db.execute(
+            "INSERT INTO chapter_fts (chapter_fts, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+            (chapter_id, tokenize(title), tokenize(body)),
+        )
+
+    def remove_chapter(self, chapter_id: int) -> None:
+        title, blob = self.db.execute("SELECT title, body FROM chapters WHERE id = ?", (chapter_id,)).fetchone()
+        self._fts_delete(chapter_id, title, blob)
+        self.db.execute("DELETE FROM chapters WHERE id = ?", (chapter_id,))
+
+    def index_book(self, book_dir: str, title: str = "") -> Dict[str, int]:
+        """
+        增量索引一本书（目录内的章节 md）。返回 {added, updated, removed, unchanged}。
+        """
+        book_dir = os.path.abspath(book_dir)
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        book_id = self._book_id(book_dir, title or os.path.basename(book_dir))
+        known = {
+            file: (cid, size, mtime_ns, digest)
+            for cid, file, size, mtime_ns, digest in self.db.execute(
+                "SELECT id, file, size, mtime_ns, hash FROM chapters WHERE book_id = ?", (book_id,)
+            )
+        }
+
+        with self.db:
+            for _, path in find_chapter_files(book_dir):
+                file = os.path.basename(path)
+                st = os.stat(path)
+                old = known.pop(file, None)
+                if old and old[1] == st.st_size and old[2] == st.st_mtime_ns:
+                    counts["unchanged"] += 1
+                    continue
+
+                with open(path, "rb") as f:
+                    raw = f.read()
+                digest = hashlib.blake2b(raw, digest_size=16).digest()
+                if old and old[3] == digest:
+                    # 只是 touch 过：更新 stat，不重建 token
+                    self.db.execute("UPDATE chapters SET size = ?, mtime_ns = ? WHERE id = ?",
+                                    (st.st_size, st.st_mtime_ns, old[0]))
+                    counts["unchanged"] += 1
+                    continue
+
+                content = SOURCE_LINE_RE.sub("", raw.decode("utf-8", errors="ignore").strip())
+                ch_title, body = split_chapter_md(content)
+                ch_title = ch_title or os.path.splitext(file)[0]
+                blob = zlib.compress(body.encode("utf-8"), 6)
+                if old:
+                    self.remove_chapter(old[0])
+                    counts["updated"] += 1
+                else:
+                    counts["added"] += 1
+                cid = self.db.execute(
+                    "INSERT INTO chapters (book_id, file, title, size, mtime_ns, hash, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (book_id, file, ch_title, st.st_size, st.st_mtime_ns, digest, blob),
+                ).lastrowid
+                self.db.execute("INSERT INTO chapter_fts (rowid, title, body) VALUES (?, ?, ?)",
+                                (cid, tokenize(ch_title), tokenize(body)))
+
+            for cid, *_ in known.values():
+                self.remove_chapter(cid)
+                counts["removed"] += 1
+        return counts
+
+    def prune_books(self, keep: List[str]) -> int:
+        """
+        删掉不在 keep 里的书（目录已删除）。
+        """
+        keep_set = {os.path.abspath(p) for p in keep}
+        gone = [(bid, path) for bid, path in self.db.execute("SELECT id, path FROM books") if path not in keep_set]
+        with self.db:
+            for bid, _ in gone:
+                for (cid,) in self.db.execute("SELECT id FROM chapters WHERE book_id = ?", (bid,)).fetchall():
+                    self.remove_chapter(cid)
+                self.db.execute("DELETE FROM books WHERE id = ?", (bid,))
+        return len(gone)
+
+    def search(self, query: str, *, limit: int = 20, book: str = "") -> List[Tuple[str, str, str, str]]:
+        """
+        返回 [(书名, 章节文件, 章节标题, 摘要)]，按 bm25 排序。
+        """
+        match = build_match(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT b.title, c.file, c.title, c.body FROM chapter_fts "
+            "JOIN chapters c ON c.id = chapter_fts.rowid JOIN books b ON b.id = c.book_id "
+            "WHERE chapter_fts MATCH ?"
+        )
+        args: List[object] = [match]
+        if book:
+            sql += " AND b.title LIKE ?"
+            args.append(f"%{book}%")
+        sql += " ORDER BY rank LIMIT ?"
+        args.append(limit)
+
+        out = []
+        for book_title, file, ch_title, blob in self.db.execute(sql, args):
+            body = zlib.decompress(blob).decode("utf-8")
+            out.append((book_title, file, ch_title, make_snippet(body, query)))
+        return out
+
+    def stats(self) -> Tuple[int, int]:
+        books = self.db.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+        chapters = self.db.execute("SELECT COUNT(*) FROM chapters").fetchone()[0]
+        return books, chapters
+
+
+def make_snippet(body: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    low = body.lower()
+    for term in query.split():
+        pos = low.find(term.lower())
+        if pos >= 0:
+            start = max(0, pos - width)
+            end = min(len(body), pos + len(term) + width)
+            text = body[start:pos] + "【" + body[pos:pos + len(term)] + "】" + body[pos + len(term):end]
+            text = " ".join(text.split())
+            return ("…" if start > 0 else "") + text + ("…" if end < len(body) else "")
+    return " ".join(body[:width * 2].split())
+
+
+def find_books(root: str) -> List[str]:
+    """
+    root 下所有含章节 md（001.md / '001 标题.md'）的目录，包括 root 本身。
+    """
+    books = []
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        if find_chapter_files(dirpath):
+            books.append(os.path.abspath(dirpath))
+    return books
+
+
+def index_library(index: SearchIndex, root: str, *, prune: bool = True) -> Dict[str, int]:
+    totals = {"books": 0, "added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    books = find_books(root)
+    for book_dir in books:
+        counts = index.index_book(book_dir)
+        totals["books"] += 1
+        for k, v in counts.items():
+            totals[k] += v
+        if counts["added"] or counts["updated"] or counts["removed"]:
+            print(f"[INFO] {os.path.basename(book_dir)}: +{counts['added']} ~{counts['updated']} -{counts['removed']}")
+    if prune:
+        # 只清理 root 之下已消失的书，其它 root 建的索引不动
+        root_abs = os.path.join(os.path.abspath(root), "")
+        others = [p for (p,) in index.db.execute("SELECT path FROM books")
+                  if not os.path.join(p, "").startswith(root_abs)]
+        totals["removed_books"] = index.prune_books(books + others)
+    return totals
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+Plain-text cleanup for chapter bodies (stdlib only; shared by crawl and reparse).
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List
+
+
+NAV_NOISE_PATTERNS = [
+    r"^上一页$",
+    r"^下一页$",
+    r"^上一章$",
+    r"^下一章$",
+    # 分页条 “第1/3页”
+    r"^第\s*\d+\s*/\s*\d+\s*页$",
+    r"^本书目录$",
+    r"^目录$",
+    r"^章节列表$",
+    r"^返回目录$",
+    r"^返回书页$",
+    r"^加入书签$",
+    r"^收藏本站$",
+    r"^推荐.*$",
+    # “第一～四集 ... 上一页 本书目录 下一页”
+    r"^第[一二三四五六七八九十百千]+[～\-~—]第[一二三四五六七八九十百千]+集.*$",
+]
+
+NOISE_RES = [re.compile(p) for p in NAV_NOISE_PATTERNS]
+
+
+def clean_text(raw: str) -> str:
+    """
+    过滤导航噪声 + 收敛空行。
+    """
+    # 标准化换行
+    raw = raw.replace("\r\n", "\n").replace("\r", "\n")
+    lines = [ln.strip() for ln in raw.split("\n")]
+    lines = [ln for ln in lines if ln]
+
+    cleaned: List[str] = []
+    for ln in lines:
+        if not ln:
+            continue
+
+        # 规则1：正则命中则丢弃
+        if any(r.match(ln) for r in NOISE_RES):
+            continue
+
+        # 规则2：一行同时包含“上一页/下一页/本书目录” 的导航串
+        if ("上一页" in ln and "下一页" in ln) or ("本书目录" in ln and "下一页" in ln):
+            continue
+
+        cleaned.append(ln)
+
+    # 收敛空行：用双空行分段
+    out = "\n\n".join(cleaned)
+    out = re.sub(r"\n{3,}", "\n\n", out).strip()
+    return out
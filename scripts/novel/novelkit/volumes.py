@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+"""
+Volume-sharded EPUB builds for very long books.
+
+- Split the chapter list by a fixed chapter count, or by the TOC's volume
+  headings ("第一卷 ...") recorded in <out>/.novel/manifest.json
+- Each volume is merged and converted in its own worker process (pool sized
+  to the CPU count), so peak memory is bounded by one volume per worker
+- Optional omnibus: one EPUB for the whole book, built in the same pool
+- Engines: pandoc (merged md per volume -> pandoc) or native (export.EpubWriter)
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from novelkit.manifest import Manifest
+
+
+ENGINES = ("pandoc", "native")
+
+Volume = Tuple[str, List[Tuple[int, str]]]  # (卷名, [(章序号, 路径)])
+
+
+def plan_volumes(
+    chapters: List[Tuple[int, str]],
+    *,
+    volume_size: int = 0,
+    volume_names: Optional[Dict[int, str]] = None,
+) -> List[Volume]:
+    """
+    volume_names（章序号 -> 分卷标题）非空时按分卷标题切：相邻同名章节归一卷，
+    没有分卷标题的章节并入前一卷；单卷超过 volume_size 时再按章数切开。
+    否则只按 volume_size 章一卷。
+    """
+    groups: List[Volume] = []
+    if volume_names:
+        for idx, path in chapters:
+            name = volume_names.get(idx, "")
+            if not groups or (name and name != groups[-1][0]):
+                groups.append((name, []))
+            groups[-1][1].append((idx, path))
+    else:
+        groups = [("", list(chapters))]
+
+    out: List[Volume] = []
+    for name, items in groups:
+        if volume_size <= 0 or len(items) <= volume_size:
+            out.append((name, items))
+            continue
+        for part, i in enumerate(range(0, len(items), volume_size), start=1):
+            out.append((f"{name} ({part})" if name else "", items[i:i + volume_size]))
+
+    return [(name or f"第{n}卷", items) for n, (name, items) in enumerate(out, start=1)]
+
+
+def volume_names_from_manifest(out_dir: str) -> Dict[int, str]:
+    m = Manifest.load(out_dir)
+    return {idx: rec.get("volume", "") for idx, rec in m.chapters.items() if rec.get("volume")}
+
+
+def build_epub(
+    chapters: List[Tuple[int, str]],
+    out_epub: str,
+    title: str,
+    *,
+    engine: str = "pandoc",
+    section_headings: bool = True,
+    lang: str = "zh-CN",
+    keep_md: bool = False,
+) -> str:
+    """
+    一卷（或合订本）-> epub；返回输出路径，失败返回空串。作为进程池任务运行，参数需可 pickle。
+    """
+    if engine == "native":
+        from novelkit.export import export_book
+
+        export_book(chapters, os.path.splitext(out_epub)[0], title, ["epub"],
+                    section_headings=section_headings, lang=lang, paths={"epub": out_epub})
+        return out_epub
+
+    from novelkit.output import merge_chapters, pandoc_epub
+
+    md = os.path.splitext(out_epub)[0] + ".part.md"  # 不能与合并输出的 <书名>.md 重名
+    merge_chapters(chapters, md, title, section_headings=section_headings)
+    try:
+        ok = pandoc_epub(md, out_epub, title=title, lang=lang, toc=True)
+    finally:
+        if not keep_md:
+            os.remove(md)
+    return out_epub if ok else ""
+
+
+def build_volume_epubs(
+    chapters: List[Tuple[int, str]],
+    out_base: str,
+    book_title: str,
+    *,
+    volume_size: int = 0,
+    volume_names: Optional[Dict[int, str]] = None,
+    jobs: int = 0,
+    engine: str = "pandoc",
+    omnibus: bool = False,
+    section_headings: bool = True,
+    lang: str = "zh-CN",
+) -> List[str]:
+    """
+    输出 <out_base>.vol001.epub ...（可选 <out_base>.epub 合订本）；返回成功生成的路径。
+    """
+    if not chapters:
+        raise RuntimeError("No chapter md files to build.")
+    if engine not in ENGINES:
+        raise ValueError(f"unknown engine: {engine} (use {'/'.join(ENGINES)})")
+
+    volumes = plan_volumes(chapters, volume_size=volume_size, volume_names=volume_names)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(volumes) + int(omnibus)))
+    print(f"[INFO] 分卷: {len(volumes)} 卷，{jobs} 个进程，engine={engine}")
+
+    # 合订本最大，先提交，避免它最后才开跑拖长总耗时
+    tasks: Dict[str, Tuple[List[Tuple[int, str]], str]] = {}
+    if omnibus:
+        tasks[f"{out_base}.epub"] = (chapters, book_title)
+    for n, (name, items) in enumerate(volumes, start=1):
+        tasks[f"{out_base}.vol{n:03d}.epub"] = (items, f"{book_title} {name}")
+
+    done: List[str] = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futs = {
+            pool.submit(build_epub, items, path, title, engine=engine,
+                        section_headings=section_headings, lang=lang): path
+            for path, (items, title) in tasks.items()
+        }
+        for fut in as_completed(futs):
+            path = futs[fut]
+            try:
+                if fut.result():
+                    done.append(path)
+                    print(f"[OK] {path}")
+            except Exception as e:
+                print(f"[WARN] 生成失败 {path}: {e}")
+    return sorted(done)
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+
+"""
+Novel Watch (daemon)
+- Resident watch mode for ongoing serials: one schedule per book
+- Learns each book's update cadence from past chapter-arrival times
+- Polls the TOC at the predicted time with conditional requests (ETag / Last-Modified)
+- New chapters are fetched, merged (and EPUB-ed) right away via the crawl pipeline
+- State lives in $TOOLBOX_DIR/_out/novel_watch/state.json (plain JSON, inspectable)
+
+Polling load follows how often books actually update: a book that updates daily
+is polled around its expected time, a dormant book backs off up to --max-interval.
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import requests
+
+from novelkit.common import TOOLBOX_DIR, Chapter, ensure_dir, sanitize_filename
+from novelkit.crawl import build_outputs, fetch_chapters
+from novelkit.fetch import build_session, fetch_toc_conditional, robots_allowed
+from novelkit.manifest import Manifest
+from novelkit.parse import extract_chapters_from_toc
+from novelkit.quality import QualityGate
+
+
+DEFAULT_STATE_DIR = os.environ.get("NOVEL_WATCH_DIR", os.path.join(TOOLBOX_DIR, "_out", "novel_watch"))
+
+DEFAULT_INTERVAL = 6 * 3600      # 无历史时的默认更新周期（秒）
+MIN_INTERVAL = 10 * 60           # 两次轮询之间的最短间隔
+MAX_INTERVAL = 3 * 24 * 3600     # 长期不更新的书最多隔这么久查一次
+ARRIVALS_KEEP = 32               # 保留最近多少次“新章到达”时间
+CADENCE_WINDOW = 8               # 用最近多少个到达间隔估计周期
+MAX_BACKOFF_STEPS = 20           # 退避指数上限（再往上早已被 max_interval 截住）
+
+
+# ----------------------------- State -----------------------------
+def apply_defaults(ns: argparse.Namespace) -> argparse.Namespace:
+    """
+    cli 里这些参数默认为 None（避免 --help 时导入本模块），在这里补上。
+    """
+    for key, val in (
+        ("state_dir", DEFAULT_STATE_DIR),
+        ("interval", DEFAULT_INTERVAL),
+        ("min_interval", MIN_INTERVAL),
+        ("max_interval", MAX_INTERVAL),
+    ):
+        if getattr(ns, key, val) is None:
+            setattr(ns, key, val)
+    return ns
+
+
+def state_path(state_dir: str) -> str:
+    return os.path.join(state_dir, "state.json")
+
+
+def load_state(state_dir: str) -> Dict[str, Any]:
+    path = state_path(state_dir)
+    if not os.path.exists(path):
+        return {"books": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state_dir: str, state: Dict[str, Any]) -> None:
+    """
+    原子写：先写临时文件再 rename，避免 Ctrl+C 留下半截 JSON。
+    """
+    ensure_dir(state_dir)
+    path = state_path(state_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def new_book(ns: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "toc_url": ns.toc_url,
+        "out": os.path.abspath(ns.out),
+        "merge": ns.merge,
+        "epub": ns.epub,
+        "title": ns.title,
+        "dedupe": ns.dedupe,
+        "interval": float(ns.interval or DEFAULT_INTERVAL),
+        "etag": "",
+        "last_modified": "",
+        "last_num": 0,
+        "pending": [],
+        "chapter_count": 0,
+        "arrivals": [],
+        "misses": 0,
+        "polls": 0,
+        "not_modified": 0,
+        "next_poll": 0.0,
+        "last_poll": 0.0,
+        "last_error": "",
+    }
+
+
+# ----------------------------- Cadence -----------------------------
+def estimate_interval(book: Dict[str, Any]) -> float:
+    """
+    用最近几次新章到达的间隔中位数估计更新周期；历史不足时用书的默认周期。
+    """
+    arrivals: List[float] = book.get("arrivals") or []
+    gaps = [b - a for a, b in zip(arrivals, arrivals[1:]) if b > a]
+    if not gaps:
+        return float(book.get("interval") or DEFAULT_INTERVAL)
+    return statistics.median(gaps[-CADENCE_WINDOW:])
+
+
+def schedule_next(book: Dict[str, Any], now: float, *, found_new: bool,
+                  min_interval: float, max_interval: float) -> float:
+    """
+    有新章：下次在“预计下一次更新”时查；
+    无新章：从 1/4 周期开始指数退避，越过预期越查得稀。
+    """
+    interval = estimate_interval(book)
+    if found_new:
+        book["misses"] = 0
+        delay = interval
+    else:
+        book["misses"] = min(int(book.get("misses", 0)) + 1, MAX_BACKOFF_STEPS)
+        delay = interval * 0.25 * (2 ** (book["misses"] - 1))
+    delay = min(max(delay, min_interval), max_interval)
+    delay *= random.uniform(0.9, 1.1)  # 打散同一时刻到期的书
+    book["next_poll"] = now + delay
+    return book["next_poll"]
+
+
+# ----------------------------- Polling -----------------------------
+def crawl_args(book: Dict[str, Any], ns: argparse.Namespace) -> argparse.Namespace:
+    return argparse.Namespace(
+        toc_url=book["toc_url"],
+        out=book["out"],
+        merge=book.get("merge", ""),
+        epub=bool(book.get("epub")),
+        title=book.get("title", ""),
+        min_sleep=ns.min_sleep,
+        max_sleep=ns.max_sleep,
+        timeout=ns.timeout,
+        page_workers=ns.page_workers,
+        force=False,
+        dedupe=book.get("dedupe", "skip"),
+        volume_size=0,
+        by_heading=False,
+        jobs=0,
+        omnibus=False,
+        engine="pandoc",
+        progress_every=0,
+        progress_seconds=0.0,
+        quality_gate="requeue",
+        quality_retries=2,
+        quality_backoff=30.0,
+    )
+
+
+def poll_book(session: requests.Session, book_id: str, book: Dict[str, Any],
+              ns: argparse.Namespace) -> bool:
+    """
+    轮询一本书；有新章则抓取并合并。返回是否发现新章。
+    """
+    now = time.time()
+    pending = set(book.get("pending") or [])
+    book["polls"] = int(book.get("polls", 0)) + 1
+    book["last_poll"] = now
+
+    # 还有没写成的章节时不带条件头：目录没变也要拿到章节列表去补抓
+    html, etag, last_modified = fetch_toc_conditional(
+        session,
+        book["toc_url"],
+        etag="" if pending else book.get("etag", ""),
+        last_modified="" if pending else book.get("last_modified", ""),
+        timeout=ns.timeout,
+    )
+    if html is None:
+        book["not_modified"] = int(book.get("not_modified", 0)) + 1
+        print(f"[INFO] {book_id}: 304 not modified")
+        return False
+
+    chapters = extract_chapters_from_toc(html, book["toc_url"])
+    if not chapters:
+        raise RuntimeError("Cannot parse any chapter links from TOC.")
+
+    last_num = int(book.get("last_num", 0))
+    new = [c for c in chapters if c.num > last_num]
+    fresh = [c for c in chapters if c.num > last_num or c.num in pending]
+    if not fresh:
+        book["pending"] = []
+        book["etag"], book["last_modified"] = etag, last_modified
+        print(f"[INFO] {book_id}: no new chapters ({len(chapters)} total)")
+        return False
+
+    if new:
+        print(f"[INFO] {book_id}: {len(new)} new chapter(s), latest: {new[-1].title}")
+    if len(fresh) > len(new):
+        print(f"[INFO] {book_id}: retrying {len(fresh) - len(new)} unwritten chapter(s)")
+    cargs = crawl_args(book, ns)
+    ensure_dir(cargs.out)
+    fetch_chapters(session, fresh, cargs)
+    build_outputs(cargs)
+    # 抓取 / 合并都成功后才记下 ETag：中途出错时下次轮询不会拿到 304 而漏掉新章
+    book["etag"], book["last_modified"] = etag, last_modified
+
+    book["last_num"] = max(last_num, max(c.num for c in chapters))
+    book["pending"] = unwritten(cargs.out, fresh)
+    book["chapter_count"] = len(chapters)
+    if not new:
+        return False
+    # 首次轮询只是建立基线，不算一次“更新到达”
+    if last_num > 0:
+        book["arrivals"] = (list(book.get("arrivals") or []) + [now])[-ARRIVALS_KEEP:]
+    return True
+
+
+def unwritten(out_dir: str, chapters: List[Chapter]) -> List[int]:
+    """
+    这次没写成的章节号（去重跳过、质量闸门判为需要重抓），下次轮询补抓。
+    """
+    manifest = Manifest.load(out_dir)
+    gate = QualityGate.load(out_dir)
+    return sorted(c.num for c in chapters
+                  if not manifest.file_for(c.index) or gate.wants_refetch(c.index))
+
+
+def run_daemon(ns: argparse.Namespace) -> int:
+    state = load_state(ns.state_dir)
+    books: Dict[str, Dict[str, Any]] = state["books"]
+    if not books:
+        print("[WARN] no books registered. Use: novelkit watch add <toc_url> --out <dir>")
+        return 1
+
+    session = build_session()
+
+    # 最小堆：(next_poll, book_id)。轮询次数只与“到期的书”有关，与书的总数无关
+    heap: List[Tuple[float, str]] = [(float(b.get("next_poll", 0.0)), bid) for bid, b in books.items()]
+    heapq.heapify(heap)
+
+    print(f"[INFO] watching {len(books)} book(s); state: {state_path(ns.state_dir)}")
+    try:
+        while heap:
+            due, book_id = heap[0]
+            now = time.time()
+            if due > now:
+                if ns.once:
+                    break
+                time.sleep(min(due - now, 60.0))
+                continue
+            heapq.heappop(heap)
+
+            book = books[book_id]
+            try:
+                found = poll_book(session, book_id, book, ns)
+                book["last_error"] = ""
+            except Exception as e:
+                found = False
+                book["last_error"] = str(e)
+                print(f"[WARN] {book_id}: {e}")
+
+            nxt = schedule_next(book, time.time(), found_new=found,
+                                min_interval=ns.min_interval, max_interval=ns.max_interval)
+            save_state(ns.state_dir, state)
+            print(f"[INFO] {book_id}: next poll at {time.strftime('%F %T', time.localtime(nxt))}")
+            heapq.heappush(heap, (nxt, book_id))
+    except KeyboardInterrupt:
+        save_state(ns.state_dir, state)
+        print("\n[INFO] interrupted, state saved.")
+        return 130
+    return 0
+
+
+# ----------------------------- Commands -----------------------------
+def cmd_add(ns: argparse.Namespace) -> int:
+    state = load_state(ns.state_dir)
+    book_id = ns.id or sanitize_filename(os.path.basename(os.path.abspath(ns.out)))
+    if book_id in state["books"]:
+        print(f"[ERROR] book already registered: {book_id}", file=sys.stderr)
+        return 2
+
+    if not ns.ignore_robots and not robots_allowed(build_session(), ns.toc_url):
+        print("[ERROR] robots.txt disallows crawling this URL.", file=sys.stderr)
+        return 2
+
+    state["books"][book_id] = new_book(ns)
+    save_state(ns.state_dir, state)
+    print(f"[OK] added: {book_id} -> {ns.toc_url}")
+    return 0
+
+
+def cmd_remove(ns: argparse.Namespace) -> int:
+    state = load_state(ns.state_dir)
+    if state["books"].pop(ns.id, None) is None:
+        print(f"[ERROR] unknown book: {ns.id}", file=sys.stderr)
+        return 1
+    save_state(ns.state_dir, state)
+    print(f"[OK] removed: {ns.id}")
+    return 0
+
+
+def cmd_status(ns: argparse.Namespace) -> int:
+    state = load_state(ns.state_dir)
+    books = state["books"]
+    if not books:
+        print("[INFO] no books registered.")
+        return 0
+
+    now = time.time()
+    print(f"{'book':<24} {'chapters':>8} {'cadence':>9} {'next poll':>10} {'polls':>6} {'304':>5}  error")
+    for book_id, b in sorted(books.items(), key=lambda kv: kv[1].get("next_poll", 0.0)):
+        cadence_h = estimate_interval(b) / 3600
+        eta_min = max(0.0, float(b.get("next_poll", 0.0)) - now) / 60
+        print(
+            f"{book_id[:24]:<24} {b.get('chapter_count', 0):>8} {cadence_h:>8.1f}h "
+            f"{eta_min:>8.0f}m {b.get('polls', 0):>6} {b.get('not_modified', 0):>5}  "
+            f"{b.get('last_error', '')}"
+        )
+    return 0
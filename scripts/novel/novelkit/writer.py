@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter writer stage: bounded in-memory queue -> background thread.
+
+- Atomic: each chapter is written to "<file>.tmp" and renamed into place, so a
+  chapter file on disk is always complete (resume never sees a truncated one)
+- Group commit: queued chapters are written together, fsync'ed together, renamed,
+  then the directory is fsync'ed once per batch
+- Ctrl+C (exit 130): close() drains the queue before returning
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from novelkit.common import Chapter, chapter_filename, ensure_dir
+from novelkit.output import render_chapter_md
+
+
+_STOP = object()
+
+
+def fsync_dir(path: str) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # 部分文件系统（exFAT/SMB）不支持目录 fsync
+    finally:
+        os.close(fd)
+
+
+def remove_stale_tmp(out_dir: str) -> int:
+    """
+    清理上次被强杀时留下的 .tmp（从未 rename 成正式章节）。
+    """
+    n = 0
+    for fn in os.listdir(out_dir):
+        if fn.endswith(".md.tmp"):
+            os.remove(os.path.join(out_dir, fn))
+            n += 1
+    return n
+
+
+class ChapterWriter:
+    def __init__(
+        self,
+        out_dir: str,
+        *,
+        max_pending: int = 64,
+        batch: int = 32,
+        durable: bool = True,
+        on_written: Optional[Callable[[Chapter, str], None]] = None,
+    ) -> None:
+        ensure_dir(out_dir)
+        remove_stale_tmp(out_dir)
+        self.out_dir = out_dir
+        self.batch = batch
+        self.durable = durable
+        self.on_written = on_written
+        self.q: "queue.Queue[object]" = queue.Queue(maxsize=max_pending)
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._loop, name="chapter-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, chapter: Chapter, title: str, text: str) -> str:
+        """
+        入队（队列满时阻塞，内存有界）；返回最终路径。
+        """
+        self._raise_if_failed()
+        path = os.path.join(self.out_dir, chapter_filename(chapter, title))
+        self.q.put((chapter, path, render_chapter_md(title, text)))
+        return path
+
+    def flush(self) -> None:
+        self.q.join()
+        self._raise_if_failed()
+
+    def close(self) -> None:
+        if self.thread.is_alive():
+            self.q.put(_STOP)
+            self.thread.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self) -> None:
+        if self.error is not None:
+            err, self.error = self.error, None
+            raise RuntimeError(f"chapter writer failed: {err}") from err
+
+    def _loop(self) -> None:
+        stop = False
+        while not stop:
+            items: List[Tuple[Chapter, str, str]] = []
+            item = self.q.get()
+            while True:
+                if item is _STOP:
+                    stop = True
+                    self.q.task_done()
+                else:
+                    items.append(item)  # type: ignore[arg-type]
+                if stop or len(items) >= self.batch:
+                    break
+                try:
+                    item = self.q.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if items and self.error is None:
+                    self._commit(items)
+            except BaseException as e:  # 交给主线程在下一次 submit/close 时抛出
+                self.error = e
+            finally:
+                for _ in items:
+                    self.q.task_done()
+
+    def _commit(self, items: List[Tuple[Chapter, str, str]]) -> None:
+        # 1) 整批写临时文件  2) 整批 fsync  3) 逐个 rename  4) 目录 fsync 一次
+        files = []
+        try:
+            for _, path, content in items:
+                f = open(path + ".tmp", "w", encoding="utf-8")
+                files.append(f)
+                f.write(content)
+            for f in files:
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+        finally:
+            for f in files:
+                f.close()
+
+        for _, path, _ in items:
+            os.replace(path + ".tmp", path)
+        if self.durable:
+            fsync_dir(self.out_dir)
+
+        if self.on_written is not None:
+            for chapter, path, _ in items:
+                self.on_written(chapter, path)